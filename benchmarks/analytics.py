@@ -0,0 +1,115 @@
+# benchmarks/analytics.py
+"""
+Snapshot analytics on tens of millions of order lines.
+
+First checks the NumPy answers against ReportService on a small seeded
+backend (snapshot taken through the DAO, as `report snapshot` does). Then
+writes a synthetic snapshot of `--items` order lines straight to a column
+store and times each report on it, cold (first call, includes the derived
+arrays) and warm (as in a `serve` daemon).
+
+    python -m benchmarks.analytics --items 20000000
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.fake_supabase import FakeSupabase
+from benchmarks.harness import make_services
+from benchmarks.suite import _seed_sales
+from src.dao.snapshot_dao import ColumnStore, SnapshotDAO, require_numpy
+from src.services.analytics_service import AnalyticsService
+
+np = require_numpy()
+
+
+def _check(rows: int, path: str) -> bool:
+    db = FakeSupabase()
+    svc = make_services(db)
+    _seed_sales(rows)(db, svc)
+    analytics = AnalyticsService(SnapshotDAO(db, path))
+    analytics.refresh()
+    same = {
+        "top5": [r["quantity_sold"] for r in svc.reports.top_5_products()]
+                == [r["quantity_sold"] for r in analytics.top_5_products()],
+        "revenue": abs(svc.reports.total_revenue_last_month() - analytics.total_revenue_last_month()) < 0.01,
+        "orders_per_customer": list(svc.reports.iter_customer_orders()) == list(analytics.iter_customer_orders()),
+        "frequent_customers": list(svc.reports.iter_customer_orders(3)) == list(analytics.iter_customer_orders(3)),
+    }
+    print(f"check on {rows} order lines: " + ", ".join(f"{k} {'ok' if v else 'MISMATCH'}" for k, v in same.items()))
+    return all(same.values())
+
+
+def _synthesize(path: str, items: int, customers: int, products: int, basket: int = 4) -> None:
+    rng = np.random.default_rng(0)
+    store = ColumnStore(path)
+    n_orders = items // basket
+    today = (time.time() // 86400)
+
+    def put(table, arrays, watermark):
+        store.append(table, arrays)
+        store.info(table)["watermark"] = watermark
+        store.save()
+
+    put("products", {"prod_id": np.arange(1, products + 1), "name": store.encode("products", "name", (f"p{i}" for i in range(products))),
+                     "category": store.encode("products", "category", (f"cat{i % 20}" for i in range(products))),
+                     "price": np.full(products, 10.0)}, products)
+    put("customers", {"cust_id": np.arange(1, customers + 1),
+                      "name": store.encode("customers", "name", (f"c{i}" for i in range(customers)))}, customers)
+    order_ids = np.arange(1, n_orders + 1)
+    prods = np.minimum(rng.pareto(1.2, items).astype(np.int64) + 1, products)
+    quantity = rng.integers(1, 4, items, dtype=np.int32)
+    put("order_items", {"item_id": np.arange(1, items + 1), "order_id": np.repeat(order_ids, basket)[:items],
+                        "prod_id": prods, "quantity": quantity}, items)
+    totals = np.bincount(np.repeat(order_ids, basket)[:items], weights=quantity * 10.0)[1:]
+    statuses = store.encode("orders", "status", ["PLACED", "COMPLETED", "CANCELLED"])
+    pay = store.encode("payments", "status", ["PAID", "REFUNDED"])
+    put("payments", {"payment_id": order_ids, "order_id": order_ids, "amount": totals,
+                     "status": rng.choice(pay, n_orders, p=[0.98, 0.02]),
+                     "method": np.full(n_orders, store.encode("payments", "method", ["Card"])[0])}, n_orders)
+    put("orders", {"order_id": order_ids, "customer_id": rng.integers(1, customers + 1, n_orders),
+                   "total_amount": totals, "status": rng.choice(statuses, n_orders, p=[0.5, 0.47, 0.03]),
+                   "day": (today - rng.integers(0, 365, n_orders)).astype(np.int32)}, n_orders)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="analytics")
+    parser.add_argument("--items", type=int, default=20_000_000, help="order lines in the synthetic snapshot")
+    parser.add_argument("--customers", type=int, default=1_000_000)
+    parser.add_argument("--products", type=int, default=500_000)
+    parser.add_argument("--check-rows", type=int, default=20_000, help="order lines for the check against ReportService")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="snapshot-")
+    try:
+        ok = _check(args.check_rows, tmp + "/check")
+        start = time.perf_counter()
+        _synthesize(tmp + "/big", args.items, args.customers, args.products)
+        print(f"synthetic snapshot of {args.items} order lines written in {time.perf_counter() - start:.1f}s")
+        analytics = AnalyticsService(SnapshotDAO(path=tmp + "/big"))
+        reports = [
+            ("top_5_products", analytics.top_5_products),
+            ("total_revenue_last_month", analytics.total_revenue_last_month),
+            ("frequent_customers", lambda: sum(1 for _ in analytics.iter_customer_orders(3))),
+            ("orders_per_customer", lambda: sum(1 for _ in analytics.iter_customer_orders())),
+            ("rfm_segments", analytics.rfm_segments),
+            ("co_purchase[product=1]", lambda: analytics.co_purchase(1)),
+            ("co_purchase[pairs]", analytics.co_purchase),
+        ]
+        print(f"{'':28s} {'cold s':>7s} {'warm s':>7s}")
+        for name, fn in reports:
+            timings = []
+            for _ in range(2):
+                start = time.perf_counter()
+                fn()
+                timings.append(time.perf_counter() - start)
+            print(f"{name:28s} {timings[0]:7.3f} {timings[1]:7.3f}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+# benchmarks/async_fanout.py
+"""
+Latency of read-heavy calls on the sync services vs their async counterparts.
+
+Runs order detail lookups and the four reports against the in-process
+stand-in backend with a simulated per-request latency, so the gap is the
+round trips the async layer overlaps.
+
+    python -m benchmarks.async_fanout --latency 0.01
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from benchmarks.fake_supabase import FakeSupabase
+from benchmarks.harness import make_async_services, make_services, seed_catalog
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="async_fanout")
+    parser.add_argument("--orders", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.01, help="simulated seconds per round trip")
+    args = parser.parse_args()
+
+    db = FakeSupabase()
+    seed_catalog(db, customers=10, products=20, stock=1000)
+    sync, aio = make_services(db), make_async_services(db)
+    order_ids = [sync.orders.create_order(1 + n % 10, [{"prod_id": 1 + n % 20, "qty": 1},
+                                                       {"prod_id": 1 + (n + 7) % 20, "qty": 2}])["order_id"]
+                 for n in range(args.orders)]
+    db.latency = args.latency
+
+    def sync_reports():
+        r = sync.reports
+        return {"top5": r.top_5_products(), "revenue": r.total_revenue_last_month(),
+                "orders_per_customer": r.orders_per_customer(), "frequent_customers": r.frequent_customers()}
+
+    cases = [
+        ("order details", lambda: [sync.orders.get_order_details(o) for o in order_ids],
+         lambda: asyncio.run(aio.orders.get_orders_details(order_ids))),
+        ("all reports", sync_reports, lambda: asyncio.run(aio.reports.all_reports())),
+    ]
+    failures = []
+    for name, run_sync, run_async in cases:
+        want, t_sync = _timed(run_sync)
+        got, t_async = _timed(run_async)
+        if got != want:
+            failures.append(f"{name}: async result differs from sync")
+        print(f"{name:14s} sync {t_sync * 1000:8.1f} ms   async {t_async * 1000:8.1f} ms   "
+              f"x{t_sync / t_async:5.1f}")
+    for f in failures:
+        print("FAIL", f)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
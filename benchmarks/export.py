@@ -0,0 +1,84 @@
+# benchmarks/export.py
+"""
+Streaming export of a large product table through the CLI writer.
+
+Times the first row and the whole export of `--rows` products in each
+output format, with peak traced memory, next to building the full list
+and dumping it in one go as the list commands used to.
+
+    python -m benchmarks.export --rows 100000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from benchmarks.fake_supabase import FakeSupabase
+from src.cli.output import FORMATS, write_rows
+from src.dao.product_dao import ProductDAO
+
+
+class _FirstWrite:
+    """Output file that notes when the first bytes arrive."""
+
+    def __init__(self, fh):
+        self._fh = fh
+        self.first = None
+
+    def write(self, text):
+        if self.first is None and text.strip("[\n"):
+            self.first = time.perf_counter()
+        return self._fh.write(text)
+
+    def flush(self):
+        self._fh.flush()
+
+
+def _run(fn):
+    # timed untraced; tracemalloc slows allocation-heavy code several times over
+    start = time.perf_counter()
+    first = fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (first or time.perf_counter()) - start, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="export")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    db = FakeSupabase()
+    db.seed("products", [{"name": f"p{i}", "sku": f"SKU-{i}", "price": 10.0, "stock": i % 50,
+                          "category": f"cat{i % 10}"} for i in range(args.rows)])
+    dao = ProductDAO(db)
+
+    with open(os.devnull, "w") as devnull:
+        def whole_list():
+            rows = list(dao.iter_products(page_size=args.page_size))
+            out = _FirstWrite(devnull)
+            out.write(json.dumps(rows, indent=2, default=str))
+            return out.first
+
+        print(f"{'':16s} {'first row ms':>12s} {'total s':>8s} {'peak MiB':>9s}")
+        for name, fn in [("list + dumps", whole_list)] + [
+                (f"stream {fmt}", lambda fmt=fmt: _stream(dao, fmt, args.page_size, devnull)) for fmt in FORMATS]:
+            first, total, peak = _run(fn)
+            print(f"{name:16s} {first * 1000:12.1f} {total:8.2f} {peak / 2**20:9.1f}")
+    return 0
+
+
+def _stream(dao, fmt, page_size, fh):
+    out = _FirstWrite(fh)
+    write_rows(dao.iter_products(page_size=page_size), fmt, out, flush_every=page_size)
+    return out.first
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,340 @@
+# benchmarks/fake_supabase.py
+"""
+In-process stand-in for the supabase client.
+
+Implements the slice of the PostgREST query builder the DAOs use
+(select/insert/upsert/update/delete plus eq/neq/gt/gte/lt/lte/in_/is_,
+order, limit and range) over plain Python lists. Every `.execute()` runs
+under one lock, so a single statement is atomic the way it is on Postgres,
+and an optional `latency` is slept outside the lock to let concurrent
+workers interleave like they would over the network. `aio()` returns a view
+over the same tables for the async DAOs, whose `.execute()` is awaitable.
+
+Ordered selects are served from a sorted copy of the table that is kept
+until the next write, so paging through a million-row table stays linear.
+`calls_by` counts round trips per (table, action). Selects may embed
+related tables like PostgREST, resolved with src/dao/embed.py.
+"""
+import asyncio
+import bisect
+import copy
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from src.dao.embed import attach, fetch_columns, parse_select
+
+PRIMARY_KEYS = {
+    "products": "prod_id",
+    "customers": "cust_id",
+    "orders": "order_id",
+    "order_items": "item_id",
+    "payments": "payment_id",
+    "product_sales": "prod_id",
+    "customer_order_counts": "customer_id",
+    "daily_revenue": "day",
+    "revenue_breakdown": "id",
+    "revenue_dirty_days": "day",
+}
+# tables whose primary key is assigned by the database
+SERIAL_TABLES = {"products", "customers", "orders", "order_items", "payments", "revenue_breakdown"}
+
+
+class FakeResponse:
+    def __init__(self, data: List[Dict], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+def _matches(row: Dict, filters) -> bool:
+    for op, col, value in filters:
+        v = row.get(col)
+        if op == "eq" and v != value:
+            return False
+        if op == "neq" and v == value:
+            return False
+        if op == "is" and not (value == "null" and v is None):
+            return False
+        if op == "in" and v not in value:
+            return False
+        if op in ("gt", "gte", "lt", "lte"):
+            if v is None:
+                return False
+            if op == "gt" and not v > value:
+                return False
+            if op == "gte" and not v >= value:
+                return False
+            if op == "lt" and not v < value:
+                return False
+            if op == "lte" and not v <= value:
+                return False
+    return True
+
+
+class FakeQuery:
+    def __init__(self, table: "FakeTable", action: str, payload=None, columns=("*",), on_conflict: str = "",
+                 ignore_duplicates: bool = False):
+        self._table = table
+        self._action = action
+        self._payload = payload
+        self._columns = columns
+        self._on_conflict = on_conflict
+        self._ignore_duplicates = ignore_duplicates
+        self._filters = []
+        self._order = []
+        self._limit = None
+        self._offset = 0
+
+    # --- filters ---
+    def _add(self, op, col, value):
+        self._filters.append((op, col, value))
+        return self
+
+    def eq(self, col, value):
+        return self._add("eq", col, value)
+
+    def neq(self, col, value):
+        return self._add("neq", col, value)
+
+    def gt(self, col, value):
+        return self._add("gt", col, value)
+
+    def gte(self, col, value):
+        return self._add("gte", col, value)
+
+    def lt(self, col, value):
+        return self._add("lt", col, value)
+
+    def lte(self, col, value):
+        return self._add("lte", col, value)
+
+    def in_(self, col, values):
+        return self._add("in", col, list(values))
+
+    def is_(self, col, value):
+        return self._add("is", col, value)
+
+    # --- modifiers ---
+    def select(self, *columns):
+        self._columns = columns or ("*",)
+        return self
+
+    def order(self, col, desc: bool = False):
+        self._order.append((col, desc))
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def range(self, start: int, end: int):
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def execute(self) -> FakeResponse:
+        if self._table.is_async:
+            return self._table._client._aexecute(self)
+        return self._table._client._execute(self)
+
+
+class FakeTable:
+    def __init__(self, client: "FakeSupabase", name: str, is_async: bool = False):
+        self._client = client
+        self.name = name
+        self.is_async = is_async
+
+    def select(self, *columns, count=None):
+        return FakeQuery(self, "select", columns=columns or ("*",))
+
+    def insert(self, json, **kwargs):
+        return FakeQuery(self, "insert", payload=json)
+
+    def upsert(self, json, on_conflict: str = "", ignore_duplicates: bool = False, **kwargs):
+        return FakeQuery(self, "upsert", payload=json, on_conflict=on_conflict, ignore_duplicates=ignore_duplicates)
+
+    def update(self, json, **kwargs):
+        return FakeQuery(self, "update", payload=json)
+
+    def delete(self, **kwargs):
+        return FakeQuery(self, "delete")
+
+
+class FakeSupabase:
+    """Drop-in for `supabase.Client` in DAO constructors: `ProductDAO(client=FakeSupabase())`."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.tables: Dict[str, List[Dict]] = {name: [] for name in PRIMARY_KEYS}
+        self.calls = 0
+        self.calls_by: Counter = Counter()
+        self._next_id: Dict[str, int] = {}
+        self._version: Counter = Counter()  # writes per table, to invalidate _sorted
+        self._sorted: Dict[tuple, tuple] = {}  # (table, order) -> (version, rows)
+        self._by_pk: Dict[str, tuple] = {}  # table -> (version, {pk: row})
+        self._lock = threading.Lock()
+
+    def table(self, name: str) -> FakeTable:
+        self.tables.setdefault(name, [])
+        return FakeTable(self, name)
+
+    def aio(self) -> "_AsyncView":
+        """Drop-in for `supabase.AsyncClient`, sharing this instance's tables and counters."""
+        return _AsyncView(self)
+
+    def seed(self, name: str, rows: List[Dict]) -> List[Dict]:
+        """Load rows directly, without counting round trips."""
+        with self._lock:
+            self._version[name] += 1
+            return [self._insert_row(name, dict(r)) for r in rows]
+
+    # --- execution ---
+    def _insert_row(self, name: str, row: Dict) -> Dict:
+        if name in SERIAL_TABLES:
+            pk = PRIMARY_KEYS[name]
+            if row.get(pk) is None:
+                row[pk] = self._next_id.get(name, 1)
+            self._next_id[name] = max(self._next_id.get(name, 1), row[pk] + 1)
+            row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+        self.tables[name].append(row)
+        return row
+
+    @staticmethod
+    def _project(row: Dict, columns) -> Dict:
+        if not columns or "*" in columns:
+            return dict(row)
+        cols = [c.strip() for part in columns for c in part.split(",") if c.strip()]
+        return {c: row.get(c) for c in cols}
+
+    def _execute(self, q: FakeQuery) -> FakeResponse:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._run(q)
+
+    async def _aexecute(self, q: FakeQuery) -> FakeResponse:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._run(q)
+
+    @staticmethod
+    def _sort_key(col):
+        return lambda r: (r.get(col) is None, r.get(col))
+
+    def _sorted_rows(self, name: str, order: tuple) -> List[Dict]:
+        cached = self._sorted.get((name, order))
+        if cached and cached[0] == self._version[name]:
+            return cached[1]
+        rows = list(self.tables[name])
+        for col, desc in reversed(order):
+            rows.sort(key=self._sort_key(col), reverse=desc)
+        self._sorted[(name, order)] = (self._version[name], rows)
+        return rows
+
+    def _candidates(self, name: str, filters) -> List[Dict]:
+        """Rows that may match: a primary-key lookup when there is an eq/in filter on it, else the table."""
+        pk = PRIMARY_KEYS.get(name)
+        keys = next(([v] if op == "eq" else v for op, col, v in filters if col == pk and op in ("eq", "in")), None)
+        if keys is None:
+            return self.tables[name]
+        cached = self._by_pk.get(name)
+        if not cached or cached[0] != self._version[name]:
+            cached = (self._version[name], {r.get(pk): r for r in self.tables[name]})
+            self._by_pk[name] = cached
+        return [cached[1][k] for k in dict.fromkeys(keys) if k in cached[1]]
+
+    def _select_ordered(self, q: FakeQuery) -> List[Dict]:
+        rows = self._sorted_rows(q._table.name, tuple(q._order))
+        # a gt/gte filter on the leading ascending sort column is a seek, as with an index
+        start = 0
+        col, desc = q._order[0]
+        if not desc:
+            for op, fcol, value in q._filters:
+                if fcol == col and op in ("gt", "gte") and value is not None:
+                    find = bisect.bisect_right if op == "gt" else bisect.bisect_left
+                    start = max(start, find(rows, (False, value), key=self._sort_key(col)))
+        if not q._filters:
+            end = None if q._limit is None else start + q._offset + q._limit
+            return rows[start + q._offset:end]
+        out, skip = [], q._offset
+        for r in rows[start:]:
+            if not _matches(r, q._filters):
+                continue
+            if skip:
+                skip -= 1
+                continue
+            out.append(r)
+            if q._limit is not None and len(out) >= q._limit:
+                break
+        return out
+
+    def _run(self, q: FakeQuery) -> FakeResponse:
+        with self._lock:
+            self.calls += 1
+            self.calls_by[(q._table.name, q._action)] += 1
+            rows = self.tables.setdefault(q._table.name, [])
+            if q._action != "select":
+                self._version[q._table.name] += 1
+            if q._action == "select" and q._order:
+                out = self._select_ordered(q)
+            elif q._action == "insert":
+                payload = q._payload if isinstance(q._payload, list) else [q._payload]
+                out = [self._insert_row(q._table.name, copy.deepcopy(p)) for p in payload]
+            elif q._action == "upsert":
+                payload = q._payload if isinstance(q._payload, list) else [q._payload]
+                keys = [k.strip() for k in (q._on_conflict or PRIMARY_KEYS.get(q._table.name)).split(",")]
+                index = {}
+                for r in rows:
+                    index.setdefault(tuple(r.get(k) for k in keys), r)
+                out = []
+                for p in payload:
+                    existing = index.get(tuple(p.get(k) for k in keys))
+                    if existing is not None:
+                        if q._ignore_duplicates:
+                            continue
+                        existing.update(copy.deepcopy(p))
+                        out.append(existing)
+                    else:
+                        row = self._insert_row(q._table.name, copy.deepcopy(p))
+                        index[tuple(row.get(k) for k in keys)] = row
+                        out.append(row)
+            else:
+                candidates = self._candidates(q._table.name, q._filters) if q._action == "select" else rows
+                out = [r for r in candidates if _matches(r, q._filters)]
+                if q._action == "update":
+                    for r in out:
+                        r.update(copy.deepcopy(q._payload))
+                elif q._action == "delete":
+                    ids = {id(r) for r in out}
+                    self.tables[q._table.name] = [r for r in rows if id(r) not in ids]
+                for col, desc in reversed(q._order):
+                    out.sort(key=lambda r: (r.get(col) is None, r.get(col)), reverse=desc)
+                if q._offset:
+                    out = out[q._offset:]
+                if q._limit is not None:
+                    out = out[: q._limit]
+            cols, embeds = parse_select(q._columns)
+            if not embeds:
+                return FakeResponse([self._project(r, cols) for r in out])
+            fetch, extra = fetch_columns(q._table.name, cols, embeds)
+            data = [self._project(r, fetch) for r in out]
+            attach(q._table.name, data, embeds, self._related)
+            for r in data:
+                for k in extra:
+                    r.pop(k, None)
+            return FakeResponse(data)
+
+    def _related(self, name: str, columns, key: str, values) -> List[Dict]:
+        wanted = set(values)
+        rows = self._candidates(name, [("in", key, values)])
+        return [self._project(r, columns) for r in rows if r.get(key) in wanted]
+
+
+class _AsyncView:
+    def __init__(self, client: FakeSupabase):
+        self._client = client
+
+    def table(self, name: str) -> FakeTable:
+        self._client.tables.setdefault(name, [])
+        return FakeTable(self._client, name, is_async=True)
@@ -0,0 +1,69 @@
+# benchmarks/harness.py
+"""Wire the real services to a stand-in client so benchmarks exercise production code paths."""
+import os
+import tempfile
+from types import SimpleNamespace
+from typing import Dict, List
+
+from benchmarks.fake_supabase import FakeSupabase
+from src.dao.sqlite_client import SQLiteClient
+
+from src.dao.customer_dao import AsyncCustomerDAO, CustomerDAO
+from src.dao.order_dao import AsyncOrderDAO, OrderDAO
+from src.dao.payment_dao import AsyncPaymentDAO, PaymentDAO
+from src.dao.product_dao import AsyncProductDAO, ProductDAO
+from src.dao.report_dao import AsyncReportDAO, ReportDAO
+from src.dao.rollup_dao import AsyncRollupDAO, RollupDAO
+from src.services.customer_service import CustomerService
+from src.services.order_service import AsyncOrderService, OrderService
+from src.services.payment_service import AsyncPaymentService, PaymentService
+from src.services.product_service import ProductService
+from src.services.report_service import AsyncReportService, ReportService
+
+
+BACKENDS = ("fake", "sqlite")
+
+
+def make_backend(kind: str = "fake", latency: float = 0.0):
+    """A fresh, empty backend: the in-memory stand-in (with simulated latency) or a
+    SQLite database in a temporary file (latency is ignored, the disk is real)."""
+    if kind == "sqlite":
+        path = os.path.join(tempfile.mkdtemp(prefix="retail-bench-"), "bench.db")
+        return SQLiteClient(path)
+    return FakeSupabase(latency=latency)
+
+
+def table_rows(db, name: str) -> List[Dict]:
+    """Every row of a table, for after-the-fact invariant checks."""
+    if isinstance(db, FakeSupabase):
+        return db.tables[name]
+    return db.table(name).select("*").execute().data
+
+
+def make_services(db) -> SimpleNamespace:
+    """Services whose DAOs all talk to `db` (a FakeSupabase or any compatible client)."""
+    return SimpleNamespace(
+        orders=OrderService(OrderDAO(db), ProductDAO(db), CustomerDAO(db), RollupDAO(db), PaymentDAO(db)),
+        payments=PaymentService(PaymentDAO(db), OrderDAO(db), RollupDAO(db)),
+        products=ProductService(ProductDAO(db)),
+        customers=CustomerService(CustomerDAO(db)),
+        reports=ReportService(ReportDAO(db), RollupDAO(db)),
+    )
+
+
+def make_async_services(db) -> SimpleNamespace:
+    """Async services over `db.aio()`; uncached, like the sync DAOs built with an explicit client."""
+    aio = db.aio()
+    return SimpleNamespace(
+        orders=AsyncOrderService(AsyncOrderDAO(aio), AsyncProductDAO(aio), AsyncCustomerDAO(aio), AsyncRollupDAO(aio)),
+        payments=AsyncPaymentService(AsyncPaymentDAO(aio), AsyncOrderDAO(aio), AsyncRollupDAO(aio)),
+        reports=AsyncReportService(AsyncReportDAO(aio), AsyncRollupDAO(aio)),
+    )
+
+
+def seed_catalog(db, customers: int, products: int, stock: int, price: float = 10.0) -> None:
+    db.seed("customers", [{"name": f"c{i}", "email": f"c{i}@example.com"} for i in range(customers)])
+    db.seed("products", [
+        {"name": f"p{i}", "sku": f"SKU-{i}", "price": price, "stock": stock, "category": f"cat{i % 10}"}
+        for i in range(products)
+    ])
@@ -0,0 +1,88 @@
+# benchmarks/order_intake.py
+"""
+Order intake throughput: one-by-one `create_order` vs the `create-batch` pipeline.
+
+Both run against the in-process stand-in backend with a simulated per-request
+latency (or a local SQLite file with `--backend sqlite`), and both are checked
+for oversell afterwards.
+
+    python -m benchmarks.order_intake --orders 2000 --latency 0.002
+"""
+import argparse
+import random
+import sys
+import time
+
+from benchmarks.harness import BACKENDS, make_backend, make_services, seed_catalog, table_rows
+from src.services.order_service import OrderError
+
+
+def _orders(n, customers, products, seed):
+    rng = random.Random(seed)
+    return [
+        {"customer_id": rng.randint(1, customers),
+         "items": [{"prod_id": rng.randint(1, products), "qty": rng.randint(1, 3)} for _ in range(rng.randint(1, 5))]}
+        for _ in range(n)
+    ]
+
+
+def _check(db, stock):
+    sold = {}
+    for item in table_rows(db, "order_items"):
+        sold[item["prod_id"]] = sold.get(item["prod_id"], 0) + item["quantity"]
+    return [f"product {p['prod_id']}: stock {p['stock']} + sold {sold.get(p['prod_id'], 0)} != {stock}"
+            for p in table_rows(db, "products") if p["stock"] < 0 or p["stock"] + sold.get(p["prod_id"], 0) != stock]
+
+
+def run_single(orders, args):
+    db = make_backend(args.backend, args.latency)
+    seed_catalog(db, args.customers, args.products, args.stock)
+    svc = make_services(db).orders
+    start = time.perf_counter()
+    placed = 0
+    for o in orders:
+        try:
+            svc.create_order(o["customer_id"], o["items"])
+            placed += 1
+        except OrderError:
+            pass
+    return db, placed, db.calls, time.perf_counter() - start
+
+
+def run_batch(orders, args):
+    db = make_backend(args.backend, args.latency)
+    seed_catalog(db, args.customers, args.products, args.stock)
+    svc = make_services(db).orders
+    start = time.perf_counter()
+    results = svc.create_orders_from_records(enumerate(orders, start=1), args.batch_size, args.workers)
+    placed = sum(1 for _, r in results if "order" in r)
+    return db, placed, db.calls, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="order_intake")
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--customers", type=int, default=100)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--stock", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.002, help="simulated seconds per round trip")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--backend", choices=BACKENDS, default="fake")
+    args = parser.parse_args()
+
+    orders = _orders(args.orders, args.customers, args.products, args.seed)
+    failures = []
+    for name, fn in (("create_order", run_single), ("create-batch", run_batch)):
+        db, placed, calls, elapsed = fn(orders, args)
+        failures += [f"{name}: {f}" for f in _check(db, args.stock)]
+        print(f"{name:12s} {placed:6d} placed  {calls:7d} round trips  {elapsed:7.2f}s  "
+              f"{len(orders) / elapsed:9.1f} orders/s")
+    for f in failures:
+        print("FAIL", f)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# benchmarks/projection.py
+"""
+Payload size and decode time of the report and lookup paths, with the DAOs'
+column projections vs the same calls forced back to select("*").
+
+Each response is serialised to JSON as PostgREST would send it; the bytes
+are summed and json.loads over all payloads is timed as the client-side
+decode cost. Seeded rows carry a wide text column so unused columns cost
+what they would on a real catalogue.
+
+    python -m benchmarks.projection --rows 20000
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.fake_supabase import FakeSupabase
+from benchmarks.harness import make_services
+from src.dao.customer_dao import CustomerDAO
+from src.dao.product_dao import ProductDAO
+
+WIDE = "x" * 200
+
+
+class _WireTable:
+    def __init__(self, table, wire: "_Wire"):
+        self._table = table
+        self._wire = wire
+
+    def select(self, *columns, **kwargs):
+        if self._wire.select_all:
+            columns = ("*",)
+        return _WireQuery(self._table.select(*columns, **kwargs), self._wire)
+
+    def __getattr__(self, name):
+        attr = getattr(self._table, name)
+        if not callable(attr):
+            return attr
+
+        def start(*args, **kwargs):
+            return _WireQuery(attr(*args, **kwargs), self._wire)
+        return start
+
+
+class _WireQuery:
+    def __init__(self, query, wire: "_Wire"):
+        self._query = query
+        self._wire = wire
+
+    def __getattr__(self, name):
+        attr = getattr(self._query, name)
+
+        def call(*args, **kwargs):
+            self._query = attr(*args, **kwargs)
+            return self
+        return call
+
+    def execute(self):
+        resp = self._query.execute()
+        self._wire.payloads.append(json.dumps(resp.data, default=str))
+        return resp
+
+
+class _Wire:
+    """Client wrapper that keeps every response body; `select_all` ignores the DAOs' projections."""
+
+    def __init__(self, client, select_all: bool = False):
+        self._client = client
+        self.select_all = select_all
+        self.payloads = []
+
+    def table(self, name: str) -> _WireTable:
+        return _WireTable(self._client.table(name), self)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def _seed(db, rows: int) -> None:
+    rng = random.Random(rows)
+    customers, products = 1000, 500
+    db.seed("customers", [{"name": f"c{i}", "email": f"c{i}@example.com", "city": "Hyderabad", "notes": WIDE}
+                          for i in range(customers)])
+    db.seed("products", [{"name": f"p{i}", "sku": f"SKU-{i}", "price": 10.0, "stock": 1000,
+                          "category": f"cat{i % 10}", "description": WIDE} for i in range(products)])
+    now = datetime.now(timezone.utc)
+    orders, items, payments = [], [], []
+    for oid in range(1, rows // 4 + 1):
+        created = (now - timedelta(days=rng.randrange(60))).isoformat()
+        lines = [{"order_id": oid, "prod_id": rng.randint(1, products), "quantity": rng.randint(1, 3),
+                  "created_at": created, "note": WIDE} for _ in range(4)]
+        total = round(sum(i["quantity"] * 10.0 for i in lines), 2)
+        orders.append({"order_id": oid, "customer_id": rng.randint(1, customers), "total_amount": total,
+                       "status": "PLACED", "created_at": created, "shipping_address": WIDE})
+        items.extend(lines)
+        payments.append({"order_id": oid, "amount": total, "method": "Card", "created_at": created,
+                         "status": "REFUNDED" if rng.random() < 0.02 else "PAID", "reference": WIDE})
+    db.seed("orders", orders)
+    db.seed("order_items", items)
+    db.seed("payments", payments)
+
+
+def _workload(client, svc) -> None:
+    svc.reports.rebuild_rollups()
+    svc.reports.top_5_products()
+    svc.reports.total_revenue_last_month()
+    svc.reports.orders_per_customer()
+    svc.reports.frequent_customers()
+    ProductDAO(client).existing_skus([f"SKU-{i}" for i in range(500)])
+    CustomerDAO(client).existing_emails([f"c{i}@example.com" for i in range(1000)])
+
+
+def _measure(rows: int, select_all: bool):
+    db = FakeSupabase()
+    _seed(db, rows)
+    wire = _Wire(db, select_all=select_all)
+    _workload(wire, make_services(wire))
+    size = sum(len(p) for p in wire.payloads)
+    start = time.perf_counter()
+    for p in wire.payloads:
+        json.loads(p)
+    return len(wire.payloads), size, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="projection")
+    parser.add_argument("--rows", type=int, default=20_000, help="order_items rows to seed")
+    args = parser.parse_args()
+
+    print(f"{'':12s} {'responses':>9s} {'MiB':>8s} {'decode ms':>10s}")
+    results = {}
+    for label, select_all in (("select(*)", True), ("projected", False)):
+        n, size, decode = _measure(args.rows, select_all)
+        results[label] = size
+        print(f"{label:12s} {n:9d} {size / 2**20:8.2f} {decode * 1000:10.1f}")
+    saved = 1 - results["projected"] / results["select(*)"]
+    print(f"projection saves {saved:.0%} of the bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
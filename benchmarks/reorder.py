@@ -0,0 +1,68 @@
+# benchmarks/reorder.py
+"""
+Low-stock and reorder reports on a large catalog.
+
+Seeds `--skus` products (a small share of them running low) and
+`--items` order lines over the last 60 days, then times
+`ProductService.get_low_stock` and `ReportService.reorder_report`,
+checking the low-stock list against a full scan of the table.
+
+    python -m benchmarks.reorder --skus 500000 --items 200000
+    python -m benchmarks.reorder --backend sqlite
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.harness import BACKENDS, make_backend, make_services, table_rows
+
+
+def _seed(db, skus: int, items: int, rng: random.Random) -> None:
+    db.seed("customers", [{"name": f"c{i}", "email": f"c{i}@example.com"} for i in range(100)])
+    db.seed("products", [{"name": f"p{i}", "sku": f"SKU-{i}", "price": 10.0,
+                          "stock": rng.randint(0, 10) if rng.random() < 0.01 else rng.randint(11, 500)}
+                         for i in range(skus)])
+    now = datetime.now(timezone.utc)
+    orders, lines = [], []
+    # the busiest products are the first few hundred, so some well-stocked ones still qualify
+    for oid in range(1, items // 4 + 1):
+        created = (now - timedelta(days=rng.randrange(60))).isoformat()
+        orders.append({"order_id": oid, "customer_id": rng.randint(1, 100), "total_amount": 40.0,
+                       "status": "CANCELLED" if rng.random() < 0.03 else "PLACED", "created_at": created})
+        lines += [{"order_id": oid, "prod_id": min(int(rng.paretovariate(1.2)), skus), "quantity": rng.randint(1, 3),
+                   "created_at": created} for _ in range(4)]
+    db.seed("orders", orders)
+    db.seed("order_items", lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="reorder")
+    parser.add_argument("--skus", type=int, default=500_000)
+    parser.add_argument("--items", type=int, default=200_000, help="order lines to seed")
+    parser.add_argument("--threshold", type=int, default=5)
+    parser.add_argument("--backend", choices=BACKENDS, default="fake")
+    args = parser.parse_args()
+
+    db = make_backend(args.backend)
+    _seed(db, args.skus, args.items, random.Random(0))
+    svc = make_services(db)
+
+    calls = db.calls
+    start = time.perf_counter()
+    low = svc.products.get_low_stock(args.threshold)
+    low_s, low_calls = time.perf_counter() - start, db.calls - calls
+    expected = sum(1 for p in table_rows(db, "products") if (p.get("stock") or 0) <= args.threshold)
+    print(f"low-stock: {len(low)} products in {low_s:.2f}s, {low_calls} round trips (full scan finds {expected})")
+
+    calls = db.calls
+    start = time.perf_counter()
+    ranked = svc.reports.reorder_report(threshold=args.threshold)
+    print(f"reorder:   {len(ranked)} products in {time.perf_counter() - start:.2f}s, "
+          f"{db.calls - calls} round trips; first: {ranked[:1]}")
+    return 0 if len(low) == expected else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
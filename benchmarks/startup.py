@@ -0,0 +1,103 @@
+# benchmarks/startup.py
+"""
+CLI startup-time benchmark.
+
+Times fresh `python -m src.cli.main` processes for `--help` and for a typical
+command (`product list`) against a local stub HTTP server that answers every
+request with an empty JSON list, so only startup and client setup are measured.
+`product list` is also timed through a `serve` daemon, which skips the client
+setup. Fails if `--help` imports supabase.
+
+    python -m benchmarks.startup --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _EmptyListHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self):
+        body = b"[]"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PATCH = do_DELETE = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+def _time_command(argv, env, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "src.cli.main", *argv], cwd=ROOT, env=env,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="startup")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _EmptyListHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    env = dict(os.environ, SUPABASE_URL=f"http://127.0.0.1:{server.server_port}", SUPABASE_KEY="stand-in")
+
+    interp = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=False)
+        interp.append(time.perf_counter() - start)
+
+    local_env = dict(env, RETAIL_CLI_NO_DAEMON="1")
+    results = {
+        "python -c pass": interp,
+        "--help": _time_command(["--help"], local_env, args.runs),
+        "product list": _time_command(["product", "list"], local_env, args.runs),
+    }
+
+    sock = os.path.join(tempfile.mkdtemp(prefix="retail-cli-"), "daemon.sock")
+    daemon_env = dict(env, RETAIL_CLI_SOCKET=sock)
+    daemon = subprocess.Popen([sys.executable, "-m", "src.cli.main", "serve"], cwd=ROOT, env=daemon_env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 10
+        while not os.path.exists(sock) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        results["product list (serve)"] = _time_command(["product", "list"], daemon_env, args.runs)
+    finally:
+        daemon.terminate()
+        daemon.wait()
+    server.shutdown()
+
+    for name, samples in results.items():
+        print(f"{name:22s} median {statistics.median(samples) * 1000:7.1f} ms   "
+              f"min {min(samples) * 1000:7.1f} ms")
+
+    probe = subprocess.run(
+        [sys.executable, "-c", "import sys, src.cli.main as m; m.build_parser(); print('supabase' in sys.modules)"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=False,
+    )
+    if probe.stdout.strip() != "False":
+        print("FAIL --help path imports supabase")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
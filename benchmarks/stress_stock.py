@@ -0,0 +1,108 @@
+# benchmarks/stress_stock.py
+"""
+Concurrency stress check for stock reservation.
+
+Runs many order-intake workers in parallel against the in-process stand-in
+backend, then cancels a share of the placed orders from several threads at
+once, and verifies nothing was oversold or restored twice: for every
+product, remaining stock + units on live (not cancelled) order items must
+equal the starting stock, stock must never go negative, and the units_sold
+and orders_count rollups must match the live orders.
+
+    python -m benchmarks.stress_stock --workers 16 --orders 400
+    python -m benchmarks.stress_stock --backend sqlite
+"""
+import argparse
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.harness import BACKENDS, make_backend, make_services, seed_catalog, table_rows
+from src.services.order_service import OrderError
+
+
+def run(workers: int, orders: int, products: int, stock: int, latency: float, seed: int,
+        backend: str = "fake", cancel: float = 0.3, cancellers: int = 3) -> int:
+    db = make_backend(backend, latency)
+    seed_catalog(db, customers=10, products=products, stock=stock)
+    svc = make_services(db).orders
+    rng = random.Random(seed)
+    baskets = [
+        [{"prod_id": rng.randint(1, products), "qty": rng.randint(1, 3)} for _ in range(rng.randint(1, 4))]
+        for _ in range(orders)
+    ]
+
+    def place(basket):
+        try:
+            return svc.create_order(rng.randint(1, 10), basket)["order_id"]
+        except OrderError:
+            return None
+
+    def cancel_order(order_id):
+        try:
+            svc.cancel_order(order_id)
+            return True
+        except OrderError:
+            return False
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        placed = [oid for oid in pool.map(place, baskets) if oid is not None]
+        # every chosen order is cancelled by `cancellers` threads at once; exactly one may win
+        doomed = rng.sample(placed, int(len(placed) * cancel))
+        won = sum(pool.map(cancel_order, [oid for oid in doomed for _ in range(cancellers)]))
+    elapsed = time.perf_counter() - start
+    calls = db.calls
+
+    failures = []
+    if won != len(doomed):
+        failures.append(f"{won} cancels succeeded for {len(doomed)} orders")
+    live = {o["order_id"]: o["customer_id"] for o in table_rows(db, "orders") if o["status"] != "CANCELLED"}
+    sold, counts = {}, {}
+    for item in table_rows(db, "order_items"):
+        if item["order_id"] in live:
+            sold[item["prod_id"]] = sold.get(item["prod_id"], 0) + item["quantity"]
+    for cid in live.values():
+        counts[cid] = counts.get(cid, 0) + 1
+    rolled = {r["prod_id"]: r["units_sold"] for r in table_rows(db, "product_sales")}
+    for pid in set(sold) | set(rolled):
+        if (rolled.get(pid) or 0) != sold.get(pid, 0):
+            failures.append(f"product {pid}: rollup units_sold {rolled.get(pid)} != {sold.get(pid, 0)}")
+    rolled = {r["customer_id"]: r["orders_count"] for r in table_rows(db, "customer_order_counts")}
+    for cid in set(counts) | set(rolled):
+        if (rolled.get(cid) or 0) != counts.get(cid, 0):
+            failures.append(f"customer {cid}: rollup orders_count {rolled.get(cid)} != {counts.get(cid, 0)}")
+    for p in table_rows(db, "products"):
+        if p["stock"] < 0:
+            failures.append(f"product {p['prod_id']}: negative stock {p['stock']}")
+        if p["stock"] + sold.get(p["prod_id"], 0) != stock:
+            failures.append(
+                f"product {p['prod_id']}: stock {p['stock']} + sold {sold.get(p['prod_id'], 0)} != {stock}"
+            )
+
+    print(f"{len(placed)} placed, {len(baskets) - len(placed)} rejected, {len(doomed)} cancelled "
+          f"x{cancellers}, {calls} round trips, {elapsed:.2f}s with {workers} workers ({backend})")
+    for f in failures:
+        print("FAIL", f)
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="stress_stock")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--orders", type=int, default=400)
+    parser.add_argument("--products", type=int, default=5)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.001, help="simulated seconds per round trip")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--backend", choices=BACKENDS, default="fake")
+    parser.add_argument("--cancel", type=float, default=0.3, help="share of placed orders to cancel")
+    parser.add_argument("--cancellers", type=int, default=3, help="threads cancelling each of those orders at once")
+    args = parser.parse_args()
+    sys.exit(run(args.workers, args.orders, args.products, args.stock, args.latency, args.seed, args.backend,
+                 args.cancel, args.cancellers))
+
+
+if __name__ == "__main__":
+    main()
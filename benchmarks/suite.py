@@ -0,0 +1,250 @@
+# benchmarks/suite.py
+"""
+Round-trip budget suite for the service layer.
+
+Each scenario runs one service call against the in-process stand-in
+backend and records its round trips, wall time and peak traced memory.
+Round trips are compared with benchmarks/budgets.json; a scenario over its
+budget fails the run, so a change that turns one query into N shows up here.
+
+    python -m benchmarks.suite                       # every scenario
+    python -m benchmarks.suite --only report --sizes 10000
+    python -m benchmarks.suite --update-budgets      # accept current counts
+
+Budgets assume the default SCAN_PAGE_SIZE of 1000.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from benchmarks.fake_supabase import FakeSupabase
+from benchmarks.harness import make_services, seed_catalog
+from src.config import SCAN_PAGE_SIZE
+
+BUDGETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "budgets.json")
+REPORT_SIZES = (10_000, 100_000, 1_000_000)
+BASKET_SIZES = (1, 10, 100)
+
+
+class Scenario(NamedTuple):
+    name: str
+    prepare: Callable  # (db, services) -> ctx, not measured
+    run: Callable  # (services, ctx) -> result, measured
+    fixture: Optional[str] = None  # consecutive scenarios with the same fixture share one prepared backend
+
+
+class Result(NamedTuple):
+    name: str
+    round_trips: int
+    seconds: float
+    peak_bytes: int
+    by_query: Dict[str, int]
+
+
+def _basket(n: int) -> List[Dict]:
+    return [{"prod_id": pid, "qty": 1} for pid in range(1, n + 1)]
+
+
+def _catalog(db, svc):
+    seed_catalog(db, customers=50, products=200, stock=1_000_000)
+
+
+def _placed(basket: int):
+    def prepare(db, svc):
+        _catalog(db, svc)
+        order = svc.orders.create_order(1, _basket(basket))
+        svc.payments.create_pending_payment(order["order_id"], order["total_amount"])
+        return order["order_id"]
+    return prepare
+
+
+def _placed_many(n: int):
+    def prepare(db, svc):
+        _catalog(db, svc)
+        placed = svc.orders.create_orders_batch([{"customer_id": 1 + i % 50, "items": _basket(10)} for i in range(n)])
+        return [r["order"]["order_id"] for r in placed]
+    return prepare
+
+
+def _settlement(ids: List[int]):
+    return [(line, {"order_id": oid, "method": ("Card", "UPI", "Cash")[line % 3]}) for line, oid in enumerate(ids, 1)]
+
+
+def _settled_many(n: int):
+    def prepare(db, svc):
+        ids = _placed_many(n)(db, svc)
+        svc.payments.settle_payments(_settlement(ids), workers=1)
+        return ids
+    return prepare
+
+
+def _seed_sales(rows: int):
+    """`rows` order_items spread over rows/4 orders, one payment per order, 2% refunded."""
+    def prepare(db, svc):
+        rng = random.Random(rows)
+        customers, products = 1000, 500
+        seed_catalog(db, customers=customers, products=products, stock=1_000_000)
+        now = datetime.now(timezone.utc)
+        n_orders = max(rows // 4, 1)
+        orders, items, payments = [], [], []
+        for oid in range(1, n_orders + 1):
+            created = (now - timedelta(days=rng.randrange(60), seconds=rng.randrange(86400))).isoformat()
+            status = "CANCELLED" if rng.random() < 0.03 else "PLACED"
+            lines = [{"order_id": oid, "prod_id": rng.randint(1, products), "quantity": rng.randint(1, 3),
+                      "created_at": created} for _ in range(4 if oid * 4 <= rows else rows % 4)]
+            total = round(sum(i["quantity"] * 10.0 for i in lines), 2)
+            orders.append({"order_id": oid, "customer_id": rng.randint(1, customers), "total_amount": total,
+                           "status": status, "created_at": created})
+            items.extend(lines)
+            payments.append({"order_id": oid, "amount": total, "method": "Card", "created_at": created,
+                             "status": "REFUNDED" if rng.random() < 0.02 else "PAID"})
+        db.seed("orders", orders)
+        db.seed("order_items", items)
+        db.seed("payments", payments)
+        svc.reports.rebuild_rollups()
+    return prepare
+
+
+def _import_records(n: int):
+    return [(line, {"name": f"imported {line}", "sku": f"IMP-{line}", "price": "9.5", "stock": "20"})
+            for line in range(2, n + 2)]
+
+
+def scenarios(report_sizes=REPORT_SIZES) -> List[Scenario]:
+    out = []
+    for n in BASKET_SIZES:
+        out.append(Scenario(f"order.create_order[basket={n}]", _catalog,
+                            lambda svc, ctx, n=n: svc.orders.create_order(1, _basket(n))))
+    out += [
+        Scenario("order.get_order_details[basket=10]", _placed(10),
+                 lambda svc, oid: svc.orders.get_order_details(oid)),
+        Scenario("order.get_orders_details[orders=500,basket=10]", _placed_many(500),
+                 lambda svc, ids: svc.orders.get_orders_details(ids)),
+        Scenario("order.cancel_order[basket=10]", _placed(10), lambda svc, oid: svc.orders.cancel_order(oid)),
+        Scenario("order.complete_order[basket=10]", _placed(10), lambda svc, oid: svc.orders.complete_order(oid)),
+        Scenario("order.create_orders_batch[orders=200,basket=10]", _catalog,
+                 lambda svc, ctx: svc.orders.create_orders_batch(
+                     [{"customer_id": 1 + i % 50, "items": _basket(10)} for i in range(200)])),
+        Scenario("order.create_orders_from_records[orders=2000]", _catalog,
+                 lambda svc, ctx: list(svc.orders.create_orders_from_records(
+                     ((i, {"customer_id": 1 + i % 50, "items": [{"prod_id": 1 + i % 200, "qty": 1}]})
+                      for i in range(1, 2001)), batch_size=200, workers=1))),
+        Scenario("payment.process_payment", _placed(10), lambda svc, oid: svc.payments.process_payment(oid, "Card")),
+        Scenario("payment.refund_payment", _placed(10), lambda svc, oid: svc.payments.refund_payment(oid)),
+        Scenario("payment.settle_payments[payments=2000]", _placed_many(2000),
+                 lambda svc, ids: svc.payments.settle_payments(_settlement(ids), workers=1)),
+        Scenario("payment.refund_payments[payments=2000]", _settled_many(2000),
+                 lambda svc, ids: svc.payments.refund_payments(_settlement(ids), workers=1)),
+        Scenario("product.add_product", _catalog,
+                 lambda svc, ctx: svc.products.add_product("new", "SKU-new", 5.0, 10)),
+        Scenario("product.restock_product", _catalog, lambda svc, ctx: svc.products.restock_product(1, 5)),
+        Scenario("product.get_low_stock", _catalog, lambda svc, ctx: svc.products.get_low_stock(5)),
+        Scenario("report.reorder_report", _placed(10), lambda svc, ctx: svc.reports.reorder_report()),
+        Scenario("report.refresh_revenue[basket=10]", _placed(10), lambda svc, ctx: svc.reports.refresh_revenue()),
+        Scenario("product.import_products[rows=5000]", _catalog,
+                 lambda svc, ctx: svc.products.import_products(_import_records(5000), chunk_size=500, workers=1)),
+    ]
+    # the report calls only read, and a rebuild rewrites the same totals, so one seeded backend serves them all
+    for n in report_sizes:
+        tag, seed = f"[rows={n}]", _seed_sales(n)
+        out += [
+            Scenario("report.top_5_products" + tag, seed, lambda svc, ctx: svc.reports.top_5_products(), tag),
+            Scenario("report.total_revenue_last_month" + tag, seed,
+                     lambda svc, ctx: svc.reports.total_revenue_last_month(), tag),
+            Scenario("report.orders_per_customer" + tag, seed, lambda svc, ctx: svc.reports.orders_per_customer(), tag),
+            Scenario("report.frequent_customers" + tag, seed, lambda svc, ctx: svc.reports.frequent_customers(), tag),
+            Scenario("report.revenue_report[by=week]" + tag, seed,
+                     lambda svc, ctx: svc.reports.revenue_report(bucket="week"), tag),
+            Scenario("report.rebuild_rollups" + tag, seed, lambda svc, ctx: svc.reports.rebuild_rollups(), tag),
+        ]
+    return out
+
+
+def measure(sc: Scenario, prepared: Optional[tuple] = None) -> Result:
+    """Run one scenario, on `prepared` (db, services, ctx) if given, else on a fresh backend."""
+    if prepared is None:
+        db = FakeSupabase()
+        svc = make_services(db)
+        prepared = (db, svc, sc.prepare(db, svc))
+    db, svc, ctx = prepared
+    calls_before, by_before = db.calls, dict(db.calls_by)
+    tracemalloc.start()
+    start = time.perf_counter()
+    sc.run(svc, ctx)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    by_query = {f"{t}.{a}": n - by_before.get((t, a), 0) for (t, a), n in sorted(db.calls_by.items())
+                if n - by_before.get((t, a), 0)}
+    return Result(sc.name, db.calls - calls_before, elapsed, peak, by_query)
+
+
+def _load_budgets() -> Dict[str, int]:
+    if not os.path.exists(BUDGETS_PATH):
+        return {}
+    with open(BUDGETS_PATH, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="suite")
+    parser.add_argument("--only", default=None, help="run scenarios whose name contains this text")
+    parser.add_argument("--sizes", default=",".join(map(str, REPORT_SIZES)),
+                        help="comma-separated synthetic row counts for the report scenarios")
+    parser.add_argument("--update-budgets", action="store_true", help="store the measured round trips as budgets")
+    parser.add_argument("--json", dest="json_path", default=None, help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    selected = [sc for sc in scenarios(sizes) if not args.only or args.only in sc.name]
+    budgets = _load_budgets()
+    if SCAN_PAGE_SIZE != 1000:
+        print(f"note: SCAN_PAGE_SIZE={SCAN_PAGE_SIZE}, budgets were recorded with 1000")
+
+    results, failures = [], []
+    print(f"{'scenario':52s} {'trips':>6s} {'budget':>6s} {'ms':>9s} {'peak KiB':>9s}")
+    fixture = (None, None)
+    for sc in selected:
+        prepared = None
+        if sc.fixture:
+            if fixture[0] != sc.fixture:
+                db = FakeSupabase()
+                svc = make_services(db)
+                fixture = (None, None)  # let the previous one be freed first
+                fixture = (sc.fixture, (db, svc, sc.prepare(db, svc)))
+            prepared = fixture[1]
+        r = measure(sc, prepared)
+        results.append(r)
+        budget = budgets.get(r.name)
+        flag = ""
+        if budget is None:
+            flag = "  (no budget)"
+        elif r.round_trips > budget:
+            flag = "  OVER"
+            failures.append(f"{r.name}: {r.round_trips} round trips > budget {budget} {r.by_query}")
+        print(f"{r.name:52s} {r.round_trips:6d} {budget if budget is not None else '-':>6} "
+              f"{r.seconds * 1000:9.1f} {r.peak_bytes / 1024:9.0f}{flag}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump([r._asdict() for r in results], fh, indent=2)
+    if args.update_budgets:
+        budgets.update({r.name: r.round_trips for r in results})
+        with open(BUDGETS_PATH, "w", encoding="utf-8") as fh:
+            json.dump(dict(sorted(budgets.items())), fh, indent=2)
+            fh.write("\n")
+        print(f"budgets written to {BUDGETS_PATH}")
+        return 0
+    for f in failures:
+        print("FAIL", f)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
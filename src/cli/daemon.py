@@ -0,0 +1,243 @@
+# src/cli/daemon.py
+"""
+Long-running `retail-cli serve` mode.
+
+The daemon keeps one process, with its services, caches and connection pool,
+alive and runs CLI commands sent to it over a Unix socket, or read line by
+line from stdin. `retail-cli` forwards to a running daemon on its own (see
+`forward`), so scripts keep calling the CLI exactly as before.
+
+The socket sits in a directory only its owner can enter, is created mode
+0600, and a client only talks to a socket owned by its own user; a command
+is only forwarded when the daemon uses the same database settings.
+
+Wire format, one JSON object per line:
+    request   {"argv": [...], "cwd": "/path", "settings": {"DB_BACKEND": ..., ...}}
+    response  {"stdout": "..."} / {"stderr": "..."} chunks, then {"exit": code};
+              or {"local": reason} when the caller should run the command itself
+"""
+import json
+import os
+import shlex
+import signal
+import socket
+import socketserver
+import stat
+import struct
+import sys
+import threading
+from typing import Callable, Dict, List, Optional
+
+_local = threading.local()
+
+
+class _ThreadStream:
+    """Stand-in for sys.stdout/sys.stderr that sends each thread's output to its own request."""
+
+    def __init__(self, name: str, default):
+        self._name = name
+        self._default = default
+
+    def write(self, text: str) -> int:
+        send = getattr(_local, "send", None)
+        if send is None:
+            return self._default.write(text)
+        if text:
+            send({self._name: text})
+        return len(text)
+
+    def flush(self) -> None:
+        if getattr(_local, "send", None) is None:
+            self._default.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._default, name)
+
+
+def _install_streams() -> None:
+    if not isinstance(sys.stdout, _ThreadStream):
+        sys.stdout = _ThreadStream("stdout", sys.stdout)
+        sys.stderr = _ThreadStream("stderr", sys.stderr)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        lock = threading.Lock()
+
+        def send(frame):
+            with lock:
+                self.wfile.write((json.dumps(frame) + "\n").encode("utf-8"))
+                self.wfile.flush()
+
+        if not _same_user(self.request):
+            return
+        try:
+            req = json.loads(self.rfile.readline() or b"{}")
+            argv = [str(a) for a in req.get("argv") or []]
+        except ValueError:
+            send({"stderr": "bad request\n"})
+            send({"exit": 2})
+            return
+        if req.get("settings") != self.server.settings:
+            send({"local": "the daemon uses different database settings"})
+            return
+        _local.send = send
+        try:
+            code = self.server.run(argv, req.get("cwd"))
+        except BrokenPipeError:
+            return
+        except Exception as e:
+            print("Error:", e, file=sys.stderr)
+            code = 1
+        finally:
+            _local.send = None
+        send({"exit": code})
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, run: Callable[[List[str], Optional[str]], int], settings: Dict):
+        self.run = run
+        self.settings = settings
+        super().__init__(path, _Handler)
+
+    def server_bind(self):
+        # created 0600 from the start: no window in which another user could connect
+        umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(umask)
+
+
+def _same_user(sock) -> bool:
+    """Whether the peer of a connected Unix socket runs as this user (where the OS can tell)."""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return True
+    _, uid, _ = struct.unpack("3i", sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")))
+    return uid == os.getuid()
+
+
+def _private_dir(path: str) -> Optional[str]:
+    """Create the socket's directory 0700 if needed; returns why it is unsafe, or None."""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid():
+        return f"{path} is not a directory owned by you"
+    if st.st_mode & 0o077:
+        return f"{path} is accessible to other users; use a directory with mode 0700"
+    return None
+
+
+def _owned_socket(path: str) -> bool:
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(st.st_mode) and st.st_uid == os.getuid()
+
+
+def _is_live(path: str) -> bool:
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.connect(path)
+        return True
+    except OSError:
+        return False
+
+
+def serve_socket(path: str, run: Callable[[List[str], Optional[str]], int], settings: Dict) -> int:
+    """Accept commands on the Unix socket at `path` until interrupted; `settings` must match each caller's."""
+    if not hasattr(socket, "AF_UNIX"):
+        print("Error: Unix sockets are not available on this platform; use `serve --stdin`", file=sys.stderr)
+        return 1
+    problem = _private_dir(os.path.dirname(os.path.abspath(path)))
+    if problem:
+        print(f"Error: {problem}", file=sys.stderr)
+        return 1
+    if os.path.lexists(path):
+        if _is_live(path):
+            print(f"Error: a daemon is already listening on {path}", file=sys.stderr)
+            return 1
+        os.unlink(path)  # left behind by a daemon that did not shut down cleanly
+    _install_streams()
+    server = _Server(path, run, settings)
+    print(f"retail-cli serving on {path}", file=sys.stderr, flush=True)
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+    return 0
+
+
+def serve_stdin(run: Callable[[List[str], Optional[str]], int]) -> int:
+    """Run one command per stdin line (e.g. `product list`) until EOF or `exit`."""
+    interactive = sys.stdin.isatty()
+    code = 0
+    while True:
+        if interactive:
+            print("retail> ", end="", flush=True)
+        line = sys.stdin.readline()
+        if not line:
+            break
+        try:
+            argv = shlex.split(line, comments=True)
+        except ValueError as e:
+            print("Error:", e, file=sys.stderr)
+            continue
+        if not argv:
+            continue
+        if argv[0] in ("exit", "quit"):
+            break
+        if argv[0] == "retail-cli":
+            argv = argv[1:]
+        code = run(argv, None)
+        sys.stdout.flush()
+    return code
+
+
+def forward(path: str, argv: List[str], settings: Dict) -> Optional[int]:
+    """
+    Run `argv` on the daemon listening at `path`, streaming its output here.
+    Returns the exit code, or None when the command should run in this process:
+    no daemon is reachable, the socket belongs to another user, or the daemon's
+    database `settings` differ from ours.
+    """
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(path):
+        return None
+    if not _owned_socket(path):
+        print(f"Warning: ignoring {path}, which is not a socket owned by you", file=sys.stderr)
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    with sock, sock.makefile("rb") as reader:
+        sock.sendall((json.dumps({"argv": argv, "cwd": os.getcwd(), "settings": settings}) + "\n").encode("utf-8"))
+        for raw in reader:
+            frame = json.loads(raw)
+            if "exit" in frame:
+                return frame["exit"]
+            if "local" in frame:
+                return None
+            for name, stream in (("stdout", sys.stdout), ("stderr", sys.stderr)):
+                if name in frame:
+                    try:
+                        stream.write(frame[name])
+                        stream.flush()
+                    except BrokenPipeError:  # e.g. piped into `head`; stop quietly like a local run would
+                        os.dup2(os.open(os.devnull, os.O_WRONLY), stream.fileno())
+                        return 1
+    print("Error: daemon closed the connection", file=sys.stderr)
+    return 1
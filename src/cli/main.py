@@ -1,20 +1,31 @@
 # src/cli/main.py
 import argparse
 import json
-from src.services import product_service
-from src.dao.customer_dao import CustomerDAO
-from src.dao.product_dao import ProductDAO
-from src.services import order_service  # the new OrderService module
+import os
+import sys
+from datetime import date
+
+from src.cli.output import add_format_arg, add_paging_args, emit
+
+# Services and DAOs are imported inside the commands that use them, so
+# `--help` and argument errors never load supabase or open a client.
+
+_customer_dao = None
+
+
+def _customers():
+    global _customer_dao
+    if _customer_dao is None:
+        from src.dao.customer_dao import CustomerDAO
+        _customer_dao = CustomerDAO()
+    return _customer_dao
 
-# Instantiate DAOs
-product_dao_instance = ProductDAO()
-customer_dao_instance = CustomerDAO()
-order_service_instance = order_service.default_order_service  # singleton instance
 
 # --------------------- PRODUCT COMMANDS ---------------------
 def cmd_product_add(args):
+    from src.services import product_service
     try:
-        p = product_service.add_product(
+        p = product_service.default_product_service.add_product(
             args.name, args.sku, args.price, args.stock, args.category
         )
         print("Created product:")
@@ -23,14 +34,32 @@ def cmd_product_add(args):
         print("Error:", e)
 
 def cmd_product_list(args):
-    ps = product_dao_instance.list_products(limit=100)
-    print(json.dumps(ps, indent=2, default=str))
+    from src.services import product_service
+    rows = product_service.default_product_service.iter_products(args.category, after=args.after,
+                                                                 page_size=args.page_size)
+    emit(rows, args, key="prod_id")
+
+def _print_import_summary(summary):
+    for err in summary.pop("errors"):
+        print(json.dumps(err))
+    print(json.dumps(summary))
+
+def cmd_product_import(args):
+    from src.services import product_service
+    from src.utils import read_records
+    try:
+        summary = product_service.default_product_service.import_products(
+            read_records(args.file, args.format), args.chunk_size, args.workers, args.skip_existing
+        )
+        _print_import_summary(summary)
+    except Exception as e:
+        print("Error:", e)
 
 
 # --------------------- CUSTOMER COMMANDS ---------------------
 def cmd_customer_add(args):
     try:
-        c = customer_dao_instance.create(
+        c = _customers().create(
             args.name, args.email, args.phone, args.city
         )
         if c:
@@ -41,6 +70,24 @@ def cmd_customer_add(args):
     except Exception as e:
         print("Error:", e)
 
+def cmd_customer_list(args):
+    emit(_customers().iter_customers(after=args.after, page_size=args.page_size), args, key="cust_id")
+
+def cmd_customer_search(args):
+    rows = _customers().iter_customers(args.email, args.city, after=args.after, page_size=args.page_size)
+    emit(rows, args, key="cust_id")
+
+def cmd_customer_import(args):
+    from src.services import customer_service
+    from src.utils import read_records
+    try:
+        summary = customer_service.default_customer_service.import_customers(
+            read_records(args.file, args.format), args.chunk_size, args.workers, args.skip_existing
+        )
+        _print_import_summary(summary)
+    except Exception as e:
+        print("Error:", e)
+
 
 # --------------------- ORDER COMMANDS ---------------------
 def cmd_order_create(args):
@@ -52,31 +99,65 @@ def cmd_order_create(args):
         except Exception:
             print("Invalid item format:", item)
             return
+    from src.services import order_service
     try:
-        ord = order_service_instance.create_order(args.customer, items)
+        ord = order_service.default_order_service.create_order(args.customer, items)
         print("Order created:")
         print(json.dumps(ord, indent=2, default=str))
     except Exception as e:
         print("Error:", e)
 
+def cmd_order_create_batch(args):
+    from src.services import order_service
+    from src.utils import read_records
+    try:
+        results = order_service.default_order_service.create_orders_from_records(
+            read_records(args.file, "jsonl"), args.batch_size, args.workers
+        )
+        for line, r in results:
+            if "order" in r:
+                o = r["order"]
+                out = {"line": line, "order_id": o["order_id"], "customer_id": o["customer_id"],
+                       "total_amount": o["total_amount"], "status": o["status"], "items": len(o.get("items", []))}
+            else:
+                out = {"line": line, "error": r["error"]}
+            print(json.dumps(out, default=str), flush=True)
+    except Exception as e:
+        print("Error:", e)
+
 def cmd_order_show(args):
+    from src.services import order_service
     try:
-        o = order_service_instance.get_order_details(args.order)
+        service = order_service.default_order_service
+        if args.customer is not None:
+            o = service.customer_orders_details(args.customer)
+        elif len(args.order) == 1:
+            o = service.get_order_details(args.order[0])
+        else:
+            o = service.get_orders_details(args.order)
         print(json.dumps(o, indent=2, default=str))
     except Exception as e:
         print("Error:", e)
 
+def cmd_order_list(args):
+    from src.services import order_service
+    rows = order_service.default_order_service.iter_orders(args.customer, args.status, after=args.after,
+                                                           page_size=args.page_size)
+    emit(rows, args, key="order_id")
+
 def cmd_order_cancel(args):
+    from src.services import order_service
     try:
-        o = order_service_instance.cancel_order(args.order)
+        o = order_service.default_order_service.cancel_order(args.order)
         print("Order cancelled (updated):")
         print(json.dumps(o, indent=2, default=str))
     except Exception as e:
         print("Error:", e)
 
 def cmd_order_complete(args):
+    from src.services import order_service
     try:
-        o = order_service_instance.complete_order(args.order)
+        o = order_service.default_order_service.complete_order(args.order)
         print("Order marked as COMPLETED:")
         print(json.dumps(o, indent=2, default=str))
     except Exception as e:
@@ -95,44 +176,170 @@ def cmd_payment_process(args):
     except Exception as e:
         print("Error:", e)
 
-# refund payment
+# refund payment, or every payment listed in a file
 def cmd_payment_refund(args):
     from src.services import payment_service
     try:
-        p = payment_service.default_payment_service.refund_payment(args.order)
+        service = payment_service.default_payment_service
+        if args.file:
+            _print_import_summary(service.refund_payments(_settlement_records(args), args.chunk_size, args.workers))
+            return
+        p = service.refund_payment(args.order)
         print("Payment refunded:")
         print(json.dumps(p, indent=2))
     except Exception as e:
         print("Error:", e)
 
+# settle every payment listed in a gateway file
+def cmd_payment_settle(args):
+    from src.services import payment_service
+    try:
+        summary = payment_service.default_payment_service.settle_payments(
+            _settlement_records(args), args.chunk_size, args.workers
+        )
+        _print_import_summary(summary)
+    except Exception as e:
+        print("Error:", e)
+
+def _settlement_records(args):
+    from src.utils import read_records
+    return read_records(args.file, args.format)
+
 # --------------------- REPORT COMMANDS ---------------------
 
-def cmd_report_top5(args):
+def _reports(args):
+    # --snapshot answers from the local columnar snapshot instead of the database
+    if getattr(args, "snapshot", False):
+        from src.services import analytics_service
+        return analytics_service.default_analytics_service
     from src.services import report_service
-    data = report_service.default_report_service.top_5_products()
-    print(json.dumps(data, indent=2))
+    return report_service.default_report_service
+
+def cmd_report_top5(args):
+    try:
+        data = _reports(args).top_5_products()
+        print(json.dumps(data, indent=2))
+    except Exception as e:
+        print("Error:", e)
 
 def cmd_report_revenue(args):
+    if args.start is None and args.end is None and args.by is None:
+        try:
+            data = _reports(args).total_revenue_last_month()
+            print("Total revenue last month:", data)
+        except Exception as e:
+            print("Error:", e)
+        return
+    if args.snapshot:
+        print("Error: --snapshot only answers the 30-day total; drop --from/--to/--by")
+        return
     from src.services import report_service
-    data = report_service.default_report_service.total_revenue_last_month()
-    print("Total revenue last month:", data)
+    data = report_service.default_report_service.revenue_report(args.start, args.end, args.by or "day")
+    print(json.dumps(data, indent=2))
 
 def cmd_report_orders(args):
-    from src.services import report_service
-    data = report_service.default_report_service.orders_per_customer()
-    print(json.dumps(data, indent=2))
+    try:
+        rows = _reports(args).iter_customer_orders(after=args.after, page_size=args.page_size)
+        emit(rows, args, key="customer_id")
+    except Exception as e:
+        print("Error:", e)
 
 def cmd_report_frequent(args):
+    try:
+        rows = _reports(args).iter_customer_orders(min_orders=3, after=args.after, page_size=args.page_size)
+        emit(rows, args, key="customer_id")
+    except Exception as e:
+        print("Error:", e)
+
+def cmd_report_snapshot(args):
+    from src.dao.snapshot_dao import SnapshotDAO
+    try:
+        dao = SnapshotDAO()
+        data = dao.refresh(full=args.full, recheck_days=args.recheck_days)
+        print(f"Snapshot in {dao.path} {'rebuilt' if args.full else 'refreshed'}:")
+        print(json.dumps(data, indent=2))
+    except Exception as e:
+        print("Error:", e)
+
+def cmd_report_rfm(args):
+    from src.services import analytics_service
+    try:
+        service = analytics_service.default_analytics_service
+        if args.customers or args.segment:
+            emit(service.iter_rfm(args.segment, after=args.after, page_size=args.page_size), args, key="customer_id")
+        else:
+            emit(iter(service.rfm_segments()), args)
+    except Exception as e:
+        print("Error:", e)
+
+def cmd_report_co_purchase(args):
+    from src.services import analytics_service
+    try:
+        data = analytics_service.default_analytics_service.co_purchase(args.product, args.limit)
+        emit(iter(data), args)
+    except Exception as e:
+        print("Error:", e)
+
+def cmd_report_all(args):
+    import asyncio
+    from src.config import close_async_supabase
+    from src.services import report_service
+
+    async def run():
+        try:
+            return await (await report_service.AsyncReportService.connect()).all_reports()
+        finally:
+            await close_async_supabase()
+
+    print(json.dumps(asyncio.run(run()), indent=2, default=str))
+
+def cmd_report_low_stock(args):
+    from src.services import product_service
+    rows = product_service.default_product_service.iter_low_stock(args.threshold, after=args.after,
+                                                                  page_size=args.page_size)
+    emit(rows, args, key="prod_id")
+
+def cmd_report_reorder(args):
+    from src.services import report_service
+    data = report_service.default_report_service.reorder_report(
+        days=args.days, horizon=args.horizon, threshold=args.threshold, limit=args.limit)
+    emit(iter(data), args)
+
+def cmd_report_rebuild(args):
     from src.services import report_service
-    data = report_service.default_report_service.frequent_customers()
+    service = report_service.default_report_service
+    data = service.refresh_revenue() if args.changed else service.rebuild_rollups()
+    print("Rollups rebuilt:")
     print(json.dumps(data, indent=2))
 
 
 
 
 # --------------------- PARSER SETUP ---------------------
+def _add_import_args(p):
+    p.add_argument("--file", required=True)
+    p.add_argument("--format", choices=["csv", "jsonl"], default=None, help="default: from file extension")
+    p.add_argument("--chunk-size", type=int, default=500)
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--skip-existing", action="store_true", help="leave rows that already exist untouched")
+
+def _add_settlement_args(p):
+    p.add_argument("--format", choices=["csv", "jsonl"], default=None, help="default: from file extension")
+    p.add_argument("--chunk-size", type=int, default=500)
+    p.add_argument("--workers", type=int, default=4)
+
+def _add_snapshot_arg(p):
+    p.add_argument("--snapshot", action="store_true",
+                   help="answer from the local snapshot (`report snapshot`) instead of the database")
+
 def build_parser():
     parser = argparse.ArgumentParser(prog="retail-cli")
+    parser.add_argument("--profile", action="store_true",
+                        help="trace every query and print the slowest calls and round trips to stderr")
+    parser.add_argument("--profile-json", metavar="PATH", default=None,
+                        help="like --profile, but write the summary as JSON to PATH")
+    parser.add_argument("--trace-sink", metavar="PATH", default=None,
+                        help="append every traced query to PATH as JSON lines")
     sub = parser.add_subparsers(dest="cmd")
 
     # Product
@@ -145,8 +352,13 @@ def build_parser():
     addp.add_argument("--stock", type=int, default=0)
     addp.add_argument("--category", default=None)
     addp.set_defaults(func=cmd_product_add)
-    listp = pprod_sub.add_parser("list")
+    listp = pprod_sub.add_parser("list", help="products by id, a page at a time (--all for every page)")
+    listp.add_argument("--category", default=None)
+    add_paging_args(listp)
     listp.set_defaults(func=cmd_product_list)
+    impp = pprod_sub.add_parser("import", help="bulk upsert products from a CSV/JSONL file")
+    _add_import_args(impp)
+    impp.set_defaults(func=cmd_product_import)
 
     # Customer
     pcust = sub.add_parser("customer")
@@ -157,6 +369,17 @@ def build_parser():
     addc.add_argument("--phone", required=True)
     addc.add_argument("--city", default=None)
     addc.set_defaults(func=cmd_customer_add)
+    listc = pcust_sub.add_parser("list", help="customers by id, a page at a time (--all for every page)")
+    add_paging_args(listc)
+    listc.set_defaults(func=cmd_customer_list)
+    searchc = pcust_sub.add_parser("search", help="customers matching an email and/or city")
+    searchc.add_argument("--email", default=None)
+    searchc.add_argument("--city", default=None)
+    add_paging_args(searchc)
+    searchc.set_defaults(func=cmd_customer_search)
+    impc = pcust_sub.add_parser("import", help="bulk upsert customers from a CSV/JSONL file")
+    _add_import_args(impc)
+    impc.set_defaults(func=cmd_customer_import)
 
     # Order
     porder = sub.add_parser("order")
@@ -166,10 +389,24 @@ def build_parser():
     createo.add_argument("--item", required=True, nargs="+", help="prod_id:qty (repeatable)")
     createo.set_defaults(func=cmd_order_create)
 
-    showo = porder_sub.add_parser("show")
-    showo.add_argument("--order", type=int, required=True)
+    batcho = porder_sub.add_parser("create-batch", help="place orders from a JSONL file, one result per line (NDJSON)")
+    batcho.add_argument("--file", required=True, help='lines like {"customer_id": 1, "items": [{"prod_id": 2, "qty": 1}]}')
+    batcho.add_argument("--batch-size", type=int, default=200)
+    batcho.add_argument("--workers", type=int, default=4)
+    batcho.set_defaults(func=cmd_order_create_batch)
+
+    showo = porder_sub.add_parser("show", help="orders with items, products, customer and payments")
+    which = showo.add_mutually_exclusive_group(required=True)
+    which.add_argument("--order", type=int, nargs="+", help="one or more order ids")
+    which.add_argument("--customer", type=int, help="every order of this customer")
     showo.set_defaults(func=cmd_order_show)
 
+    listo = porder_sub.add_parser("list", help="orders by id, a page at a time (--all for every page)")
+    listo.add_argument("--customer", type=int, default=None)
+    listo.add_argument("--status", default=None, help="e.g. PLACED, COMPLETED, CANCELLED")
+    add_paging_args(listo)
+    listo.set_defaults(func=cmd_order_list)
+
     cano = porder_sub.add_parser("cancel")
     cano.add_argument("--order", type=int, required=True)
     cano.set_defaults(func=cmd_order_cancel)
@@ -188,8 +425,16 @@ def build_parser():
     proc.add_argument("--method", choices=["Cash","Card","UPI"], required=True)
     proc.set_defaults(func=cmd_payment_process)
 
-    refund = p_pay_sub.add_parser("refund")
-    refund.add_argument("--order", type=int, required=True)
+    settle = p_pay_sub.add_parser("settle", help="mark the payments in a settlement file PAID (safe to re-run)")
+    settle.add_argument("--file", required=True, help="CSV/JSONL with order_id, method and optional amount")
+    _add_settlement_args(settle)
+    settle.set_defaults(func=cmd_payment_settle)
+
+    refund = p_pay_sub.add_parser("refund", help="refund one order's payment, or every one in a file (safe to re-run)")
+    which = refund.add_mutually_exclusive_group(required=True)
+    which.add_argument("--order", type=int)
+    which.add_argument("--file", help="CSV/JSONL with order_id and optional amount")
+    _add_settlement_args(refund)
     refund.set_defaults(func=cmd_payment_refund)
 
 
@@ -199,27 +444,202 @@ def build_parser():
     p_report_sub = p_report.add_subparsers(dest="action")
 
     p_top5 = p_report_sub.add_parser("top5")
+    _add_snapshot_arg(p_top5)
     p_top5.set_defaults(func=cmd_report_top5)
 
-    p_rev = p_report_sub.add_parser("revenue")
+    p_rev = p_report_sub.add_parser("revenue", help="last 30 days' total, or a breakdown with --from/--to/--by")
+    p_rev.add_argument("--from", dest="start", type=date.fromisoformat, default=None, metavar="YYYY-MM-DD")
+    p_rev.add_argument("--to", dest="end", type=date.fromisoformat, default=None, metavar="YYYY-MM-DD")
+    p_rev.add_argument("--by", choices=["day", "week", "month"], default=None, help="bucket size (default: day)")
+    _add_snapshot_arg(p_rev)
     p_rev.set_defaults(func=cmd_report_revenue)
 
     p_orders = p_report_sub.add_parser("orders_per_customer")
+    add_paging_args(p_orders, page_size=None)
+    _add_snapshot_arg(p_orders)
     p_orders.set_defaults(func=cmd_report_orders)
 
     p_freq = p_report_sub.add_parser("frequent_customers")
+    add_paging_args(p_freq, page_size=None)
+    _add_snapshot_arg(p_freq)
     p_freq.set_defaults(func=cmd_report_frequent)
 
+    p_all = p_report_sub.add_parser("all", help="run every report concurrently")
+    p_all.set_defaults(func=cmd_report_all)
+
+    p_low = p_report_sub.add_parser("low-stock", help="every product at or below a stock threshold")
+    p_low.add_argument("--threshold", type=int, default=5)
+    add_paging_args(p_low, page_size=None)
+    p_low.set_defaults(func=cmd_report_low_stock)
+
+    p_reorder = p_report_sub.add_parser("reorder", help="products ranked by days of stock left at recent sales rates")
+    p_reorder.add_argument("--days", type=int, default=30, help="sales window for the velocity (default 30)")
+    p_reorder.add_argument("--horizon", type=int, default=14, help="list products running out within this many days")
+    p_reorder.add_argument("--threshold", type=int, default=5, help="always list products at or below this stock")
+    p_reorder.add_argument("--limit", type=int, default=None)
+    add_format_arg(p_reorder)
+    p_reorder.set_defaults(func=cmd_report_reorder)
+
+    p_snap = p_report_sub.add_parser("snapshot", help="export sales tables to the local columnar snapshot (incremental)")
+    p_snap.add_argument("--full", action="store_true", help="rebuild from scratch instead of adding what changed")
+    p_snap.add_argument("--recheck-days", type=int, default=None,
+                        help="re-read statuses of rows created this many days back (default: $SNAPSHOT_RECHECK_DAYS)")
+    p_snap.set_defaults(func=cmd_report_snapshot)
+
+    p_rfm = p_report_sub.add_parser("rfm", help="RFM segments from the snapshot (--customers for every customer)")
+    p_rfm.add_argument("--customers", action="store_true", help="one row per customer instead of per segment")
+    p_rfm.add_argument("--segment", default=None, help="only customers in this segment (implies --customers)")
+    add_paging_args(p_rfm, page_size=None)
+    p_rfm.set_defaults(func=cmd_report_rfm)
+
+    p_co = p_report_sub.add_parser("co-purchase", help="products bought together, from the snapshot")
+    p_co.add_argument("--product", type=int, default=None, help="products bought with this one (default: top pairs)")
+    p_co.add_argument("--limit", type=int, default=10)
+    add_format_arg(p_co)
+    p_co.set_defaults(func=cmd_report_co_purchase)
+
+    p_rebuild = p_report_sub.add_parser("rebuild", help="recompute report rollups from raw orders")
+    p_rebuild.add_argument("--changed", action="store_true",
+                           help="only rebuild the revenue breakdown for days changed since the last rebuild")
+    p_rebuild.set_defaults(func=cmd_report_rebuild)
+
+    # serve
+    p_serve = sub.add_parser("serve", help="keep services warm and run commands sent to this process")
+    p_serve.add_argument("--socket", default=None, help="Unix socket to listen on (default: $RETAIL_CLI_SOCKET)")
+    p_serve.add_argument("--stdin", action="store_true", help="read one command per line from stdin instead")
+    p_serve.set_defaults(func=cmd_serve)
+
     return parser
 
 
-def main():
+def _print_profile(summary, top=10):
+    err = sys.stderr
+    print(f"\n{summary['round_trips']} round trips, {summary['seconds'] * 1000:.1f} ms in queries", file=err)
+    for title, key in (("by service method", "by_service"), ("by query", "by_query")):
+        print(f"{title}:", file=err)
+        for name, s in summary[key].items():
+            print(f"  {name:48s} {s['round_trips']:5d} trips {s['seconds'] * 1000:9.1f} ms {s['rows']:7d} rows",
+                  file=err)
+    print(f"slowest {min(top, len(summary['slowest']))} calls:", file=err)
+    for s in summary["slowest"]:
+        print(f"  {s['seconds'] * 1000:8.1f} ms  {s['table']}.{s['op']} {'; '.join(s['filters'])}  "
+              f"rows={s['rows']} bytes={s['bytes']}  [{s['service'] or s['dao'] or '-'}]", file=err)
+
+
+# --------------------- DAEMON ---------------------
+# options holding file paths; a forwarded command's relative paths are resolved against the caller's cwd
+_PATH_ARGS = ("file", "profile_json", "trace_sink")
+# tracing is process-wide, so profiled commands always run in their own process
+_LOCAL_ONLY_FLAGS = ("--profile", "--profile-json", "--trace-sink")
+
+
+def _warm_up():
+    # build the default services now so the first command doesn't pay for it
+    from src.services import order_service, payment_service, product_service, report_service
+    try:
+        for module, name in ((product_service, "default_product_service"), (order_service, "default_order_service"),
+                             (payment_service, "default_payment_service"), (report_service, "default_report_service")):
+            getattr(module, name)
+        _customers()
+    except Exception as e:
+        print("Warning: could not initialise services:", e, file=sys.stderr)
+
+
+# the default instances, per service module; a profiled command sets aside the ones already built
+_DEFAULT_SERVICES = (("product_service", "default_product_service"), ("customer_service", "default_customer_service"),
+                     ("order_service", "default_order_service"), ("payment_service", "default_payment_service"),
+                     ("report_service", "default_report_service"),
+                     ("analytics_service", "default_analytics_service"))
+
+
+def _set_aside_services():
+    """
+    Take the default services built so far (e.g. warmed up by `serve --stdin`) out of their
+    modules, so the command builds fresh ones on the traced client. Returns what
+    _restore_services needs to put them back.
+    """
+    global _customer_dao
+    saved = [(None, "_customer_dao", _customer_dao)]
+    _customer_dao = None
+    for name, attr in _DEFAULT_SERVICES:
+        module = sys.modules.get(f"src.services.{name}")
+        if module is not None and attr in vars(module):
+            saved.append((module, attr, vars(module)[attr]))
+            delattr(module, attr)
+    return saved
+
+
+def _restore_services(saved):
+    global _customer_dao
+    for module, attr, value in saved:
+        if module is None:
+            _customer_dao = value
+        else:
+            setattr(module, attr, value)
+
+
+def cmd_serve(args):
+    from src.cli import daemon
+    from src.config import CLI_SOCKET, backend_settings
+    _warm_up()
+    if args.stdin:
+        return daemon.serve_stdin(run)
+    return daemon.serve_socket(args.socket or CLI_SOCKET, run, backend_settings())
+
+
+def run(argv, cwd=None):
+    """Parse and run one command line; returns its exit status."""
     parser = build_parser()
-    args = parser.parse_args()
+    try:
+        args = parser.parse_args(argv)
+    except SystemExit as e:  # --help or a usage error
+        return e.code or 0
     if not hasattr(args, "func"):
         parser.print_help()
-        return
-    args.func(args)
+        return 0
+    if cwd:
+        for name in _PATH_ARGS:
+            value = getattr(args, name, None)
+            if value and not os.path.isabs(value):
+                setattr(args, name, os.path.join(cwd, value))
+    if args.func is cmd_serve and cwd:
+        print("Error: serve cannot be forwarded to a daemon", file=sys.stderr)
+        return 2
+    profiled = args.profile or args.profile_json or args.trace_sink
+    if profiled and cwd:
+        # the socket daemon runs commands side by side, and tracing is process-wide
+        print("Error: profiled commands cannot be forwarded to a daemon", file=sys.stderr)
+        return 2
+    if not profiled:
+        return args.func(args) or 0
+    from src import tracing
+    tracer = tracing.enable([tracing.jsonl_sink(args.trace_sink)] if args.trace_sink else None)
+    saved = _set_aside_services()
+    try:
+        return args.func(args) or 0
+    finally:
+        tracing.disable()
+        _restore_services(saved)
+        if args.profile or args.profile_json:
+            summary = tracer.summary()
+            if args.profile_json:
+                with open(args.profile_json, "w", encoding="utf-8") as fh:
+                    json.dump(summary, fh, indent=2, default=str)
+            else:
+                _print_profile(summary)
+
+
+def main():
+    argv = sys.argv[1:]
+    # hand the command to a running `serve` daemon when there is one
+    if argv and argv[0] not in ("serve", "-h", "--help") and not any(
+            a.split("=")[0] in _LOCAL_ONLY_FLAGS for a in argv) and os.getenv("RETAIL_CLI_NO_DAEMON") != "1":
+        from src.cli import daemon
+        from src.config import CLI_SOCKET, backend_settings
+        code = daemon.forward(CLI_SOCKET, argv, backend_settings())
+        if code is not None:
+            sys.exit(code)
+    sys.exit(run(argv))
 
 
 if __name__ == "__main__":
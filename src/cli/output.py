@@ -0,0 +1,108 @@
+# src/cli/output.py
+"""
+Streaming output for list and report commands.
+
+Rows are written as they arrive from the DAO's keyset pages, so memory stays
+flat and the first page shows up before the last one is fetched:
+
+    json    the usual indented JSON array (the default)
+    ndjson  one JSON object per line
+    csv     a header from the first row's keys, nested values as JSON
+
+Without --all a list command prints one page and, when more may follow,
+the cursor for the next one on stderr (`--after <key>`). Reports print
+every row unless given a --page-size.
+"""
+import csv
+import io
+import itertools
+import json
+import sys
+from typing import Dict, Iterable, Optional
+
+FORMATS = ("json", "ndjson", "csv")
+DEFAULT_PAGE_SIZE = 100
+
+
+def add_format_arg(p) -> None:
+    p.add_argument("--format", choices=FORMATS, default="json")
+
+
+def add_paging_args(p, page_size: Optional[int] = DEFAULT_PAGE_SIZE) -> None:
+    """--format, --after, --page-size and --all; with page_size=None the default is every row."""
+    add_format_arg(p)
+    p.add_argument("--after", type=int, default=None, help="start after this id (the cursor printed last time)")
+    p.add_argument("--page-size", type=int, default=page_size,
+                   help=f"rows per page (default {page_size or 'all rows'})")
+    p.add_argument("--all", action="store_true", help="stream every page instead of just the first")
+
+
+def _cell(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return "" if value is None else value
+
+
+def _encode(rows, fmt: str, state: Dict) -> str:
+    if fmt == "ndjson":
+        return "".join(json.dumps(r, default=str) + "\n" for r in rows)
+    if fmt == "csv":
+        text = io.StringIO()
+        writer = csv.DictWriter(text, fieldnames=state.setdefault("fields", list(rows[0])),
+                                extrasaction="ignore", lineterminator="\n")
+        if not state.get("header"):
+            writer.writeheader()
+            state["header"] = True
+        writer.writerows({k: _cell(v) for k, v in r.items()} for r in rows)
+        return text.getvalue()
+    # a page dumped as one indented array, minus its brackets, is the array's next elements
+    body = json.dumps(rows, indent=2, default=str)[2:-2]
+    sep = ",\n" if state.get("started") else "\n"
+    state["started"] = True
+    return sep + body
+
+
+def write_rows(rows: Iterable[Dict], fmt: str = "json", out=None, flush_every: int = DEFAULT_PAGE_SIZE) -> int:
+    """Write `rows` to `out` (stdout) as they come, flushing every `flush_every` rows; returns the count."""
+    out = out or sys.stdout
+    state: Dict = {}
+    pending, n = [], 0
+    if fmt == "json":
+        out.write("[")
+    for row in rows:
+        pending.append(row)
+        n += 1
+        # the first row goes out at once, then a page at a time
+        if n == 1 or n % flush_every == 0:
+            out.write(_encode(pending, fmt, state))
+            out.flush()
+            pending = []
+    if pending:
+        out.write(_encode(pending, fmt, state))
+    if fmt == "json":
+        out.write("\n]\n" if n else "]\n")
+    out.flush()
+    return n
+
+
+def emit(rows: Iterable[Dict], args, key: Optional[str] = None) -> int:
+    """
+    Print one page of `rows` (or all of them with --all) in --format.
+    When a page comes back full, the `key` of its last row is the cursor for the next page.
+    """
+    from src.config import SCAN_PAGE_SIZE
+    # commands without paging arguments always print every row
+    every = getattr(args, "all", False) or getattr(args, "page_size", None) is None
+    page_size = max(getattr(args, "page_size", None) or SCAN_PAGE_SIZE, 1)
+    if not every:
+        rows = itertools.islice(rows, page_size)
+    last = {}
+
+    def track(it):
+        for row in it:
+            last["row"] = row
+            yield row
+    n = write_rows(track(rows), args.format, flush_every=page_size)
+    if key and not every and n == page_size and "row" in last:
+        print(f"next page: --after {last['row'][key]}", file=sys.stderr)
+    return n
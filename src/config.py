@@ -1,19 +1,240 @@
 # src/config.py
 import os
+import atexit
+import tempfile
+import threading
+from typing import TYPE_CHECKING, Dict, Optional
+
 from dotenv import load_dotenv
-from supabase import create_client, Client
- 
+
+from src import tracing
+
+if TYPE_CHECKING:  # supabase/httpx are heavy; imported on first get_supabase()
+    import httpx
+    from supabase import AsyncClient, Client
+    from src.dao.sqlite_client import SQLiteClient
+
 load_dotenv()  # loads .env from project root
- 
+
+# storage backend: "supabase" (default) or "sqlite" for a local database file at SQLITE_PATH
+DB_BACKEND = os.getenv("DB_BACKEND", "supabase").strip().lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", "retail.db")
+
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
- 
-def get_supabase() -> Client:
+
+# connection pool settings for the shared client
+SUPABASE_POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", "10"))
+SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "30"))
+SUPABASE_CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "5"))
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "30"))
+
+# Unix socket of the `retail-cli serve` daemon; the CLI forwards to it when it is running.
+# It lives in a directory only this user can enter: $XDG_RUNTIME_DIR, or a 0700 one in the temp dir
+CLI_SOCKET = os.getenv("RETAIL_CLI_SOCKET") or os.path.join(
+    os.getenv("XDG_RUNTIME_DIR") or os.path.join(
+        tempfile.gettempdir(), f"retail-cli-{os.getuid() if hasattr(os, 'getuid') else 'user'}"),
+    "retail-cli.sock")
+
+# max concurrent requests per fan-out in the async DAOs/services
+ASYNC_CONCURRENCY = int(os.getenv("ASYNC_CONCURRENCY", "8"))
+
+# rows per request for paginated table scans; keep <= the API's max-rows cap
+SCAN_PAGE_SIZE = int(os.getenv("SCAN_PAGE_SIZE", "1000"))
+
+# columnar analytics snapshot (`report snapshot`); order and payment statuses of rows
+# created in the last SNAPSHOT_RECHECK_DAYS are re-read on each refresh. Resolved once, so a
+# daemon and the CLIs forwarding to it name the same directory
+SNAPSHOT_DIR = os.path.abspath(os.getenv("SNAPSHOT_DIR", "snapshot"))
+SNAPSHOT_RECHECK_DAYS = int(os.getenv("SNAPSHOT_RECHECK_DAYS", "30"))
+
+# in-process product/customer row cache; size 0 turns it off
+ENTITY_CACHE_SIZE = int(os.getenv("ENTITY_CACHE_SIZE", "1000"))
+ENTITY_CACHE_TTL = float(os.getenv("ENTITY_CACHE_TTL", "30"))
+
+_lock = threading.Lock()
+_client: Optional["Client"] = None
+_sqlite: Optional["SQLiteClient"] = None
+_http: Optional["httpx.Client"] = None
+_stats = {
+    "clients_created": 0,
+    "client_reuses": 0,
+    "connections_opened": 0,
+    "requests": 0,
+}
+
+
+def _trace(event: str, info: Dict) -> None:
+    # httpcore trace hook: one connect per new socket, one send per request
+    if event == "connection.connect_tcp.complete":
+        with _lock:
+            _stats["connections_opened"] += 1
+    elif event.endswith(".send_request_headers.started"):
+        with _lock:
+            _stats["requests"] += 1
+
+
+def _attach_trace(request: "httpx.Request") -> None:
+    request.extensions["trace"] = _trace
+
+
+def _http_settings() -> Dict:
+    import httpx
+
+    return dict(
+        http2=True,
+        follow_redirects=True,
+        limits=httpx.Limits(
+            max_connections=SUPABASE_POOL_SIZE,
+            max_keepalive_connections=SUPABASE_POOL_SIZE,
+            keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(SUPABASE_TIMEOUT, connect=SUPABASE_CONNECT_TIMEOUT),
+    )
+
+
+def _build_http_client() -> "httpx.Client":
+    import httpx
+
+    return httpx.Client(event_hooks={"request": [_attach_trace]}, **_http_settings())
+
+
+def get_supabase() -> "Client":
     """
-    Return a supabase client. Raises RuntimeError if config missing.
+    Return the process-wide supabase client. Raises RuntimeError if config missing.
+
+    The client is created once and shared by every DAO; its HTTP connections
+    are kept alive in a bounded pool, so repeated calls are cheap and safe
+    from multiple threads.
     """
+    global _client, _http
     if not SUPABASE_URL or not SUPABASE_KEY:
         raise RuntimeError("SUPABASE_URL and SUPABASE_KEY must be set in environment (.env)")
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
- 
- 
\ No newline at end of file
+    with _lock:
+        if _client is not None:
+            _stats["client_reuses"] += 1
+            return _client
+        from supabase import create_client
+        from supabase.lib.client_options import SyncClientOptions
+
+        _http = _build_http_client()
+        _client = create_client(
+            SUPABASE_URL, SUPABASE_KEY, options=SyncClientOptions(httpx_client=_http)
+        )
+        _stats["clients_created"] += 1
+        return _client
+
+
+# async client: one per event loop, since its connections belong to the loop that opened them
+_async_clients: Dict[int, tuple] = {}
+
+
+async def _attach_trace_async(request: "httpx.Request") -> None:
+    request.extensions["trace"] = _trace
+
+
+async def get_async_supabase() -> "AsyncClient":
+    """Return the shared async supabase client for the running event loop."""
+    import asyncio
+
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        raise RuntimeError("SUPABASE_URL and SUPABASE_KEY must be set in environment (.env)")
+    loop_id = id(asyncio.get_running_loop())
+    with _lock:
+        entry = _async_clients.get(loop_id)
+        if entry:
+            _stats["client_reuses"] += 1
+            return entry[0]
+    import httpx
+    from supabase import acreate_client
+    from supabase.lib.client_options import AsyncClientOptions
+
+    http = httpx.AsyncClient(event_hooks={"request": [_attach_trace_async]}, **_http_settings())
+    client = await acreate_client(SUPABASE_URL, SUPABASE_KEY, options=AsyncClientOptions(httpx_client=http))
+    with _lock:
+        if loop_id in _async_clients:  # another task won the race
+            spare, (client, _) = http, _async_clients[loop_id]
+        else:
+            spare = None
+            _async_clients[loop_id] = (client, http)
+            _stats["clients_created"] += 1
+    if spare is not None:
+        await spare.aclose()
+    return client
+
+
+async def close_async_supabase() -> None:
+    """Close the async client for the running event loop, if any."""
+    import asyncio
+
+    with _lock:
+        entry = _async_clients.pop(id(asyncio.get_running_loop()), None)
+    if entry:
+        await entry[1].aclose()
+
+
+def get_sqlite() -> "SQLiteClient":
+    """Return the process-wide SQLite client for SQLITE_PATH, creating the schema on first use."""
+    global _sqlite
+    with _lock:
+        if _sqlite is None:
+            from src.dao.sqlite_client import SQLiteClient
+
+            _sqlite = SQLiteClient(SQLITE_PATH)
+        return _sqlite
+
+
+def get_client():
+    """
+    The shared client for the configured DB_BACKEND; what the DAOs use when none is passed in.
+    Wrapped for query tracing when src.tracing is enabled.
+    """
+    if DB_BACKEND == "sqlite":
+        return tracing.traced(get_sqlite())
+    if DB_BACKEND != "supabase":
+        raise RuntimeError(f"Unknown DB_BACKEND {DB_BACKEND!r}; expected 'supabase' or 'sqlite'")
+    return tracing.traced(get_supabase())
+
+
+async def get_async_client():
+    """Async counterpart of get_client()."""
+    if DB_BACKEND == "sqlite":
+        return tracing.traced(get_sqlite().aio())
+    if DB_BACKEND != "supabase":
+        raise RuntimeError(f"Unknown DB_BACKEND {DB_BACKEND!r}; expected 'supabase' or 'sqlite'")
+    return tracing.traced(await get_async_supabase())
+
+
+def backend_settings() -> Dict[str, Optional[str]]:
+    """What a `serve` daemon and a forwarding CLI must agree on to be using the same database."""
+    return {"DB_BACKEND": DB_BACKEND, "SQLITE_PATH": os.path.abspath(SQLITE_PATH), "SUPABASE_URL": SUPABASE_URL,
+            "SNAPSHOT_DIR": SNAPSHOT_DIR}
+
+
+def close_supabase() -> None:
+    """Close the shared client and its connection pool. Safe to call twice."""
+    global _client, _http
+    with _lock:
+        http, _client, _http = _http, None, None
+    if http is not None:
+        http.close()
+
+
+def close_sqlite() -> None:
+    global _sqlite
+    with _lock:
+        db, _sqlite = _sqlite, None
+    if db is not None:
+        db.close()
+
+
+def connection_stats() -> Dict[str, int]:
+    """Counters for the shared client: clients created/reused, connections opened/reused."""
+    with _lock:
+        stats = dict(_stats)
+    stats["connections_reused"] = max(stats["requests"] - stats["connections_opened"], 0)
+    return stats
+
+
+atexit.register(close_supabase)
+atexit.register(close_sqlite)
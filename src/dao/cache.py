@@ -0,0 +1,95 @@
+# src/dao/cache.py
+"""In-process read-through cache for entity rows (products, customers)."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence
+from src.config import ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL
+
+
+class EntityCache:
+    """
+    LRU cache of rows with a TTL, bounded to `max_size` rows.
+
+    Rows are stored once under their primary key (`key_fields[0]`) and can also
+    be looked up by the other unique fields, e.g. ("prod_id", "sku").
+    """
+
+    def __init__(self, key_fields: Sequence[str], max_size: int = 1000, ttl: float = 30.0):
+        self.key_fields = tuple(key_fields)
+        self.max_size = max_size
+        self.ttl = ttl
+        self._rows: "OrderedDict[object, tuple]" = OrderedDict()  # pk -> (expires_at, row)
+        self._aliases: Dict[tuple, object] = {}  # (field, value) -> pk
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def _drop(self, pk) -> None:
+        entry = self._rows.pop(pk, None)
+        if entry:
+            for field in self.key_fields[1:]:
+                self._aliases.pop((field, entry[1].get(field)), None)
+
+    def get(self, field: str, value) -> Optional[Dict]:
+        with self._lock:
+            pk = value if field == self.key_fields[0] else self._aliases.get((field, value))
+            entry = self._rows.get(pk) if pk is not None else None
+            if entry and entry[0] < time.monotonic():
+                self._drop(pk)
+                entry = None
+            if not entry:
+                self._stats["misses"] += 1
+                return None
+            self._rows.move_to_end(pk)
+            self._stats["hits"] += 1
+            return dict(entry[1])
+
+    def put(self, row: Optional[Dict]) -> Optional[Dict]:
+        """Cache (or refresh) a row; returns it unchanged so writes can `return cache.put(row)`."""
+        if not row or self.max_size <= 0:
+            return row
+        pk = row.get(self.key_fields[0])
+        with self._lock:
+            self._drop(pk)
+            self._rows[pk] = (time.monotonic() + self.ttl, dict(row))
+            for field in self.key_fields[1:]:
+                if row.get(field) is not None:
+                    self._aliases[(field, row[field])] = pk
+            while len(self._rows) > self.max_size:
+                self._drop(next(iter(self._rows)))
+                self._stats["evictions"] += 1
+        return row
+
+    def invalidate(self, field: str, value) -> None:
+        with self._lock:
+            pk = value if field == self.key_fields[0] else self._aliases.get((field, value))
+            if pk is not None:
+                self._drop(pk)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rows.clear()
+            self._aliases.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "size": len(self._rows)}
+
+
+_shared: Dict[str, EntityCache] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_cache(table: str, key_fields: Sequence[str]) -> Optional[EntityCache]:
+    """Process-wide cache for `table`, or None when ENTITY_CACHE_SIZE is 0."""
+    if ENTITY_CACHE_SIZE <= 0:
+        return None
+    with _shared_lock:
+        if table not in _shared:
+            _shared[table] = EntityCache(key_fields, ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL)
+        return _shared[table]
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    with _shared_lock:
+        return {table: cache.stats() for table, cache in _shared.items()}
@@ -0,0 +1,38 @@
+# src/dao/cas.py
+"""
+Read-modify-write loops written once for the sync and async DAOs.
+
+A plan is a generator that yields each query it needs run and is sent back
+the response; it returns its result. `run` drives a plan on a sync client
+and `arun` on an async one, so the two DAO layers differ only in how a
+query is executed:
+
+    def plan(table, k):
+        resp = yield table.select("n").eq("id", k)
+        return resp.data
+
+    run(plan(sync_table, 1)); await arun(plan(async_table, 1))
+"""
+from typing import Any, Generator
+
+Plan = Generator[Any, Any, Any]
+
+
+def run(plan: Plan):
+    """Execute each query `plan` yields; returns what the plan returns."""
+    try:
+        query = next(plan)
+        while True:
+            query = plan.send(query.execute())
+    except StopIteration as done:
+        return done.value
+
+
+async def arun(plan: Plan):
+    """run() for queries on the async client."""
+    try:
+        query = next(plan)
+        while True:
+            query = plan.send(await query.execute())
+    except StopIteration as done:
+        return done.value
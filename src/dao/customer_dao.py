@@ -1,6 +1,8 @@
 # src/dao/customer_dao.py
-from typing import Optional, List, Dict
-from src.config import get_supabase
+from typing import Iterator, Optional, List, Dict
+from src.config import get_client, get_async_client
+from src.dao.cache import EntityCache, shared_cache
+from src.dao.scan import iter_keyset
 
 class CustomerError(Exception):
     pass
@@ -9,45 +11,142 @@ class CustomerError(Exception):
 class CustomerDAO:
     """Direct DB access for customers table."""
     
-    def __init__(self):
-        self._db = get_supabase().table("customers")
+    def __init__(self, client=None, cache: Optional[EntityCache] = None):
+        self._db = (client or get_client()).table("customers")
+        # the shared cache only fronts the shared client; injected clients get none unless passed one
+        self._cache = cache if cache is not None else (shared_cache("customers", ("cust_id", "email")) if client is None else None)
 
     def _first_or_none(self, resp) -> Optional[Dict]:
-        return resp.data[0] if getattr(resp, "data", None) else None
+        row = resp.data[0] if getattr(resp, "data", None) else None
+        return self._cache.put(row) if self._cache else row
 
-    def email_exists(self, email: str) -> bool:
+    def get_by_id(self, cust_id: int) -> Optional[Dict]:
+        if self._cache:
+            hit = self._cache.get("cust_id", cust_id)
+            if hit:
+                return hit
+        resp = self._db.select("*").eq("cust_id", cust_id).limit(1).execute()
+        return self._first_or_none(resp)
+
+    def get_by_ids(self, cust_ids: List[int]) -> Dict[int, Dict]:
+        """Fetch many customers in one query, keyed by cust_id; cached rows are not re-read."""
+        found, missing = {}, []
+        for cid in dict.fromkeys(cust_ids):
+            hit = self._cache.get("cust_id", cid) if self._cache else None
+            if hit:
+                found[cid] = hit
+            else:
+                missing.append(cid)
+        if missing:
+            for c in self._db.select("*").in_("cust_id", missing).execute().data or []:
+                found[c["cust_id"]] = self._cache.put(c) if self._cache else c
+        return found
+
+    def get_by_email(self, email: str) -> Optional[Dict]:
+        if self._cache:
+            hit = self._cache.get("email", email)
+            if hit:
+                return hit
         resp = self._db.select("*").eq("email", email).limit(1).execute()
+        return self._first_or_none(resp)
+
+    def email_exists(self, email: str) -> bool:
+        if self._cache and self._cache.get("email", email):
+            return True
+        # existence only: fetch the key, not the row
+        resp = self._db.select("cust_id").eq("email", email).limit(1).execute()
         return bool(resp.data)
 
     def create(self, name: str, email: str, phone: str, city: str) -> Optional[Dict]:
         if self.email_exists(email):
             return None
         payload = {"name": name, "email": email, "phone": phone, "city": city}
-        self._db.insert(payload).execute()
-        resp = self._db.select("*").eq("email", email).limit(1).execute()
+        resp = self._db.insert(payload).execute()
         return self._first_or_none(resp)
 
+    def existing_emails(self, emails: List[str]) -> set:
+        """Which of `emails` are already in the table (one query; callers keep the list short)."""
+        if not emails:
+            return set()
+        resp = self._db.select("email").in_("email", emails).execute()
+        return {c["email"] for c in resp.data or []}
+
+    def upsert_many(self, rows: List[Dict], skip_existing: bool = False) -> List[Dict]:
+        """Insert or update many customers in one request, matching on email."""
+        resp = self._db.upsert(rows, on_conflict="email", ignore_duplicates=skip_existing).execute()
+        data = resp.data or []
+        if self._cache:
+            for c in data:
+                self._cache.put(c)
+        return data
+
     def update(self, cust_id: int, fields: Dict) -> Optional[Dict]:
-        self._db.update(fields).eq("cust_id", cust_id).execute()
-        resp = self._db.select("*").eq("cust_id", cust_id).limit(1).execute()
+        if self._cache:
+            self._cache.invalidate("cust_id", cust_id)  # email may change
+        resp = self._db.update(fields).eq("cust_id", cust_id).execute()
         return self._first_or_none(resp)
 
     def delete(self, cust_id: int) -> Optional[Dict]:
-        # fetch row before delete
-        resp_before = self._db.select("*").eq("cust_id", cust_id).limit(1).execute()
-        row = self._first_or_none(resp_before)
-        self._db.delete().eq("cust_id", cust_id).execute()
-        return row
-
-    def list(self, limit: int = 100) -> List[Dict]:
-        resp = self._db.select("*").order("cust_id").limit(limit).execute()
+        # delete returns the removed row
+        if self._cache:
+            self._cache.invalidate("cust_id", cust_id)
+        resp = self._db.delete().eq("cust_id", cust_id).execute()
+        return resp.data[0] if resp.data else None
+
+    def list(self, limit: int = 100, columns: str = "*") -> List[Dict]:
+        resp = self._db.select(columns).order("cust_id").limit(limit).execute()
         return resp.data or []
 
-    def search(self, email: str = None, city: str = None) -> List[Dict]:
-        q = self._db.select("*")
+    def iter_customers(self, email: str = None, city: str = None, after: Optional[int] = None,
+                       page_size: Optional[int] = None, columns: str = "*") -> Iterator[Dict]:
+        """Customers in cust_id order, optionally matching email/city, resuming after the cursor `after`."""
+        def where(q):
+            if email:
+                q = q.eq("email", email)
+            if city:
+                q = q.eq("city", city)
+            return q
+        return iter_keyset(self._db, "cust_id", columns=columns, where=where, page_size=page_size, after=after)
+
+    def search(self, email: str = None, city: str = None, columns: str = "*") -> List[Dict]:
+        q = self._db.select(columns)
         if email:
             q = q.eq("email", email)
         if city:
             q = q.eq("city", city)
         resp = q.execute()
         return resp.data or []
+
+
+class AsyncCustomerDAO:
+    """CustomerDAO reads on the async client. Build with `await AsyncCustomerDAO.connect()`."""
+
+    def __init__(self, client, cache: Optional[EntityCache] = None):
+        self._db = client.table("customers")
+        self._cache = cache
+
+    @classmethod
+    async def connect(cls) -> "AsyncCustomerDAO":
+        return cls(await get_async_client(), shared_cache("customers", ("cust_id", "email")))
+
+    async def get_by_id(self, cust_id: int) -> Optional[Dict]:
+        if self._cache:
+            hit = self._cache.get("cust_id", cust_id)
+            if hit:
+                return hit
+        resp = await self._db.select("*").eq("cust_id", cust_id).limit(1).execute()
+        row = resp.data[0] if resp.data else None
+        return self._cache.put(row) if self._cache else row
+
+    async def get_by_ids(self, cust_ids: List[int]) -> Dict[int, Dict]:
+        found, missing = {}, []
+        for cid in dict.fromkeys(cust_ids):
+            hit = self._cache.get("cust_id", cid) if self._cache else None
+            if hit:
+                found[cid] = hit
+            else:
+                missing.append(cid)
+        if missing:
+            for c in (await self._db.select("*").in_("cust_id", missing).execute()).data or []:
+                found[c["cust_id"]] = self._cache.put(c) if self._cache else c
+        return found
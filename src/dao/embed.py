@@ -0,0 +1,110 @@
+# src/dao/embed.py
+"""
+PostgREST resource embedding for the local backends.
+
+    orders.select("*, items:order_items(*, product:products(name,price)), customer:customers(*)")
+
+returns each order with its items (each carrying its product) and its
+customer nested in the row, in one request. Supabase resolves the
+relationships from foreign keys; the SQLite client and the benchmark
+stand-in use RELATIONS and `attach` to answer the same select strings.
+"""
+from typing import Callable, Dict, List, NamedTuple, Sequence, Tuple
+
+# (table, embedded table) -> (column on table, column on embedded table, embeds a list)
+RELATIONS = {
+    ("orders", "order_items"): ("order_id", "order_id", True),
+    ("orders", "payments"): ("order_id", "order_id", True),
+    ("orders", "customers"): ("customer_id", "cust_id", False),
+    ("order_items", "orders"): ("order_id", "order_id", False),
+    ("order_items", "products"): ("prod_id", "prod_id", False),
+    ("payments", "orders"): ("order_id", "order_id", False),
+    ("customers", "orders"): ("cust_id", "customer_id", True),
+    ("products", "order_items"): ("prod_id", "prod_id", True),
+}
+
+
+class Embed(NamedTuple):
+    alias: str
+    table: str
+    columns: List[str]
+    embeds: List["Embed"]
+
+
+def _split(text: str) -> List[str]:
+    """Split on commas outside parentheses."""
+    parts, depth, start = [], 0, 0
+    for i, ch in enumerate(text):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth < 0:
+                raise ValueError(f"unbalanced parentheses in select {text!r}")
+        elif ch == "," and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    if depth:
+        raise ValueError(f"unbalanced parentheses in select {text!r}")
+    parts.append(text[start:])
+    return [p.strip() for p in parts if p.strip()]
+
+
+def parse_select(columns: Sequence[str]) -> Tuple[List[str], List[Embed]]:
+    """Plain column names (["*"] for all) and embedded resources of a select, e.g. ("a,b", "rel(*)")."""
+    cols, embeds = [], []
+    for part in _split(",".join(columns)):
+        if "(" not in part:
+            cols.append(part)
+            continue
+        if not part.endswith(")"):
+            raise ValueError(f"bad embedded resource {part!r}")
+        name, inner = part[:part.index("(")].strip(), part[part.index("(") + 1:-1]
+        alias, _, table = name.rpartition(":")
+        sub_cols, sub_embeds = parse_select([inner])
+        embeds.append(Embed(alias or table, table, sub_cols, sub_embeds))
+    return cols or ["*"], embeds
+
+
+def fetch_columns(table: str, cols: List[str], embeds: List[Embed]) -> Tuple[List[str], List[str]]:
+    """Columns to read so every embed can be joined, and the ones only added for the join."""
+    if "*" in cols:
+        return ["*"], []
+    extra = []
+    for e in embeds:
+        local = relation(table, e.table)[0]
+        if local not in cols and local not in extra:
+            extra.append(local)
+    return cols + extra, extra
+
+
+def relation(table: str, other: str) -> Tuple[str, str, bool]:
+    try:
+        return RELATIONS[(table, other)]
+    except KeyError:
+        raise ValueError(f"no relationship between {table!r} and {other!r}") from None
+
+
+def attach(table: str, rows: List[Dict], embeds: List[Embed],
+           fetch: Callable[[str, List[str], str, List], List[Dict]]) -> None:
+    """
+    Nest each embed into `rows` in place. `fetch(table, columns, key, values)` returns the
+    rows of `table` whose `key` is in `values`, with `columns` (["*"] for all).
+    """
+    for e in embeds:
+        local, remote, many = relation(table, e.table)
+        cols, extra = fetch_columns(e.table, e.columns, e.embeds)
+        if "*" not in cols and remote not in cols:
+            cols, extra = cols + [remote], extra + [remote]
+        values = list(dict.fromkeys(r[local] for r in rows if r.get(local) is not None))
+        related = fetch(e.table, cols, remote, values) if values else []
+        attach(e.table, related, e.embeds, fetch)
+        groups: Dict = {}
+        for r in related:
+            groups.setdefault(r[remote], []).append(r)
+        for r in related:
+            for k in extra:
+                r.pop(k, None)
+        for r in rows:
+            found = groups.get(r.get(local), [])
+            r[e.alias] = found if many else (found[0] if found else None)
@@ -1,39 +1,234 @@
 # src/dao/order_dao.py
+import asyncio
 from typing import Optional, List, Dict
-from src.config import get_supabase
+from src.config import get_client, get_async_client
+from src.dao.scan import aiter_keyset, iter_keyset
+from src.utils import gather_bounded
+
+# max order_items rows per insert request
+ORDER_ITEMS_CHUNK = 500
+# order ids per embedded details lookup
+ORDER_DETAILS_CHUNK = 200
+# an order with its items (each with product name and price), customer and payments, in one request
+ORDER_DETAILS = "*, items:order_items(*, product:products(name,price)), customer:customers(*), payments(*)"
+
+
+def _in_status(q, from_status):
+    """Limit an update to orders whose status is `from_status` (one status or several); None for any."""
+    if not from_status:
+        return q
+    return q.eq("status", from_status) if isinstance(from_status, str) else q.in_("status", list(from_status))
+
 
 class OrderDAO:
-    def __init__(self):
-        self.db = get_supabase().table("orders")
-        self.items_db = get_supabase().table("order_items")
+    def __init__(self, client=None):
+        client = client or get_client()
+        # backends with transactions (SQLite) write an order atomically; PostgREST
+        # writes fall back to deleting what was written when a later step fails
+        self._transaction = getattr(client, "transaction", None)
+        self.db = client.table("orders")
+        self.items_db = client.table("order_items")
 
     # Create order record
     def create_order(self, customer_id: int, total_amount: float) -> Dict:
         payload = {"customer_id": customer_id, "total_amount": total_amount, "status": "PLACED"}
-        self.db.insert(payload).execute()
-        resp = self.db.select("*").eq("customer_id", customer_id).order("order_id", desc=True).limit(1).execute()
+        # insert returns the new row, so concurrent orders can't be mixed up
+        resp = self.db.insert(payload).execute()
         return resp.data[0] if resp.data else None
 
-    # Add order items
-    def add_order_items(self, order_id: int, items: List[Dict]):
-        for item in items:
-            payload = {"order_id": order_id, "prod_id": item["prod_id"], "quantity": item["qty"]}
-            self.items_db.insert(payload).execute()
+    # Add order items (bulk insert, chunked for very large baskets)
+    def add_order_items(self, order_id: int, items: List[Dict], chunk_size: int = ORDER_ITEMS_CHUNK) -> List[Dict]:
+        payload = [{"order_id": order_id, "prod_id": item["prod_id"], "quantity": item["qty"]} for item in items]
+        rows = []
+        for start in range(0, len(payload), chunk_size):
+            resp = self.items_db.insert(payload[start:start + chunk_size]).execute()
+            rows.extend(resp.data or [])
+        return rows
+
+    # Create order header and its items, all or nothing
+    def create_order_with_items(self, customer_id: int, total_amount: float, items: List[Dict]) -> Dict:
+        if self._transaction:
+            with self._transaction():
+                order = self.create_order(customer_id, total_amount)
+                order["items"] = self.add_order_items(order["order_id"], items)
+            return order
+        order = self.create_order(customer_id, total_amount)
+        try:
+            order["items"] = self.add_order_items(order["order_id"], items)
+        except Exception:
+            self.items_db.delete().eq("order_id", order["order_id"]).execute()
+            self.db.delete().eq("order_id", order["order_id"]).execute()
+            raise
+        return order
+
+    # Create many orders with their items: one insert for the headers, chunked inserts for all items
+    def create_orders_with_items(self, orders: List[Dict], chunk_size: int = ORDER_ITEMS_CHUNK) -> List[Dict]:
+        """`orders` are {"customer_id", "total_amount", "items": [{"prod_id", "qty"}]}; returns rows in the same order."""
+        if not orders:
+            return []
+        if self._transaction:
+            with self._transaction():
+                return self._insert_orders(orders, chunk_size)
+        return self._insert_orders(orders, chunk_size, compensate=True)
+
+    def _insert_orders(self, orders: List[Dict], chunk_size: int, compensate: bool = False) -> List[Dict]:
+        headers = [{"customer_id": o["customer_id"], "total_amount": o["total_amount"], "status": "PLACED"} for o in orders]
+        created = self.db.insert(headers).execute().data or []
+        ids = [o["order_id"] for o in created]
+        try:
+            payload = [{"order_id": row["order_id"], "prod_id": item["prod_id"], "quantity": item["qty"]}
+                       for row, o in zip(created, orders) for item in o["items"]]
+            by_order = {oid: [] for oid in ids}
+            for start in range(0, len(payload), chunk_size):
+                for item in self.items_db.insert(payload[start:start + chunk_size]).execute().data or []:
+                    by_order[item["order_id"]].append(item)
+        except Exception:
+            if compensate:
+                self.items_db.delete().in_("order_id", ids).execute()
+                self.db.delete().in_("order_id", ids).execute()
+            raise
+        for row in created:
+            row["items"] = by_order[row["order_id"]]
+        return created
 
-    def get_order(self, order_id: int) -> Optional[Dict]:
+    def get_order(self, order_id: int, with_items: bool = True) -> Optional[Dict]:
         resp = self.db.select("*").eq("order_id", order_id).limit(1).execute()
         order = resp.data[0] if resp.data else None
-        if not order:
-            return None
+        if not order or not with_items:
+            return order
         # fetch items
         items_resp = self.items_db.select("*").eq("order_id", order_id).execute()
         order["items"] = items_resp.data or []
         return order
 
-    def list_orders_by_customer(self, customer_id: int) -> List[Dict]:
-        resp = self.db.select("*").eq("customer_id", customer_id).execute()
+    def get_orders_details(self, order_ids: List[int]) -> Dict[int, Dict]:
+        """Orders with items, products, customer and payments embedded, keyed by order_id; one query per chunk."""
+        ids = list(dict.fromkeys(order_ids))
+        orders = {}
+        for start in range(0, len(ids), ORDER_DETAILS_CHUNK):
+            resp = self.db.select(ORDER_DETAILS).in_("order_id", ids[start:start + ORDER_DETAILS_CHUNK]).execute()
+            orders.update({o["order_id"]: o for o in resp.data or []})
+        return orders
+
+    def customer_orders_details(self, customer_id: int):
+        """Every order of a customer with details embedded, paged by order_id."""
+        return iter_keyset(self.db, "order_id", columns=ORDER_DETAILS, page_size=ORDER_DETAILS_CHUNK,
+                           where=lambda q: q.eq("customer_id", customer_id))
+
+    def list_orders_by_customer(self, customer_id: int, columns: str = "*") -> List[Dict]:
+        resp = self.db.select(columns).eq("customer_id", customer_id).execute()
+        return resp.data or []
+
+    def iter_orders(self, customer_id: Optional[int] = None, status: Optional[str] = None,
+                    after: Optional[int] = None, page_size: Optional[int] = None, columns: str = "*"):
+        """Orders in order_id order, optionally for one customer and/or status, resuming after the cursor `after`."""
+        def where(q):
+            if customer_id is not None:
+                q = q.eq("customer_id", customer_id)
+            if status:
+                q = q.eq("status", status)
+            return q
+        return iter_keyset(self.db, "order_id", columns=columns, where=where, page_size=page_size, after=after)
+
+    def update_order(self, order_id: int, fields: Dict, items: Optional[List[Dict]] = None,
+                     with_items: bool = True, from_status=None) -> Optional[Dict]:
+        """
+        Update an order and return it; pass the `items` already read, or with_items=False, to skip the items query.
+        With `from_status` (a status or a tuple of them) the update only applies while the order
+        still has one of them; None is returned otherwise.
+        """
+        resp = _in_status(self.db.update(fields).eq("order_id", order_id), from_status).execute()
+        order = resp.data[0] if resp.data else None
+        if not order or not with_items:
+            return order
+        if items is None:
+            items = self.items_db.select("*").eq("order_id", order_id).execute().data or []
+        order["items"] = items
+        return order
+
+    def set_status(self, order_ids: List[int], status: str, from_status=None,
+                   chunk_size: int = ORDER_DETAILS_CHUNK) -> List[Dict]:
+        """
+        Set the status of many orders, one update per chunk; returns the updated orders without items.
+        With `from_status` (as for update_order) an order that has moved on since it was read is left
+        alone and missing from the result.
+        """
+        ids = list(dict.fromkeys(order_ids))
+        updated = []
+        for start in range(0, len(ids), chunk_size):
+            q = self.db.update({"status": status}).in_("order_id", ids[start:start + chunk_size])
+            updated.extend(_in_status(q, from_status).execute().data or [])
+        return updated
+
+
+class AsyncOrderDAO:
+    """OrderDAO on the async client. Build with `await AsyncOrderDAO.connect()`."""
+
+    def __init__(self, client):
+        self.db = client.table("orders")
+        self.items_db = client.table("order_items")
+
+    @classmethod
+    async def connect(cls) -> "AsyncOrderDAO":
+        return cls(await get_async_client())
+
+    async def create_order_with_items(self, customer_id: int, total_amount: float, items: List[Dict],
+                                      chunk_size: int = ORDER_ITEMS_CHUNK) -> Dict:
+        payload = {"customer_id": customer_id, "total_amount": total_amount, "status": "PLACED"}
+        order = (await self.db.insert(payload).execute()).data[0]
+        rows = [{"order_id": order["order_id"], "prod_id": i["prod_id"], "quantity": i["qty"]} for i in items]
+        try:
+            chunks = await gather_bounded(self.items_db.insert(rows[start:start + chunk_size]).execute()
+                                          for start in range(0, len(rows), chunk_size))
+        except Exception:
+            await self.items_db.delete().eq("order_id", order["order_id"]).execute()
+            await self.db.delete().eq("order_id", order["order_id"]).execute()
+            raise
+        order["items"] = [item for resp in chunks for item in resp.data or []]
+        return order
+
+    async def _items(self, order_id: int) -> List[Dict]:
+        return (await self.items_db.select("*").eq("order_id", order_id).execute()).data or []
+
+    async def get_order(self, order_id: int, with_items: bool = True) -> Optional[Dict]:
+        if not with_items:
+            resp = await self.db.select("*").eq("order_id", order_id).limit(1).execute()
+            return resp.data[0] if resp.data else None
+        # the items query doesn't depend on the order row, so run both at once
+        resp, items = await asyncio.gather(
+            self.db.select("*").eq("order_id", order_id).limit(1).execute(), self._items(order_id))
+        order = resp.data[0] if resp.data else None
+        if order:
+            order["items"] = items
+        return order
+
+    async def get_orders_details(self, order_ids: List[int]) -> Dict[int, Dict]:
+        ids = list(dict.fromkeys(order_ids))
+        pages = await gather_bounded(
+            self.db.select(ORDER_DETAILS).in_("order_id", ids[start:start + ORDER_DETAILS_CHUNK]).execute()
+            for start in range(0, len(ids), ORDER_DETAILS_CHUNK))
+        return {o["order_id"]: o for resp in pages for o in resp.data or []}
+
+    async def customer_orders_details(self, customer_id: int) -> List[Dict]:
+        rows = aiter_keyset(self.db, "order_id", columns=ORDER_DETAILS, page_size=ORDER_DETAILS_CHUNK,
+                            where=lambda q: q.eq("customer_id", customer_id))
+        return [o async for o in rows]
+
+    async def list_orders_by_customer(self, customer_id: int, columns: str = "*") -> List[Dict]:
+        resp = await self.db.select(columns).eq("customer_id", customer_id).execute()
         return resp.data or []
 
-    def update_order(self, order_id: int, fields: Dict) -> Optional[Dict]:
-        self.db.update(fields).eq("order_id", order_id).execute()
-        return self.get_order(order_id)
+    async def update_order(self, order_id: int, fields: Dict, items: Optional[List[Dict]] = None,
+                           with_items: bool = True, from_status=None) -> Optional[Dict]:
+        q = _in_status(self.db.update(fields).eq("order_id", order_id), from_status)
+        if not with_items or items is not None:
+            resp = await q.execute()
+            order = resp.data[0] if resp.data else None
+            if order and with_items:
+                order["items"] = items
+            return order
+        resp, items = await asyncio.gather(q.execute(), self._items(order_id))
+        order = resp.data[0] if resp.data else None
+        if order:
+            order["items"] = items
+        return order
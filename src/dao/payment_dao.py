@@ -1,22 +1,79 @@
 # src/dao/payment_dao.py
 from typing import Optional, List, Dict
-from src.config import get_supabase
+from src.config import get_client, get_async_client
+
+# order / payment ids per in() request
+PAYMENT_CHUNK = 200
+
 
 class PaymentDAO:
-    def __init__(self):
-        self.db = get_supabase().table("payments")
+    def __init__(self, client=None):
+        self.db = (client or get_client()).table("payments")
 
     def create_payment(self, order_id: int, amount: float) -> Dict:
         payload = {"order_id": order_id, "amount": amount, "status": "PENDING", "method": None}
-        self.db.insert(payload).execute()
-        resp = self.db.select("*").eq("order_id", order_id).order("payment_id", desc=True).limit(1).execute()
+        resp = self.db.insert(payload).execute()
         return resp.data[0] if resp.data else None
 
+    def create_payments(self, amounts: Dict[int, float]) -> List[Dict]:
+        """Insert a PENDING payment for each order_id -> amount in one request."""
+        if not amounts:
+            return []
+        payload = [{"order_id": oid, "amount": amt, "status": "PENDING", "method": None} for oid, amt in amounts.items()]
+        resp = self.db.insert(payload).execute()
+        return resp.data or []
+
     def update_payment(self, payment_id: int, fields: Dict) -> Optional[Dict]:
-        self.db.update(fields).eq("payment_id", payment_id).execute()
-        resp = self.db.select("*").eq("payment_id", payment_id).limit(1).execute()
+        resp = self.db.update(fields).eq("payment_id", payment_id).execute()
         return resp.data[0] if resp.data else None
 
     def get_by_order(self, order_id: int) -> Optional[Dict]:
         resp = self.db.select("*").eq("order_id", order_id).limit(1).execute()
         return resp.data[0] if resp.data else None
+
+    def get_by_orders(self, order_ids: List[int], columns: str = "*") -> Dict[int, Dict]:
+        """Payments keyed by order_id, one query per chunk; the lowest payment_id wins if an order has several."""
+        ids = list(dict.fromkeys(order_ids))
+        payments = {}
+        for start in range(0, len(ids), PAYMENT_CHUNK):
+            resp = self.db.select(columns).in_("order_id", ids[start:start + PAYMENT_CHUNK]).order("payment_id").execute()
+            for p in resp.data or []:
+                payments.setdefault(p["order_id"], p)
+        return payments
+
+    def set_status(self, payment_ids: List[int], status: str, from_status: str, fields: Optional[Dict] = None) -> List[Dict]:
+        """
+        Move the payments still in `from_status` to `status` (with `fields`), one update per chunk.
+        Returns only the rows that changed, so a payment another writer got to first is left out.
+        """
+        payload = {**(fields or {}), "status": status}
+        changed = []
+        for start in range(0, len(payment_ids), PAYMENT_CHUNK):
+            resp = (self.db.update(payload).in_("payment_id", payment_ids[start:start + PAYMENT_CHUNK])
+                    .eq("status", from_status).execute())
+            changed.extend(resp.data or [])
+        return changed
+
+
+class AsyncPaymentDAO:
+    """PaymentDAO on the async client. Build with `await AsyncPaymentDAO.connect()`."""
+
+    def __init__(self, client):
+        self.db = client.table("payments")
+
+    @classmethod
+    async def connect(cls) -> "AsyncPaymentDAO":
+        return cls(await get_async_client())
+
+    async def create_payment(self, order_id: int, amount: float) -> Dict:
+        payload = {"order_id": order_id, "amount": amount, "status": "PENDING", "method": None}
+        resp = await self.db.insert(payload).execute()
+        return resp.data[0] if resp.data else None
+
+    async def update_payment(self, payment_id: int, fields: Dict) -> Optional[Dict]:
+        resp = await self.db.update(fields).eq("payment_id", payment_id).execute()
+        return resp.data[0] if resp.data else None
+
+    async def get_by_order(self, order_id: int) -> Optional[Dict]:
+        resp = await self.db.select("*").eq("order_id", order_id).limit(1).execute()
+        return resp.data[0] if resp.data else None
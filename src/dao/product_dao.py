@@ -1,42 +1,203 @@
 # src/dao/product_dao.py
-from typing import Optional, List, Dict
-from src.config import get_supabase
+from typing import Iterator, Optional, List, Dict
+from src.config import get_client, get_async_client
+from src.dao.cache import EntityCache, shared_cache
+from src.dao.cas import arun, run
+from src.dao.scan import iter_keyset
+
+# how often a stock update is retried after losing a race to another writer
+STOCK_CAS_RETRIES = 50
+
+
+class StockConflictError(Exception):
+    pass
+
+
+def _stock_plan(table, prod_id: int, delta: int, expected):
+    """
+    Add `delta` to a product's stock unless that takes it below 0, as a compare-and-set
+    plan (see src/dao/cas.py). `expected` is the stock the caller last saw, or None to
+    read it first. Returns the updated row, or None if the product is missing or short.
+    """
+    current = expected
+    known = expected is not None
+    for _ in range(STOCK_CAS_RETRIES):
+        if not known:
+            rows = (yield table.select("*").eq("prod_id", prod_id).limit(1)).data
+            if not rows:
+                return None
+            current = rows[0].get("stock")
+        new_stock = (current or 0) + delta
+        if new_stock < 0:
+            return None
+        # compare-and-set: only writes if nobody changed stock since we read it
+        q = table.update({"stock": new_stock}).eq("prod_id", prod_id)
+        q = q.is_("stock", "null") if current is None else q.eq("stock", current)
+        resp = yield q
+        if resp.data:
+            return resp.data[0]
+        known = False  # lost a race, re-read and retry
+    raise StockConflictError(f"Could not update stock for product {prod_id}")
+
 
 class ProductDAO:
-    def __init__(self):
-        self.db = get_supabase().table("products")
+    def __init__(self, client=None, cache: Optional[EntityCache] = None):
+        self.db = (client or get_client()).table("products")
+        # the shared cache only fronts the shared client; injected clients get none unless passed one
+        self._cache = cache if cache is not None else (shared_cache("products", ("prod_id", "sku")) if client is None else None)
+
+    def _remember(self, row: Optional[Dict]) -> Optional[Dict]:
+        return self._cache.put(row) if self._cache else row
 
     def create_product(self, name: str, sku: str, price: float, stock: int = 0, category: str | None = None) -> Optional[Dict]:
         payload = {"name": name, "sku": sku, "price": price, "stock": stock}
         if category:
             payload["category"] = category
-        # insert
-        get_supabase().table("products").insert(payload).execute()
-        # fetch inserted row
-        resp = get_supabase().table("products").select("*").eq("sku", sku).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        # insert returns the inserted row
+        resp = self.db.insert(payload).execute()
+        return self._remember(resp.data[0] if resp.data else None)
 
-    def get_product_by_id(self, prod_id: int) -> Optional[Dict]:
+    def get_product_by_id(self, prod_id: int, fresh: bool = False) -> Optional[Dict]:
+        """Cached lookup; pass fresh=True where stock must be current."""
+        if self._cache and not fresh:
+            hit = self._cache.get("prod_id", prod_id)
+            if hit:
+                return hit
         resp = self.db.select("*").eq("prod_id", prod_id).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        return self._remember(resp.data[0] if resp.data else None)
+
+    def get_products_by_ids(self, prod_ids: List[int], columns: str = "*") -> Dict[int, Dict]:
+        """
+        Fetch many products in one query, keyed by prod_id (missing ids are absent).
+        Always reads the database (this is the order path) and refreshes the cache.
+        `columns` must include prod_id; partial rows are not cached.
+        """
+        ids = list(dict.fromkeys(prod_ids))
+        if not ids:
+            return {}
+        resp = self.db.select(columns).in_("prod_id", ids).execute()
+        if columns != "*":
+            return {p["prod_id"]: p for p in resp.data or []}
+        return {p["prod_id"]: self._remember(p) for p in resp.data or []}
 
     def get_product_by_sku(self, sku: str) -> Optional[Dict]:
+        if self._cache:
+            hit = self._cache.get("sku", sku)
+            if hit:
+                return hit
         resp = self.db.select("*").eq("sku", sku).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        return self._remember(resp.data[0] if resp.data else None)
+
+    def existing_skus(self, skus: List[str]) -> set:
+        """Which of `skus` are already in the table (one query; callers keep the list short)."""
+        if not skus:
+            return set()
+        resp = self.db.select("sku").in_("sku", skus).execute()
+        return {p["sku"] for p in resp.data or []}
+
+    def upsert_products(self, rows: List[Dict], skip_existing: bool = False) -> List[Dict]:
+        """Insert or update many products in one request, matching on sku."""
+        resp = self.db.upsert(rows, on_conflict="sku", ignore_duplicates=skip_existing).execute()
+        return [self._remember(p) for p in resp.data or []]
 
     def update_product(self, prod_id: int, fields: Dict) -> Optional[Dict]:
-        self.db.update(fields).eq("prod_id", prod_id).execute()
-        resp = self.db.select("*").eq("prod_id", prod_id).limit(1).execute()
-        return resp.data[0] if resp.data else None
+        if self._cache:
+            self._cache.invalidate("prod_id", prod_id)  # sku may change
+        resp = self.db.update(fields).eq("prod_id", prod_id).execute()
+        return self._remember(resp.data[0] if resp.data else None)
+
+    def _adjust_stock(self, prod_id: int, delta: int, expected) -> Optional[Dict]:
+        return self._remember(run(_stock_plan(self.db, prod_id, delta, expected)))
+
+    def decrement_stock(self, prod_id: int, qty: int, expected: Optional[int] = None) -> Optional[Dict]:
+        """
+        Atomically take qty off a product's stock if at least qty is left.
+        `expected` is the stock the caller last saw; it saves a read when still current.
+        Returns the updated row, or None if the product is missing or stock is short.
+        """
+        return self._adjust_stock(prod_id, -qty, expected)
+
+    def increment_stock(self, prod_id: int, qty: int, expected: Optional[int] = None) -> Optional[Dict]:
+        """Atomically add qty to a product's stock. Returns the updated row, or None if missing."""
+        return self._adjust_stock(prod_id, qty, expected)
 
     def delete_product(self, prod_id: int) -> Optional[Dict]:
-        before = self.get_product_by_id(prod_id)
-        self.db.delete().eq("prod_id", prod_id).execute()
-        return before
+        if self._cache:
+            self._cache.invalidate("prod_id", prod_id)
+        resp = self.db.delete().eq("prod_id", prod_id).execute()
+        return resp.data[0] if resp.data else None
 
-    def list_products(self, limit: int = 100, category: str | None = None) -> List[Dict]:
-        q = self.db.select("*").order("prod_id", desc=False).limit(limit)
+    def list_products(self, limit: int = 100, category: str | None = None, columns: str = "*") -> List[Dict]:
+        q = self.db.select(columns).order("prod_id", desc=False).limit(limit)
         if category:
             q = q.eq("category", category)
         resp = q.execute()
         return resp.data or []
+
+    def iter_products(self, category: str | None = None, after: Optional[int] = None,
+                      page_size: Optional[int] = None, columns: str = "*") -> Iterator[Dict]:
+        """Products in prod_id order, resuming after the cursor `after`, fetched page_size at a time."""
+        where = (lambda q: q.eq("category", category)) if category else None
+        return iter_keyset(self.db, "prod_id", columns=columns, where=where, page_size=page_size, after=after)
+
+    def iter_low_stock(self, threshold: int, columns: str = "*", after: Optional[int] = None,
+                       page_size: Optional[int] = None) -> Iterator[Dict]:
+        """Every product with stock <= threshold, filtered by the server and paged over the whole catalog."""
+        return iter_keyset(self.db, "prod_id", columns=columns, where=lambda q: q.lte("stock", threshold),
+                           page_size=page_size, after=after)
+
+
+class AsyncProductDAO:
+    """ProductDAO on the async client. Build with `await AsyncProductDAO.connect()`."""
+
+    def __init__(self, client, cache: Optional[EntityCache] = None):
+        self.db = client.table("products")
+        self._cache = cache
+
+    @classmethod
+    async def connect(cls) -> "AsyncProductDAO":
+        return cls(await get_async_client(), shared_cache("products", ("prod_id", "sku")))
+
+    def _remember(self, row: Optional[Dict]) -> Optional[Dict]:
+        return self._cache.put(row) if self._cache else row
+
+    async def get_product_by_id(self, prod_id: int, fresh: bool = False) -> Optional[Dict]:
+        if self._cache and not fresh:
+            hit = self._cache.get("prod_id", prod_id)
+            if hit:
+                return hit
+        resp = await self.db.select("*").eq("prod_id", prod_id).limit(1).execute()
+        return self._remember(resp.data[0] if resp.data else None)
+
+    async def get_products_by_ids(self, prod_ids: List[int], columns: str = "*") -> Dict[int, Dict]:
+        ids = list(dict.fromkeys(prod_ids))
+        if not ids:
+            return {}
+        resp = await self.db.select(columns).in_("prod_id", ids).execute()
+        if columns != "*":
+            return {p["prod_id"]: p for p in resp.data or []}
+        return {p["prod_id"]: self._remember(p) for p in resp.data or []}
+
+    async def get_product_by_sku(self, sku: str) -> Optional[Dict]:
+        if self._cache:
+            hit = self._cache.get("sku", sku)
+            if hit:
+                return hit
+        resp = await self.db.select("*").eq("sku", sku).limit(1).execute()
+        return self._remember(resp.data[0] if resp.data else None)
+
+    async def list_products(self, limit: int = 100, category: str | None = None, columns: str = "*") -> List[Dict]:
+        q = self.db.select(columns).order("prod_id", desc=False).limit(limit)
+        if category:
+            q = q.eq("category", category)
+        resp = await q.execute()
+        return resp.data or []
+
+    async def _adjust_stock(self, prod_id: int, delta: int, expected) -> Optional[Dict]:
+        return self._remember(await arun(_stock_plan(self.db, prod_id, delta, expected)))
+
+    async def decrement_stock(self, prod_id: int, qty: int, expected: Optional[int] = None) -> Optional[Dict]:
+        return await self._adjust_stock(prod_id, -qty, expected)
+
+    async def increment_stock(self, prod_id: int, qty: int, expected: Optional[int] = None) -> Optional[Dict]:
+        return await self._adjust_stock(prod_id, qty, expected)
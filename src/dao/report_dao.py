@@ -1,48 +1,181 @@
 # src/dao/report_dao.py
-from src.config import get_supabase
-from datetime import datetime, timedelta
+from src.config import get_client, get_async_client
+from src.utils import chunked, gather_bounded
+from src.dao.scan import iter_keyset
+from datetime import date, timedelta
+
+# ids per in() lookup; keeps the request URL well under server limits
+LOOKUP_CHUNK = 200
+REORDER_COLUMNS = "prod_id,name,sku,stock"
+
+
+def _day_spans(days):
+    """Merge ISO days into [start, end) created_at ranges, one per run of consecutive days."""
+    spans = []
+    for d in sorted({date.fromisoformat(str(d)[:10]) for d in days}):
+        if spans and spans[-1][1] == d:
+            spans[-1][1] = d + timedelta(days=1)
+        else:
+            spans.append([d, d + timedelta(days=1)])
+    return [(lo.isoformat(), hi.isoformat()) for lo, hi in spans]
+
 
 class ReportDAO:
-    def __init__(self):
-        self.db_orders = get_supabase().table("orders")
-        self.db_items = get_supabase().table("order_items")
-        self.db_products = get_supabase().table("products")
-        self.db_customers = get_supabase().table("customers")
-
-    # Top 5 selling products by quantity
-    def top_selling_products(self):
-        items = self.db_items.select("*").execute().data or []
-        summary = {}
-        for i in items:
-            summary[i["prod_id"]] = summary.get(i["prod_id"], 0) + i["quantity"]
-        top5 = sorted(summary.items(), key=lambda x: x[1], reverse=True)[:5]
-        result = []
-        for pid, qty in top5:
-            product = self.db_products.select("*").eq("prod_id", pid).limit(1).execute().data[0]
-            result.append({"product": product["name"], "quantity_sold": qty})
-        return result
-
-    # Total revenue in last month
-    def total_revenue_last_month(self):
-        today = datetime.today()
-        last_month = today - timedelta(days=30)
-        orders = self.db_orders.select("*").gte("created_at", last_month.isoformat()).execute().data or []
-        return sum(o.get("total_amount",0) for o in orders)
-
-    # Total orders per customer
-    def orders_per_customer(self):
-        orders = self.db_orders.select("*").execute().data or []
-        summary = {}
-        for o in orders:
-            cid = o["customer_id"]
-            summary[cid] = summary.get(cid,0)+1
-        result = []
-        for cid, count in summary.items():
-            customer = self.db_customers.select("*").eq("cust_id", cid).limit(1).execute().data[0]
-            result.append({"customer": customer["name"], "orders_count": count})
-        return result
-
-    # Customers with more than 2 orders
-    def frequent_customers(self):
-        data = self.orders_per_customer()
-        return [d for d in data if d["orders_count"] > 2]
+    def __init__(self, client=None):
+        client = client or get_client()
+        self.db_orders = client.table("orders")
+        self.db_items = client.table("order_items")
+        self.db_products = client.table("products")
+        self.db_customers = client.table("customers")
+        self.db_payments = client.table("payments")
+
+    # Resolve names for many ids with chunked in() lookups instead of one query per id
+    def _names_by_id(self, table, key: str, ids) -> dict:
+        ids = list(ids)
+        names = {}
+        for start in range(0, len(ids), LOOKUP_CHUNK):
+            rows = table.select(f"{key},name").in_(key, ids[start:start + LOOKUP_CHUNK]).execute().data or []
+            names.update({r[key]: r.get("name") for r in rows})
+        return names
+
+    def product_names(self, prod_ids) -> dict:
+        return self._names_by_id(self.db_products, "prod_id", prod_ids)
+
+    def customer_names(self, cust_ids) -> dict:
+        return self._names_by_id(self.db_customers, "cust_id", cust_ids)
+
+    # Recompute the rollup totals from raw tables (used by `report rebuild`)
+    def rollup_totals(self, page_size: int = None):
+        """
+        Return (units per product, orders per customer, revenue per day).
+        Cancelled orders are left out of all three; revenue is order totals by
+        order day minus refunded payments, as in the revenue breakdown.
+        """
+        units, counts, revenue = {}, {}, {}
+        cancelled = set()
+        for o in iter_keyset(self.db_orders, "order_id", columns="order_id,customer_id,total_amount,status,created_at",
+                             page_size=page_size):
+            if o.get("status") == "CANCELLED":
+                cancelled.add(o["order_id"])
+                continue
+            day = str(o["created_at"])[:10]
+            revenue[day] = revenue.get(day, 0) + (o.get("total_amount") or 0)
+            counts[o["customer_id"]] = counts.get(o["customer_id"], 0) + 1
+
+        refunds = {p["order_id"]: p.get("amount") or 0 for p in iter_keyset(
+            self.db_payments, "payment_id", columns="payment_id,order_id,amount", page_size=page_size,
+            where=lambda q: q.eq("status", "REFUNDED")) if p["order_id"] not in cancelled}
+        refunded = list(refunds)
+        for start in range(0, len(refunded), LOOKUP_CHUNK):
+            rows = self.db_orders.select("order_id,created_at").in_(
+                "order_id", refunded[start:start + LOOKUP_CHUNK]).execute().data or []
+            for o in rows:
+                day = str(o["created_at"])[:10]
+                revenue[day] = revenue.get(day, 0) - refunds[o["order_id"]]
+
+        for i in iter_keyset(self.db_items, "item_id", columns="item_id,order_id,prod_id,quantity",
+                             page_size=page_size):
+            if i["order_id"] not in cancelled:
+                units[i["prod_id"]] = units.get(i["prod_id"], 0) + i["quantity"]
+        return units, counts, {day: round(v, 2) for day, v in revenue.items()}
+
+    # Revenue per (day, status, payment method) from raw orders and payments
+    def revenue_breakdown(self, days=None, page_size: int = None) -> list:
+        """
+        Rows for the revenue_breakdown rollup, for the given ISO `days` or for every day when None.
+        Revenue is order totals by order day; refunded is refunded payment amounts on those orders.
+        Orders without a settled payment get method "none".
+        """
+        cols = "order_id,total_amount,status,created_at"
+        if days is None:
+            orders = iter_keyset(self.db_orders, "order_id", columns=cols, page_size=page_size)
+        else:
+            orders = (o for lo, hi in _day_spans(days) for o in iter_keyset(
+                self.db_orders, "order_id", columns=cols, page_size=page_size,
+                where=lambda q, lo=lo, hi=hi: q.gte("created_at", lo).lt("created_at", hi)))
+        # order_id -> [method, refunded]; a full rebuild reads payments in one scan, a partial one by order id
+        by_order = {}
+
+        def add_payments(rows):
+            for p in rows:
+                entry = by_order.setdefault(p["order_id"], ["none", 0])
+                if p.get("method") and p.get("status") in ("PAID", "REFUNDED"):
+                    entry[0] = p["method"]
+                if p.get("status") == "REFUNDED":
+                    entry[1] += p.get("amount") or 0
+
+        pay_cols = "payment_id,order_id,amount,status,method"
+        if days is None:
+            add_payments(iter_keyset(self.db_payments, "payment_id", columns=pay_cols, page_size=page_size))
+        totals = {}
+        for batch in chunked(orders, LOOKUP_CHUNK):
+            if days is not None:
+                ids = [o["order_id"] for o in batch]
+                add_payments(self.db_payments.select(pay_cols).in_("order_id", ids).execute().data or [])
+            for o in batch:
+                method, refunded = by_order.pop(o["order_id"], ("none", 0))
+                key = (str(o["created_at"])[:10], o.get("status") or "PLACED", method)
+                entry = totals.setdefault(key, [0, 0, 0])
+                entry[0] += 1
+                entry[1] += o.get("total_amount") or 0
+                entry[2] += refunded
+        return [{"day": day, "status": status, "method": method, "orders": n,
+                 "revenue": round(revenue, 2), "refunded": round(refunded, 2)}
+                for (day, status, method), (n, revenue, refunded) in sorted(totals.items())]
+
+    # Units sold per product since `since` (ISO date), for sales velocity
+    def units_sold_since(self, since: str, page_size: int = None) -> dict:
+        """
+        One pass over the window's order_items, paged on item_id and filtered on created_at
+        (both required columns, see the README); lines of cancelled orders are left out.
+        """
+        cancelled = {o["order_id"] for o in iter_keyset(
+            self.db_orders, "order_id", columns="order_id", page_size=page_size,
+            where=lambda q: q.eq("status", "CANCELLED").gte("created_at", since))}
+        units = {}
+        for i in iter_keyset(self.db_items, "item_id", columns="item_id,order_id,prod_id,quantity",
+                             page_size=page_size, where=lambda q: q.gte("created_at", since)):
+            if i["order_id"] not in cancelled:
+                units[i["prod_id"]] = units.get(i["prod_id"], 0) + i["quantity"]
+        return units
+
+    def products_with_stock_at_most(self, stock: int, page_size: int = None):
+        """Products whose stock is <= `stock`, paged by prod_id."""
+        return iter_keyset(self.db_products, "prod_id", columns=REORDER_COLUMNS, page_size=page_size,
+                           where=lambda q: q.lte("stock", stock))
+
+    def products_short_of(self, needs: dict):
+        """
+        Products from `needs` (prod_id -> units) that may hold fewer units than needed.
+        Ids go largest need first, so each in() chunk is bounded by a tight stock filter;
+        callers still compare each row with its own need.
+        """
+        ids = sorted(needs, key=needs.get, reverse=True)
+        for start in range(0, len(ids), LOOKUP_CHUNK):
+            chunk = ids[start:start + LOOKUP_CHUNK]
+            q = self.db_products.select(REORDER_COLUMNS).in_("prod_id", chunk).lte("stock", needs[chunk[0]])
+            yield from q.execute().data or []
+
+
+class AsyncReportDAO:
+    """Name lookups for reports on the async client; the in() chunks are fetched concurrently."""
+
+    def __init__(self, client):
+        self.db_products = client.table("products")
+        self.db_customers = client.table("customers")
+
+    @classmethod
+    async def connect(cls) -> "AsyncReportDAO":
+        return cls(await get_async_client())
+
+    async def _names_by_id(self, table, key: str, ids) -> dict:
+        ids = list(ids)
+        pages = await gather_bounded(table.select(f"{key},name").in_(key, ids[start:start + LOOKUP_CHUNK]).execute()
+                                     for start in range(0, len(ids), LOOKUP_CHUNK))
+        return {r[key]: r.get("name") for resp in pages for r in resp.data or []}
+
+    async def product_names(self, prod_ids) -> dict:
+        return await self._names_by_id(self.db_products, "prod_id", prod_ids)
+
+    async def customer_names(self, cust_ids) -> dict:
+        return await self._names_by_id(self.db_customers, "cust_id", cust_ids)
@@ -0,0 +1,215 @@
+# src/dao/rollup_dao.py
+from typing import Dict, Iterable, Iterator, List, Optional
+from src.config import get_client, get_async_client
+from src.dao.cas import arun, run
+from src.dao.scan import aiter_keyset, iter_keyset
+from src.utils import gather_bounded
+
+# ids per in() lookup / rows per upsert
+ROLLUP_CHUNK = 200
+# how often a counter update is retried after losing a race to another writer
+ROLLUP_CAS_RETRIES = 50
+
+
+class RollupConflictError(Exception):
+    pass
+
+
+# Counters take deltas by compare-and-set per key; these plans (see src/dao/cas.py)
+# are shared by RollupDAO and AsyncRollupDAO
+def _nonzero(deltas: Dict) -> Dict:
+    return {k: d for k, d in deltas.items() if d}
+
+
+def _current_plan(table, key: str, col: str, keys: List):
+    """Read the counters for `keys`, creating missing rows at 0; returns {key: value}."""
+    resp = yield table.select(f"{key},{col}").in_(key, keys)
+    current = {r[key]: r[col] for r in resp.data or []}
+    missing = [k for k in keys if k not in current]
+    if missing:
+        yield table.upsert([{key: k, col: 0} for k in missing], on_conflict=key, ignore_duplicates=True)
+        current.update({k: 0 for k in missing})
+    return current
+
+
+def _cas_plan(table, key: str, col: str, k, delta, seen):
+    """Add `delta` to the counter at `k`, last read as `seen`; re-read and retry after losing a race."""
+    for _ in range(ROLLUP_CAS_RETRIES):
+        new = round((seen or 0) + delta, 2)
+        resp = yield table.update({col: new}).eq(key, k).eq(col, seen)
+        if resp.data:
+            return
+        rows = (yield table.select(col).eq(key, k).limit(1)).data
+        if not rows:
+            yield table.upsert({key: k, col: 0}, on_conflict=key, ignore_duplicates=True)
+        seen = rows[0][col] if rows else 0
+    raise RollupConflictError(f"Could not update {col} for {key}={k}")
+
+
+def _dirty_rows(days: Iterable[str]) -> List[Dict]:
+    return [{"day": d} for d in sorted(set(days))]
+
+
+class RollupDAO:
+    """
+    Pre-aggregated report counters, kept current by the order and payment services.
+
+    product_sales(prod_id, units_sold), customer_order_counts(customer_id, orders_count)
+    and daily_revenue(day, revenue) each hold one row per key.
+
+    revenue_breakdown(day, status, method, orders, revenue, refunded) is rebuilt per
+    day from raw orders instead; the services flag changed days in revenue_dirty_days.
+    """
+
+    def __init__(self, client=None):
+        client = client or get_client()
+        self._transaction = getattr(client, "transaction", None)
+        self.db_product_sales = client.table("product_sales")
+        self.db_customer_counts = client.table("customer_order_counts")
+        self.db_daily_revenue = client.table("daily_revenue")
+        self.db_revenue = client.table("revenue_breakdown")
+        self.db_revenue_dirty = client.table("revenue_dirty_days")
+
+    # Add deltas to counters atomically: compare-and-set per key, creating missing rows at 0
+    def _bump(self, table, key: str, col: str, deltas: Dict) -> None:
+        deltas = _nonzero(deltas)
+        if not deltas:
+            return
+        current = run(_current_plan(table, key, col, list(deltas)))
+        for k, delta in deltas.items():
+            run(_cas_plan(table, key, col, k, delta, current[k]))
+
+    def add_units_sold(self, units: Dict[int, int]) -> None:
+        self._bump(self.db_product_sales, "prod_id", "units_sold", units)
+
+    def add_customer_orders(self, counts: Dict[int, int]) -> None:
+        self._bump(self.db_customer_counts, "customer_id", "orders_count", counts)
+
+    def add_revenue(self, revenue: Dict[str, float]) -> None:
+        self._bump(self.db_daily_revenue, "day", "revenue", revenue)
+
+    # --- reads ---
+    def top_products(self, n: int = 5) -> List[Dict]:
+        resp = self.db_product_sales.select("prod_id,units_sold").gt("units_sold", 0).order("units_sold", desc=True).limit(n).execute()
+        return resp.data or []
+
+    def customer_counts(self, min_orders: int = 1) -> Dict[int, int]:
+        return {r["customer_id"]: r["orders_count"] for r in self.iter_customer_counts(min_orders)}
+
+    def iter_customer_counts(self, min_orders: int = 1, after: Optional[int] = None,
+                             page_size: Optional[int] = None) -> Iterator[Dict]:
+        return iter_keyset(self.db_customer_counts, "customer_id", columns="customer_id,orders_count",
+                           where=lambda q: q.gte("orders_count", min_orders), page_size=page_size, after=after)
+
+    def revenue_since(self, day: str) -> float:
+        rows = iter_keyset(self.db_daily_revenue, "day", columns="day,revenue", where=lambda q: q.gte("day", day))
+        return round(sum(r.get("revenue") or 0 for r in rows), 2)
+
+    # --- rebuild ---
+    def _replace(self, table, key: str, col: str, values: Dict) -> None:
+        stale = [r[key] for r in iter_keyset(table, key, columns=key) if r[key] not in values]
+        for start in range(0, len(stale), ROLLUP_CHUNK):
+            table.delete().in_(key, stale[start:start + ROLLUP_CHUNK]).execute()
+        rows = [{key: k, col: v} for k, v in values.items()]
+        for start in range(0, len(rows), ROLLUP_CHUNK):
+            table.upsert(rows[start:start + ROLLUP_CHUNK], on_conflict=key).execute()
+
+    def replace_all(self, units: Dict[int, int], counts: Dict[int, int], revenue: Dict[str, float]) -> None:
+        """Overwrite every rollup with freshly computed totals."""
+        self._replace(self.db_product_sales, "prod_id", "units_sold", units)
+        self._replace(self.db_customer_counts, "customer_id", "orders_count", counts)
+        self._replace(self.db_daily_revenue, "day", "revenue", revenue)
+
+    # --- revenue breakdown ---
+    def mark_revenue_days(self, days: Iterable[str]) -> None:
+        """Flag order days whose revenue breakdown needs rebuilding."""
+        rows = _dirty_rows(days)
+        if rows:
+            self.db_revenue_dirty.upsert(rows, on_conflict="day", ignore_duplicates=True).execute()
+
+    def claim_revenue_days(self) -> List[str]:
+        """Take every flagged day off the list; a write after this flags its day again."""
+        days = [r["day"] for r in iter_keyset(self.db_revenue_dirty, "day", columns="day")]
+        for start in range(0, len(days), ROLLUP_CHUNK):
+            self.db_revenue_dirty.delete().in_("day", days[start:start + ROLLUP_CHUNK]).execute()
+        return days
+
+    def replace_revenue(self, rows: List[Dict], days: Optional[List[str]] = None) -> None:
+        """
+        Swap in breakdown rows for `days`, or for every day when days is None. Rows are upserted on
+        (day, status, method) before the keys they no longer cover are deleted, so a reader never
+        finds a day emptied; on backends with transactions (SQLite) the swap is atomic.
+        """
+        if self._transaction:
+            with self._transaction():
+                self._swap_revenue(rows, days)
+        else:
+            self._swap_revenue(rows, days)
+
+    def _swap_revenue(self, rows: List[Dict], days: Optional[List[str]]) -> None:
+        for start in range(0, len(rows), ROLLUP_CHUNK):
+            self.db_revenue.upsert(rows[start:start + ROLLUP_CHUNK], on_conflict="day,status,method").execute()
+        fresh = {(r["day"], r["status"], r["method"]) for r in rows}
+        columns = "id,day,status,method"
+        if days is None:
+            stored = iter_keyset(self.db_revenue, "id", columns=columns)
+        else:
+            stored = (r for start in range(0, len(days), ROLLUP_CHUNK) for r in iter_keyset(
+                self.db_revenue, "id", columns=columns,
+                where=lambda q, chunk=days[start:start + ROLLUP_CHUNK]: q.in_("day", chunk)))
+        stale = [r["id"] for r in stored if (str(r["day"])[:10], r["status"], r["method"]) not in fresh]
+        for start in range(0, len(stale), ROLLUP_CHUNK):
+            self.db_revenue.delete().in_("id", stale[start:start + ROLLUP_CHUNK]).execute()
+
+    def revenue_rows(self, start: str, end: str) -> Iterator[Dict]:
+        """Breakdown rows for days start..end inclusive (ISO dates)."""
+        return iter_keyset(self.db_revenue, "id", columns="id,day,status,method,orders,revenue,refunded",
+                           where=lambda q: q.gte("day", start).lte("day", end))
+
+
+class AsyncRollupDAO:
+    """RollupDAO on the async client; each key's compare-and-set runs concurrently."""
+
+    def __init__(self, client):
+        self.db_product_sales = client.table("product_sales")
+        self.db_customer_counts = client.table("customer_order_counts")
+        self.db_daily_revenue = client.table("daily_revenue")
+        self.db_revenue_dirty = client.table("revenue_dirty_days")
+
+    @classmethod
+    async def connect(cls) -> "AsyncRollupDAO":
+        return cls(await get_async_client())
+
+    async def _bump(self, table, key: str, col: str, deltas: Dict) -> None:
+        deltas = _nonzero(deltas)
+        if not deltas:
+            return
+        current = await arun(_current_plan(table, key, col, list(deltas)))
+        await gather_bounded(arun(_cas_plan(table, key, col, k, d, current[k])) for k, d in deltas.items())
+
+    async def add_units_sold(self, units: Dict[int, int]) -> None:
+        await self._bump(self.db_product_sales, "prod_id", "units_sold", units)
+
+    async def add_customer_orders(self, counts: Dict[int, int]) -> None:
+        await self._bump(self.db_customer_counts, "customer_id", "orders_count", counts)
+
+    async def add_revenue(self, revenue: Dict[str, float]) -> None:
+        await self._bump(self.db_daily_revenue, "day", "revenue", revenue)
+
+    async def mark_revenue_days(self, days: Iterable[str]) -> None:
+        rows = _dirty_rows(days)
+        if rows:
+            await self.db_revenue_dirty.upsert(rows, on_conflict="day", ignore_duplicates=True).execute()
+
+    async def top_products(self, n: int = 5) -> List[Dict]:
+        q = self.db_product_sales.select("prod_id,units_sold").gt("units_sold", 0).order("units_sold", desc=True).limit(n)
+        return (await q.execute()).data or []
+
+    async def customer_counts(self, min_orders: int = 1) -> Dict[int, int]:
+        rows = aiter_keyset(self.db_customer_counts, "customer_id", columns="customer_id,orders_count",
+                            where=lambda q: q.gte("orders_count", min_orders))
+        return {r["customer_id"]: r["orders_count"] async for r in rows}
+
+    async def revenue_since(self, day: str) -> float:
+        rows = aiter_keyset(self.db_daily_revenue, "day", columns="day,revenue", where=lambda q: q.gte("day", day))
+        return round(sum([r.get("revenue") or 0 async for r in rows]), 2)
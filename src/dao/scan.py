@@ -0,0 +1,51 @@
+# src/dao/scan.py
+"""Paginated table scans, so large tables are read page by page instead of in one capped response."""
+from typing import AsyncIterator, Callable, Dict, Iterator, Optional
+from src import tracing
+from src.config import SCAN_PAGE_SIZE
+
+
+def iter_keyset(table, key: str, columns: str = "*", where: Optional[Callable] = None,
+                page_size: Optional[int] = None, after=None) -> Iterator[Dict]:
+    """
+    Yield every row of `table` ordered by the unique column `key`, one page at a time.
+    `where` may add filters to each page's query, e.g. lambda q: q.gte("created_at", since).
+    `after` resumes past that key value, e.g. the last key a caller has already seen.
+    """
+    # the pages are often pulled long after this returns, by code outside the DAOs and services
+    return tracing.credited(_pages(table, key, columns, where, page_size or SCAN_PAGE_SIZE, after))
+
+
+def _pages(table, key, columns, where, page_size, last) -> Iterator[Dict]:
+    while True:
+        q = table.select(columns)
+        if where:
+            q = where(q)
+        if last is not None:
+            q = q.gt(key, last)
+        rows = q.order(key).limit(page_size).execute().data or []
+        # stop on an empty page rather than a short one: the server may cap pages below page_size
+        if not rows:
+            return
+        yield from rows
+        last = rows[-1][key]
+
+
+async def aiter_keyset(table, key: str, columns: str = "*", where: Optional[Callable] = None,
+                       page_size: Optional[int] = None, after=None) -> AsyncIterator[Dict]:
+    """Async iter_keyset, for tables from the async client."""
+    page_size = page_size or SCAN_PAGE_SIZE
+    last = after
+    while True:
+        q = table.select(columns)
+        if where:
+            q = where(q)
+        if last is not None:
+            q = q.gt(key, last)
+        rows = (await q.order(key).limit(page_size).execute()).data or []
+        if not rows:
+            return
+        for row in rows:
+            yield row
+        last = rows[-1][key]
+
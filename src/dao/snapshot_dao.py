@@ -0,0 +1,305 @@
+# src/dao/snapshot_dao.py
+"""
+Columnar snapshot of the sales tables for the analytics reports.
+
+Each table is a directory of raw little-endian column files, described by
+meta.json (row counts and the id watermark of the last refresh):
+
+    snapshot/meta.json
+    snapshot/orders/order_id.bin customer_id.bin total_amount.bin status.bin day.bin
+    snapshot/orders/status.json      values of a string column; status.bin holds their codes
+
+Columns open as numpy.memmap, so nothing is loaded up front and processes
+reading the same snapshot share the OS page cache. `refresh` appends the
+rows past each table's watermark and re-reads the columns that change after
+a row is written (order status, payment status and method) for rows created
+in the last SNAPSHOT_RECHECK_DAYS. Older changes, and edits to products or
+customers, are picked up by a full refresh.
+
+NumPy is optional for the rest of the application; only this module and the
+analytics service need it.
+"""
+import json
+import os
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # checked by require_numpy() when a snapshot is used
+    np = None
+
+from src.config import SNAPSHOT_DIR, SNAPSHOT_RECHECK_DAYS, get_client
+from src.dao.scan import iter_keyset
+from src.utils import chunked
+
+SNAPSHOT_VERSION = 1
+# rows encoded and written per batch; meta.json is saved after each one, so an export can resume
+SNAPSHOT_BATCH = 100_000
+EPOCH = date(1970, 1, 1)
+
+# table -> (id column, {column: kind}), refreshed in this order: rows are read before the
+# rows they reference, so every order an item or payment points to is in the snapshot.
+# "str" columns hold int32 codes into the column's values (-1 for null); "day" is the
+# created_at date as days since 1970-01-01, the same day the rollups book an order on.
+SNAPSHOT_TABLES = {
+    "products": ("prod_id", {"prod_id": "int64", "name": "str", "category": "str", "price": "float64"}),
+    "customers": ("cust_id", {"cust_id": "int64", "name": "str"}),
+    "order_items": ("item_id", {"item_id": "int64", "order_id": "int64", "prod_id": "int64", "quantity": "int32"}),
+    "payments": ("payment_id", {"payment_id": "int64", "order_id": "int64", "amount": "float64",
+                                "status": "str", "method": "str"}),
+    "orders": ("order_id", {"order_id": "int64", "customer_id": "int64", "total_amount": "float64",
+                            "status": "str", "day": "day"}),
+}
+# columns stored under another name than they are read as
+SOURCE_COLUMNS = {"day": "created_at"}
+# columns that can change after their row is written
+MUTABLE_COLUMNS = {"orders": ("status",), "payments": ("status", "method")}
+
+DTYPES = {"int64": "<i8", "int32": "<i4", "float64": "<f8", "str": "<i4", "day": "<i4"}
+
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError("the analytics snapshot needs NumPy: pip install numpy")
+    return np
+
+
+def to_day(value) -> int:
+    """Days since 1970-01-01 of an ISO timestamp's date part."""
+    return (date.fromisoformat(str(value)[:10]) - EPOCH).days
+
+
+@contextmanager
+def _locked(path: str):
+    # one refresh per snapshot at a time; a second one waits, then only adds what is new
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, ".lock"), "w") as fh:
+        try:
+            import fcntl
+        except ImportError:  # Windows: callers have to avoid overlapping refreshes
+            fcntl = None
+        if fcntl:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        yield
+
+
+class ColumnStore:
+    """
+    The column files of one snapshot directory.
+
+    Appended rows stay invisible until save(), which writes the new row counts
+    to meta.json last; bytes past the saved count (from an interrupted write)
+    are cut off before the next append.
+    """
+
+    def __init__(self, path: str):
+        require_numpy()
+        self.path = path
+        self._meta_path = os.path.join(path, "meta.json")
+        self.meta = self._read_meta()
+        self._values: Dict = {}  # (table, column) -> (values, {value: code})
+        self._pending: Dict[str, int] = {}
+
+    def _read_meta(self) -> Dict:
+        try:
+            with open(self._meta_path, encoding="utf-8") as fh:
+                meta = json.load(fh)
+        except FileNotFoundError:
+            return {"version": SNAPSHOT_VERSION, "tables": {}}
+        if meta.get("version") != SNAPSHOT_VERSION:
+            raise RuntimeError(f"snapshot in {self.path} has format {meta.get('version')}, expected "
+                               f"{SNAPSHOT_VERSION}; run `report snapshot --full`")
+        return meta
+
+    def exists(self) -> bool:
+        return bool(self.meta["tables"])
+
+    def info(self, table: str) -> Dict:
+        return self.meta["tables"].setdefault(table, {"rows": 0, "watermark": None, "refreshed_at": None})
+
+    def rows(self, table: str) -> int:
+        return self.info(table)["rows"]
+
+    def _file(self, table: str, column: str, ext: str = "bin") -> str:
+        return os.path.join(self.path, table, f"{column}.{ext}")
+
+    def column(self, table: str, column: str, writable: bool = False):
+        """The saved rows of a column, memory-mapped."""
+        dtype = np.dtype(DTYPES[SNAPSHOT_TABLES[table][1][column]])
+        n = self.rows(table)
+        if not n:
+            return np.zeros(0, dtype)
+        return np.memmap(self._file(table, column), dtype=dtype, mode="r+" if writable else "r", shape=(n,))
+
+    def _dictionary(self, table: str, column: str):
+        key = (table, column)
+        if key not in self._values:
+            try:
+                with open(self._file(table, column, "json"), encoding="utf-8") as fh:
+                    values = json.load(fh)
+            except FileNotFoundError:
+                values = []
+            self._values[key] = (values, {v: i for i, v in enumerate(values)})
+        return self._values[key]
+
+    def values(self, table: str, column: str) -> List:
+        """The values a "str" column's codes stand for."""
+        return self._dictionary(table, column)[0]
+
+    def code(self, table: str, column: str, value) -> int:
+        """Code of `value` in a "str" column, or -2 when no row holds it."""
+        return self._dictionary(table, column)[1].get(value, -2)
+
+    def encode(self, table: str, column: str, values: Iterable):
+        words, codes = self._dictionary(table, column)
+        out = []
+        for v in values:
+            if v is None:
+                out.append(-1)
+                continue
+            c = codes.get(v)
+            if c is None:
+                c = codes[v] = len(words)
+                words.append(v)
+            out.append(c)
+        return np.array(out, dtype=DTYPES["str"])
+
+    def append(self, table: str, arrays: Dict) -> None:
+        """Append one array per column of `table`, all of the same length."""
+        kinds = SNAPSHOT_TABLES[table][1]
+        lengths = {len(arrays[c]) for c in kinds}
+        if len(lengths) != 1:
+            raise ValueError(f"columns of {table} differ in length: {sorted(lengths)}")
+        os.makedirs(os.path.join(self.path, table), exist_ok=True)
+        first = table not in self._pending
+        for column, kind in kinds.items():
+            path = self._file(table, column)
+            dtype = np.dtype(DTYPES[kind])
+            if first and os.path.exists(path) and os.path.getsize(path) > self.rows(table) * dtype.itemsize:
+                os.truncate(path, self.rows(table) * dtype.itemsize)
+            with open(path, "ab") as fh:
+                np.ascontiguousarray(arrays[column], dtype=dtype).tofile(fh)
+        self._pending[table] = self._pending.get(table, 0) + lengths.pop()
+
+    def reset(self, table: str) -> None:
+        for column in SNAPSHOT_TABLES[table][1]:
+            for ext in ("bin", "json"):
+                if os.path.exists(self._file(table, column, ext)):
+                    os.remove(self._file(table, column, ext))
+            self._values.pop((table, column), None)
+        self.meta["tables"][table] = {"rows": 0, "watermark": None, "refreshed_at": None}
+        self._pending.pop(table, None)
+
+    def save(self) -> None:
+        """Make appended rows visible: dictionaries first, then meta.json, each replaced atomically."""
+        for (table, column), (values, _) in self._values.items():
+            self._replace(self._file(table, column, "json"), values)
+        for table, n in self._pending.items():
+            self.info(table)["rows"] += n
+        self._pending = {t: 0 for t in self._pending}
+        self._replace(self._meta_path, self.meta)
+
+    @staticmethod
+    def _replace(path: str, data) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(data, fh)
+        os.replace(tmp, path)
+
+
+class SnapshotDAO:
+    """Exports the sales tables into a ColumnStore at `path` and keeps it current."""
+
+    def __init__(self, client=None, path: Optional[str] = None):
+        # the client is only needed to refresh; reading a snapshot never connects
+        self._client = client
+        self.path = path or SNAPSHOT_DIR
+
+    def _table(self, name: str):
+        if self._client is None:
+            self._client = get_client()
+        return self._client.table(name)
+
+    def open(self) -> ColumnStore:
+        return ColumnStore(self.path)
+
+    def version(self) -> Optional[int]:
+        """Changes whenever a refresh saves; None when there is no snapshot yet."""
+        try:
+            return os.stat(os.path.join(self.path, "meta.json")).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def refresh(self, full: bool = False, recheck_days: Optional[int] = None, page_size: Optional[int] = None) -> Dict:
+        """
+        Bring the snapshot up to date (or rebuild it with `full`).
+        Returns per table the row count, the rows added and the stored values changed.
+        """
+        recheck_days = SNAPSHOT_RECHECK_DAYS if recheck_days is None else recheck_days
+        with _locked(self.path):
+            store = self.open()
+            summary = {}
+            for table in SNAPSHOT_TABLES:
+                if full:
+                    store.reset(table)
+                changed = 0 if full else self._recheck(store, table, recheck_days, page_size)
+                added = self._append(store, table, page_size)
+                store.info(table)["refreshed_at"] = datetime.now(timezone.utc).isoformat()
+                store.save()
+                summary[table] = {"rows": store.rows(table), "added": added, "changed": changed}
+            return summary
+
+    def _append(self, store: ColumnStore, table: str, page_size: Optional[int]) -> int:
+        key, kinds = SNAPSHOT_TABLES[table]
+        info = store.info(table)
+        columns = ",".join(SOURCE_COLUMNS.get(c, c) for c in kinds)
+        rows = iter_keyset(self._table(table), key, columns=columns, page_size=page_size, after=info["watermark"])
+        added = 0
+        for batch in chunked(rows, SNAPSHOT_BATCH):
+            store.append(table, self._encode(store, table, batch))
+            info["watermark"] = batch[-1][key]
+            added += len(batch)
+            store.save()
+        return added
+
+    @staticmethod
+    def _encode(store: ColumnStore, table: str, rows: List[Dict]) -> Dict:
+        arrays = {}
+        for column, kind in SNAPSHOT_TABLES[table][1].items():
+            values = [r.get(SOURCE_COLUMNS.get(column, column)) for r in rows]
+            if kind == "str":
+                arrays[column] = store.encode(table, column, values)
+            elif kind == "day":
+                arrays[column] = np.array([to_day(v) if v else -1 for v in values], dtype=DTYPES[kind])
+            else:
+                arrays[column] = np.array([v or 0 for v in values], dtype=DTYPES[kind])
+        return arrays
+
+    def _recheck(self, store: ColumnStore, table: str, days: int, page_size: Optional[int]) -> int:
+        columns = MUTABLE_COLUMNS.get(table)
+        info = store.info(table)
+        if not columns or not info["rows"] or days <= 0:
+            return 0
+        key = SNAPSHOT_TABLES[table][0]
+        since, watermark = (date.today() - timedelta(days=days)).isoformat(), info["watermark"]
+        rows = iter_keyset(self._table(table), key, columns=",".join((key,) + columns), page_size=page_size,
+                           where=lambda q: q.gte("created_at", since).lte(key, watermark))
+        # rows were appended in id order, so the id column is sorted
+        ids = store.column(table, key)
+        targets = {c: store.column(table, c, writable=True) for c in columns}
+        changed = 0
+        for batch in chunked(rows, SNAPSHOT_BATCH):
+            wanted = np.array([r[key] for r in batch], dtype=DTYPES["int64"])
+            pos = np.minimum(np.searchsorted(ids, wanted), len(ids) - 1)
+            found = ids[pos] == wanted
+            for c, target in targets.items():
+                new = store.encode(table, c, [r.get(c) for r in batch])
+                diff = found & (target[pos] != new)
+                target[pos[diff]] = new[diff]
+                changed += int(diff.sum())
+        for target in targets.values():
+            target.flush()
+        return changed
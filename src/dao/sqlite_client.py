@@ -0,0 +1,401 @@
+# src/dao/sqlite_client.py
+"""
+Local SQLite backend with the same query-builder surface the DAOs use on supabase.
+
+`SQLiteClient(path).table(name)` supports select/insert/upsert/update/delete,
+the eq/neq/gt/gte/lt/lte/in_/is_ filters and order/limit/range, and
+`.execute()` returns an object with `.data` like a PostgREST response. Writes
+return the affected rows, and selects may embed related tables (see
+src/dao/embed.py). Each thread gets its own connection to a WAL-mode
+database file, and `transaction()` groups statements into one commit.
+"""
+import asyncio
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from src.dao.embed import attach, fetch_columns, parse_select
+
+_NOW = "(strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))"
+
+SCHEMA = f"""
+create table if not exists products (
+    prod_id integer primary key autoincrement,
+    name text not null,
+    sku text not null unique,
+    price real not null,
+    stock integer default 0,
+    category text,
+    created_at text not null default {_NOW}
+);
+create table if not exists customers (
+    cust_id integer primary key autoincrement,
+    name text not null,
+    email text not null unique,
+    phone text,
+    city text,
+    created_at text not null default {_NOW}
+);
+create table if not exists orders (
+    order_id integer primary key autoincrement,
+    customer_id integer not null references customers(cust_id),
+    total_amount real not null default 0,
+    status text not null default 'PLACED',
+    created_at text not null default {_NOW}
+);
+create table if not exists order_items (
+    item_id integer primary key autoincrement,
+    order_id integer not null references orders(order_id),
+    prod_id integer not null references products(prod_id),
+    quantity integer not null,
+    created_at text not null default {_NOW}
+);
+create table if not exists payments (
+    payment_id integer primary key autoincrement,
+    order_id integer not null references orders(order_id),
+    amount real not null default 0,
+    status text not null default 'PENDING',
+    method text,
+    created_at text not null default {_NOW}
+);
+create table if not exists product_sales (prod_id integer primary key, units_sold integer not null default 0);
+create table if not exists customer_order_counts (customer_id integer primary key, orders_count integer not null default 0);
+create table if not exists daily_revenue (day text primary key, revenue real not null default 0);
+create table if not exists revenue_breakdown (
+    id integer primary key autoincrement,
+    day text not null,
+    status text not null,
+    method text not null,
+    orders integer not null default 0,
+    revenue real not null default 0,
+    refunded real not null default 0,
+    unique (day, status, method)
+);
+create table if not exists revenue_dirty_days (day text primary key);
+
+create index if not exists idx_orders_customer_id on orders(customer_id);
+create index if not exists idx_orders_created_at on orders(created_at);
+create index if not exists idx_order_items_order_id on order_items(order_id);
+create index if not exists idx_order_items_created_at on order_items(created_at);
+create index if not exists idx_payments_order_id on payments(order_id);
+"""
+# sku and email are covered by their unique constraints
+
+PRIMARY_KEYS = {
+    "products": "prod_id",
+    "customers": "cust_id",
+    "orders": "order_id",
+    "order_items": "item_id",
+    "payments": "payment_id",
+    "product_sales": "prod_id",
+    "customer_order_counts": "customer_id",
+    "daily_revenue": "day",
+    "revenue_breakdown": "id",
+    "revenue_dirty_days": "day",
+}
+
+# bound parameters per in() lookup when resolving embedded resources
+EMBED_CHUNK = 500
+
+_IDENT = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_COMPARE = {"eq": "=", "neq": "<>", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+def _ident(name: str) -> str:
+    if not _IDENT.match(name):
+        raise ValueError(f"invalid identifier {name!r}")
+    return f'"{name}"'
+
+
+class SQLiteResponse:
+    def __init__(self, data: List[Dict], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class SQLiteQuery:
+    def __init__(self, table: "SQLiteTable", action: str, payload=None, columns=("*",), on_conflict: str = "",
+                 ignore_duplicates: bool = False):
+        self._table = table
+        self._action = action
+        self._payload = payload
+        self._columns = columns
+        self._on_conflict = on_conflict
+        self._ignore_duplicates = ignore_duplicates
+        self._filters = []
+        self._order = []
+        self._limit = None
+        self._offset = 0
+
+    # --- filters ---
+    def _add(self, op, col, value):
+        self._filters.append((op, col, value))
+        return self
+
+    def eq(self, col, value):
+        return self._add("eq", col, value)
+
+    def neq(self, col, value):
+        return self._add("neq", col, value)
+
+    def gt(self, col, value):
+        return self._add("gt", col, value)
+
+    def gte(self, col, value):
+        return self._add("gte", col, value)
+
+    def lt(self, col, value):
+        return self._add("lt", col, value)
+
+    def lte(self, col, value):
+        return self._add("lte", col, value)
+
+    def in_(self, col, values):
+        return self._add("in", col, list(values))
+
+    def is_(self, col, value):
+        return self._add("is", col, value)
+
+    # --- modifiers ---
+    def select(self, *columns):
+        self._columns = columns or ("*",)
+        return self
+
+    def order(self, col, desc: bool = False):
+        self._order.append((col, desc))
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def range(self, start: int, end: int):
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def execute(self):
+        if self._table.is_async:
+            return asyncio.to_thread(self._table._client._execute, self)
+        return self._table._client._execute(self)
+
+    # --- SQL ---
+    def _parsed(self):
+        cols, embeds = parse_select(self._columns)
+        if embeds and self._action != "select":
+            raise ValueError("embedded resources are only supported on select")
+        return cols, embeds
+
+    def _columns_sql(self) -> str:
+        cols, embeds = self._parsed()
+        cols = fetch_columns(self._table.name, cols, embeds)[0]
+        return "*" if "*" in cols else ", ".join(_ident(c) for c in cols)
+
+    def _where_sql(self):
+        clauses, params = [], []
+        for op, col, value in self._filters:
+            if op == "in":
+                if not value:
+                    clauses.append("0")
+                    continue
+                clauses.append(f"{_ident(col)} in ({', '.join('?' * len(value))})")
+                params.extend(value)
+            elif op == "is":
+                literal = {"null": "null", "true": "1", "false": "0"}.get(str(value).lower())
+                if literal is None:
+                    raise ValueError(f"unsupported is_ value {value!r}")
+                clauses.append(f"{_ident(col)} is {literal}")
+            else:
+                clauses.append(f"{_ident(col)} {_COMPARE[op]} ?")
+                params.append(value)
+        return (" where " + " and ".join(clauses) if clauses else ""), params
+
+    def _select_sql(self):
+        where, params = self._where_sql()
+        sql = f"select {self._columns_sql()} from {_ident(self._table.name)}{where}"
+        if self._order:
+            # postgrest puts nulls last ascending and first descending
+            sql += " order by " + ", ".join(
+                f"{_ident(c)} {'desc nulls first' if d else 'asc nulls last'}" for c, d in self._order)
+        if self._limit is not None or self._offset:
+            sql += " limit ? offset ?"
+            params += [-1 if self._limit is None else self._limit, self._offset]
+        return sql, params
+
+    def _insert_sql(self, row: Dict):
+        cols = ", ".join(_ident(c) for c in row)
+        sql = f"insert into {_ident(self._table.name)} ({cols}) values ({', '.join('?' * len(row))})"
+        if self._action == "upsert":
+            # on_conflict may name several columns, e.g. "day,status,method", as with PostgREST
+            keys = [k.strip() for k in (self._on_conflict or PRIMARY_KEYS[self._table.name]).split(",")]
+            target = ", ".join(_ident(k) for k in keys)
+            updates = ", ".join(f"{_ident(c)} = excluded.{_ident(c)}" for c in row if c not in keys)
+            if self._ignore_duplicates or not updates:
+                sql += f" on conflict ({target}) do nothing"
+            else:
+                sql += f" on conflict ({target}) do update set {updates}"
+        return sql + f" returning {self._columns_sql()}", list(row.values())
+
+    def _statements(self):
+        """SQL for this query; several statements (one per row) for bulk inserts and upserts."""
+        if self._action == "select":
+            return [self._select_sql()]
+        if self._action in ("insert", "upsert"):
+            rows = self._payload if isinstance(self._payload, list) else [self._payload]
+            return [self._insert_sql(r) for r in rows]
+        where, params = self._where_sql()
+        table = _ident(self._table.name)
+        if self._action == "update":
+            sets = ", ".join(f"{_ident(c)} = ?" for c in self._payload)
+            return [(f"update {table} set {sets}{where} returning {self._columns_sql()}",
+                     list(self._payload.values()) + params)]
+        return [(f"delete from {table}{where} returning {self._columns_sql()}", params)]
+
+
+class SQLiteTable:
+    def __init__(self, client: "SQLiteClient", name: str, is_async: bool = False):
+        self._client = client
+        self.name = name
+        self.is_async = is_async
+
+    def select(self, *columns, count=None):
+        return SQLiteQuery(self, "select", columns=columns or ("*",))
+
+    def insert(self, json, **kwargs):
+        return SQLiteQuery(self, "insert", payload=json)
+
+    def upsert(self, json, on_conflict: str = "", ignore_duplicates: bool = False, **kwargs):
+        return SQLiteQuery(self, "upsert", payload=json, on_conflict=on_conflict, ignore_duplicates=ignore_duplicates)
+
+    def update(self, json, **kwargs):
+        return SQLiteQuery(self, "update", payload=json)
+
+    def delete(self, **kwargs):
+        return SQLiteQuery(self, "delete")
+
+
+class SQLiteClient:
+    """Drop-in for `supabase.Client` in DAO constructors, backed by the SQLite file at `path`."""
+
+    def __init__(self, path: str, busy_timeout: float = 30.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.calls = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        with self._lock:
+            conn = self._connect()
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: autocommit per statement unless inside transaction()
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("pragma journal_mode = wal")
+        conn.execute("pragma synchronous = normal")
+        conn.execute("pragma foreign_keys = on")
+        self._connections.append(conn)
+        self._local.conn = conn
+        self._local.depth = 0
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            with self._lock:
+                conn = self._connect()
+        return conn
+
+    def table(self, name: str) -> SQLiteTable:
+        return SQLiteTable(self, name)
+
+    def aio(self) -> "_AsyncView":
+        """Async client over the same database; statements run on worker threads."""
+        return _AsyncView(self)
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Run the enclosed statements on this thread as one transaction.
+        The write lock is taken up front, so the block never fails half way on a lock upgrade.
+        Nested blocks become savepoints.
+        """
+        conn = self._conn()
+        depth = self._local.depth
+        name = f"sp{depth}"
+        conn.execute("begin immediate" if depth == 0 else f"savepoint {name}")
+        self._local.depth = depth + 1
+        try:
+            yield
+        except BaseException:
+            conn.execute("rollback" if depth == 0 else f"rollback to {name}")
+            if depth:
+                conn.execute(f"release {name}")
+            raise
+        else:
+            conn.execute("commit" if depth == 0 else f"release {name}")
+        finally:
+            self._local.depth = depth
+
+    def _run(self, statements) -> List[Dict]:
+        conn = self._conn()
+        if len(statements) == 1:
+            sql, params = statements[0]
+            return [dict(r) for r in conn.execute(sql, params).fetchall()]
+        # a bulk write succeeds or fails as a whole, like one PostgREST request
+        rows = []
+        with self.transaction():
+            for sql, params in statements:
+                rows.extend(dict(r) for r in conn.execute(sql, params).fetchall())
+        return rows
+
+    def _execute(self, q: SQLiteQuery) -> SQLiteResponse:
+        statements = q._statements()
+        with self._lock:
+            self.calls += 1
+        rows = self._run(statements)
+        cols, embeds = q._parsed()
+        if embeds:
+            self._embed(q._table.name, rows, cols, embeds)
+        return SQLiteResponse(rows)
+
+    def _embed(self, table: str, rows: List[Dict], cols: List[str], embeds) -> None:
+        conn = self._conn()
+
+        def fetch(name, columns, key, values):
+            cols_sql = "*" if "*" in columns else ", ".join(_ident(c) for c in columns)
+            order = _ident(PRIMARY_KEYS.get(name, key))
+            out = []
+            for start in range(0, len(values), EMBED_CHUNK):
+                chunk = values[start:start + EMBED_CHUNK]
+                sql = (f"select {cols_sql} from {_ident(name)} where {_ident(key)} in ({', '.join('?' * len(chunk))})"
+                       f" order by {order}")
+                out.extend(dict(r) for r in conn.execute(sql, chunk))
+            return out
+
+        attach(table, rows, embeds, fetch)
+        for k in fetch_columns(table, cols, embeds)[1]:
+            for r in rows:
+                r.pop(k, None)
+
+    def seed(self, name: str, rows: List[Dict]) -> List[Dict]:
+        """Bulk-load rows in one transaction, without counting toward `calls`."""
+        return self._run(self.table(name).insert(rows)._statements()) if rows else []
+
+    def close(self) -> None:
+        with self._lock:
+            conns, self._connections = self._connections, []
+        for conn in conns:
+            conn.close()
+        self._local = threading.local()
+
+
+class _AsyncView:
+    def __init__(self, client: SQLiteClient):
+        self._client = client
+
+    def table(self, name: str) -> SQLiteTable:
+        return SQLiteTable(self._client, name, is_async=True)
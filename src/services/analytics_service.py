@@ -0,0 +1,303 @@
+# src/services/analytics_service.py
+"""
+Reports computed with NumPy over the columnar snapshot (`report snapshot`).
+
+top_5_products, total_revenue_last_month, orders_per_customer and
+frequent_customers give ReportService's answers as of the last refresh,
+without a query. RFM segments and co-purchase counts are only answered
+here, since each would be another full scan over HTTP.
+"""
+from datetime import date
+from typing import Dict, Iterator, List, Optional
+
+from src.config import SCAN_PAGE_SIZE
+from src.dao import snapshot_dao
+from src.utils import lazy_default
+
+np = snapshot_dao.np
+
+# checked in order, the first match names a customer's segment; scores run 1 (worst) to 5
+RFM_SEGMENTS = (
+    ("champions", lambda r, f: (r >= 4) & (f >= 4)),
+    ("loyal", lambda r, f: (r >= 3) & (f >= 3)),
+    ("new", lambda r, f: (r >= 4) & (f <= 2)),
+    ("at_risk", lambda r, f: (r <= 2) & (f >= 3)),
+    ("hibernating", lambda r, f: (r <= 2) & (f <= 2)),
+)
+RFM_OTHER = "needs_attention"
+
+
+def _today() -> int:
+    return (date.today() - snapshot_dao.EPOCH).days
+
+
+def _scores(values, higher_is_better: bool = True):
+    """
+    Quintile score 1-5 of each value, 5 for the best. Tied values share one score: the
+    higher one for lower-is-better values (recency, where ties pile up at the best value,
+    everyone who ordered today) and the lower one otherwise (frequency, where they pile
+    up at the worst, the many one-order customers).
+    """
+    if not len(values):
+        return np.zeros(0, np.int8)
+    values = values if higher_is_better else -values
+    edges = np.quantile(values, (0.2, 0.4, 0.6, 0.8))
+    side = "left" if higher_is_better else "right"
+    return (1 + np.searchsorted(edges, values, side=side)).astype(np.int8)
+
+
+# np.unique hashes large integer arrays in NumPy 2, which is many times slower than a sort here
+def _distinct(keys):
+    """Sorted distinct values of an integer array."""
+    keys = np.sort(keys)
+    return keys[np.r_[True, keys[1:] != keys[:-1]]] if len(keys) else keys
+
+
+def _counted(keys):
+    """Sorted distinct values of an integer array and how often each occurs."""
+    keys = np.sort(keys)
+    if not len(keys):
+        return keys, np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return keys[starts], np.diff(np.r_[starts, len(keys)])
+
+
+class AnalyticsService:
+    """Answers from the snapshot at SNAPSHOT_DIR; reopens it after each refresh."""
+
+    def __init__(self, dao=None):
+        snapshot_dao.require_numpy()
+        self._dao = dao or snapshot_dao.SnapshotDAO()
+        self._store = None
+        self._version = None
+        self._cache: Dict = {}
+
+    def refresh(self, full: bool = False, recheck_days: Optional[int] = None) -> Dict:
+        return self._dao.refresh(full=full, recheck_days=recheck_days)
+
+    # --- snapshot access ---
+    def _data(self) -> snapshot_dao.ColumnStore:
+        version = self._dao.version()
+        if version is None:
+            raise RuntimeError(f"no snapshot in {self._dao.path!r}; run `report snapshot` first")
+        if version != self._version:
+            # arrays derived from the old snapshot are dropped with it
+            self._store, self._version, self._cache = self._dao.open(), version, {}
+        return self._store
+
+    def _col(self, table: str, column: str):
+        return self._data().column(table, column)
+
+    def _cached(self, name: str, build):
+        self._data()
+        if name not in self._cache:
+            self._cache[name] = build()
+        return self._cache[name]
+
+    def _by_id(self, table: str, size: int = 0):
+        """Row of each id as an array indexed by id, -1 where there is none."""
+        def build():
+            ids = self._col(table, snapshot_dao.SNAPSHOT_TABLES[table][0])
+            index = np.full(int(ids.max()) + 1 if len(ids) else 0, -1, dtype=np.int64)
+            index[ids] = np.arange(len(ids))
+            return index
+        index = self._cached(f"{table}.index", build)
+        if len(index) < size:
+            index = np.concatenate([index, np.full(size - len(index), -1, dtype=np.int64)])
+        return index
+
+    def _names(self, table: str, ids) -> List[Optional[str]]:
+        store = self._data()
+        rows = self._by_id(table, int(ids.max()) + 1 if len(ids) else 0)[ids]
+        codes = np.where(rows >= 0, self._col(table, "name")[np.maximum(rows, 0)], -1)
+        words = store.values(table, "name")
+        return [words[c] if c >= 0 else None for c in codes.tolist()]
+
+    def _status_is(self, table: str, status: str):
+        return self._col(table, "status") == self._data().code(table, "status", status)
+
+    def _live_orders(self):
+        """Mask of orders that are not cancelled."""
+        return self._cached("orders.live", lambda: ~self._status_is("orders", "CANCELLED"))
+
+    def _live_items(self):
+        """Mask of order lines whose order is not cancelled (or not in the snapshot)."""
+        def build():
+            orders, lines = self._col("orders", "order_id"), self._col("order_items", "order_id")
+            size = int(max(orders.max() if len(orders) else 0, lines.max() if len(lines) else 0)) + 1
+            cancelled = np.zeros(size, dtype=bool)
+            cancelled[orders[~self._live_orders()]] = True
+            return ~cancelled[lines]
+        return self._cached("order_items.live", build)
+
+    def _refunds(self):
+        """(order_id, amount) of refunded payments."""
+        def build():
+            refunded = self._status_is("payments", "REFUNDED")
+            return self._col("payments", "order_id")[refunded], self._col("payments", "amount")[refunded]
+        return self._cached("payments.refunds", build)
+
+    def _order_rows(self, order_ids):
+        index = self._by_id("orders", int(order_ids.max()) + 1 if len(order_ids) else 0)
+        return index[order_ids]
+
+    # --- the ReportService reports ---
+    def top_5_products(self) -> List[Dict]:
+        live = self._live_items()
+        prods = self._col("order_items", "prod_id")[live]
+        units = np.bincount(prods, weights=self._col("order_items", "quantity")[live]).astype(np.int64)
+        ids = np.flatnonzero(units > 0)
+        top = ids[np.lexsort((ids, -units[ids]))[:5]]
+        return [{"product": name, "quantity_sold": int(units[pid])}
+                for pid, name in zip(top.tolist(), self._names("products", top))]
+
+    def total_revenue_last_month(self) -> float:
+        """Totals of orders (not cancelled) booked on the last 30 days, less refunds on those orders."""
+        since = _today() - 30
+        booked = (self._col("orders", "day") >= since) & self._live_orders()
+        total = self._col("orders", "total_amount")[booked].sum()
+        order_ids, amounts = self._refunds()
+        rows = self._order_rows(order_ids)
+        booked = (rows >= 0) & booked[np.maximum(rows, 0)]
+        return round(float(total - amounts[booked].sum()), 2)
+
+    def _order_counts(self):
+        return self._cached("customers.orders", lambda: np.bincount(self._col("orders", "customer_id")[self._live_orders()]))
+
+    def iter_customer_orders(self, min_orders: int = 1, after: Optional[int] = None,
+                             page_size: Optional[int] = None) -> Iterator[Dict]:
+        """Same rows as ReportService.iter_customer_orders, in customer_id order."""
+        counts = self._order_counts()
+        ids = np.flatnonzero(counts >= max(min_orders, 1))
+        if after is not None:
+            ids = ids[ids > after]
+        step = page_size or SCAN_PAGE_SIZE
+        for start in range(0, len(ids), step):
+            page = ids[start:start + step]
+            for cid, name, n in zip(page.tolist(), self._names("customers", page), counts[page].tolist()):
+                yield {"customer_id": cid, "customer": name, "orders_count": n}
+
+    def orders_per_customer(self) -> List[Dict]:
+        return [{"customer": r["customer"], "orders_count": r["orders_count"]} for r in self.iter_customer_orders()]
+
+    # more than 2 orders
+    def frequent_customers(self) -> List[Dict]:
+        return [{"customer": r["customer"], "orders_count": r["orders_count"]}
+                for r in self.iter_customer_orders(min_orders=3)]
+
+    # --- RFM ---
+    def _rfm(self) -> Dict:
+        """Per customer with a live order: recency in days, order count, net spend and their scores."""
+        def build():
+            live = self._live_orders()
+            customers = self._col("orders", "customer_id")[live]
+            days = self._col("orders", "day")[live]
+            size = int(customers.max()) + 1 if len(customers) else 0
+            # latest day per customer: sort (customer, day) keys and take the last of each customer's run
+            first, span = (int(days.min()), int(days.max()) - int(days.min()) + 1) if len(days) else (0, 1)
+            keys = np.sort(customers * span + (days - first))
+            ends = np.r_[keys[1:] // span != keys[:-1] // span, True] if len(keys) else np.zeros(0, dtype=bool)
+            last = np.full(size, -1, dtype=np.int64)
+            last[keys[ends] // span] = keys[ends] % span + first
+            frequency = np.bincount(customers, minlength=size)
+            spend = np.bincount(customers, weights=self._col("orders", "total_amount")[live], minlength=size)
+            order_ids, amounts = self._refunds()
+            rows = self._order_rows(order_ids)
+            refunded = (rows >= 0) & live[np.maximum(rows, 0)]
+            spend -= np.bincount(self._col("orders", "customer_id")[rows[refunded]], weights=amounts[refunded],
+                                 minlength=size)[:size]
+            ids = np.flatnonzero(frequency)
+            recency = _today() - last[ids]
+            r, f = _scores(recency, higher_is_better=False), _scores(frequency[ids])
+            m = _scores(spend[ids])
+            segment = np.full(len(ids), len(RFM_SEGMENTS), dtype=np.int8)
+            for i, (_, rule) in reversed(list(enumerate(RFM_SEGMENTS))):
+                segment[rule(r, f)] = i
+            return {"customer_id": ids, "recency_days": recency, "frequency": frequency[ids],
+                    "monetary": np.round(spend[ids], 2), "r": r, "f": f, "m": m, "segment": segment}
+        return self._cached("customers.rfm", build)
+
+    def rfm_segments(self) -> List[Dict]:
+        """Customers, orders and net spend per RFM segment."""
+        rfm = self._rfm()
+        names = [name for name, _ in RFM_SEGMENTS] + [RFM_OTHER]
+        n = np.bincount(rfm["segment"], minlength=len(names))
+        orders = np.bincount(rfm["segment"], weights=rfm["frequency"], minlength=len(names))
+        spend = np.bincount(rfm["segment"], weights=rfm["monetary"], minlength=len(names))
+        recency = np.bincount(rfm["segment"], weights=rfm["recency_days"], minlength=len(names))
+        return [{"segment": name, "customers": int(n[i]), "orders": int(orders[i]), "revenue": round(float(spend[i]), 2),
+                 "avg_recency_days": round(float(recency[i] / n[i]), 1) if n[i] else None}
+                for i, name in enumerate(names)]
+
+    def iter_rfm(self, segment: Optional[str] = None, after: Optional[int] = None,
+                 page_size: Optional[int] = None) -> Iterator[Dict]:
+        """Each customer's RFM values, scores and segment, in customer_id order."""
+        rfm = self._rfm()
+        names = [name for name, _ in RFM_SEGMENTS] + [RFM_OTHER]
+        keep = np.ones(len(rfm["customer_id"]), dtype=bool)
+        if segment is not None:
+            if segment not in names:
+                raise ValueError(f"segment must be one of {', '.join(names)}")
+            keep &= rfm["segment"] == names.index(segment)
+        if after is not None:
+            keep &= rfm["customer_id"] > after
+        rows = np.flatnonzero(keep)
+        step = page_size or SCAN_PAGE_SIZE
+        for start in range(0, len(rows), step):
+            page = rows[start:start + step]
+            cols = {k: v[page].tolist() for k, v in rfm.items()}
+            for i, name in enumerate(self._names("customers", rfm["customer_id"][page])):
+                yield {"customer_id": cols["customer_id"][i], "customer": name,
+                       "recency_days": cols["recency_days"][i], "frequency": cols["frequency"][i],
+                       "monetary": cols["monetary"][i], "r": cols["r"][i], "f": cols["f"][i], "m": cols["m"][i],
+                       "segment": names[cols["segment"][i]]}
+
+    # --- co-purchase ---
+    def _baskets(self):
+        """Distinct (order_id, prod_id) of live order lines, sorted, as codes order_id * width + prod_id."""
+        def build():
+            live = self._live_items()
+            prods = self._col("order_items", "prod_id")[live]
+            width = int(prods.max()) + 1 if len(prods) else 1
+            return _distinct(self._col("order_items", "order_id")[live] * width + prods), width
+        return self._cached("order_items.baskets", build)
+
+    def co_purchase(self, prod_id: Optional[int] = None, limit: int = 10) -> List[Dict]:
+        """
+        Products most often in the same order as `prod_id`, with the number of such orders;
+        without a product, the product pairs bought together most often.
+        """
+        if prod_id is not None:
+            # one pass over the lines: flag the orders holding the product, keep the other lines of those
+            live = self._live_items()
+            orders, prods = self._col("order_items", "order_id"), self._col("order_items", "prod_id")
+            with_it = np.zeros(int(orders.max()) + 1 if len(orders) else 0, dtype=bool)
+            with_it[orders[live & (prods == prod_id)]] = True
+            keep = live & with_it[orders] & (prods != prod_id)
+            width = int(prods.max()) + 1 if len(prods) else 1
+            counts = np.bincount(_distinct(orders[keep] * width + prods[keep]) % width, minlength=width)
+            ids = np.flatnonzero(counts)
+            top = ids[np.lexsort((ids, -counts[ids]))[:limit]]
+            return [{"prod_id": pid, "product": name, "orders": int(counts[pid])}
+                    for pid, name in zip(top.tolist(), self._names("products", top))]
+        baskets, width = self._baskets()
+        orders, prods = baskets // width, baskets % width
+        # lines of an order are adjacent and sorted by product, so pairs are (i, i + k) within an order
+        pairs = []
+        for k in range(1, len(prods)):
+            same = orders[:-k] == orders[k:]
+            if not same.any():
+                break
+            pairs.append(prods[:-k][same] * width + prods[k:][same])
+        if not pairs:
+            return []
+        keys, counts = _counted(np.concatenate(pairs))
+        best = np.lexsort((keys, -counts))[:limit]
+        a, b = keys[best] // width, keys[best] % width
+        names_a, names_b = self._names("products", a), self._names("products", b)
+        return [{"products": [int(x), int(y)], "names": [na, nb], "orders": int(n)}
+                for x, y, na, nb, n in zip(a.tolist(), b.tolist(), names_a, names_b, counts[best].tolist())]
+
+
+# default instance, created on first use so importing this module stays cheap
+__getattr__ = lazy_default("default_analytics_service", AnalyticsService)
@@ -0,0 +1,39 @@
+# src/services/customer_service.py
+from typing import Dict, Iterable, Optional, Tuple
+from src.dao import customer_dao
+from src.utils import import_in_chunks, lazy_default
+
+
+class CustomerError(Exception):
+    pass
+
+
+class CustomerService:
+    def __init__(self, dao: Optional[object] = None):
+        self._dao = dao or customer_dao.CustomerDAO()
+
+    @staticmethod
+    def _clean_import_row(rec: Dict) -> Dict:
+        if rec.get("_error"):
+            raise CustomerError(rec["_error"])
+        name, email = (rec.get("name") or "").strip(), (rec.get("email") or "").strip()
+        if not name or not email:
+            raise CustomerError("name and email are required")
+        if "@" not in email:
+            raise CustomerError(f"invalid email: {email}")
+        row = {"name": name, "email": email}
+        # columns the file does not have keep their stored values
+        for column in ("phone", "city"):
+            if column in rec:
+                row[column] = rec[column] or None
+        return row
+
+    def import_customers(self, records: Iterable[Tuple[int, Dict]], chunk_size: int = 500, workers: int = 4,
+                         skip_existing: bool = False) -> Dict:
+        """Bulk-load (line, record) pairs, upserting on email. Bad rows are reported, not fatal."""
+        return import_in_chunks(records, self._clean_import_row, "email", self._dao.existing_emails,
+                                self._dao.upsert_many, chunk_size, workers, skip_existing)
+
+
+# default instance, created on first use so importing this module stays cheap
+__getattr__ = lazy_default("default_customer_service", CustomerService)
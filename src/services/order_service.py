@@ -1,76 +1,436 @@
 # src/services/order_service.py
-from typing import List, Dict
-from src.dao import order_dao, product_dao, customer_dao
+import asyncio
+import logging
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
+from src.dao import order_dao, product_dao, customer_dao, rollup_dao, payment_dao
+from src.utils import chunked, gather_bounded, lazy_default, run_bounded
+
+log = logging.getLogger(__name__)
+
+# how many times a batch re-plans after another writer took stock it was counting on
+BATCH_RESERVE_ATTEMPTS = 3
 
 class OrderError(Exception):
     pass
 
+
+def _rollup_deltas(orders: List[Dict], sign: int) -> Tuple[Dict, Dict, Dict, List[str]]:
+    """
+    Rollup changes for placing (sign 1) or cancelling (sign -1) `orders`: units per product,
+    orders per customer, revenue per order day, and the days whose breakdown changes.
+    """
+    units, counts, revenue = {}, {}, {}
+    for order in orders:
+        for i in order.get("items", []):
+            units[i["prod_id"]] = units.get(i["prod_id"], 0) + sign * i["quantity"]
+        counts[order["customer_id"]] = counts.get(order["customer_id"], 0) + sign
+        # a cancel takes the order's total back off its day
+        day = str(order["created_at"])[:10]
+        revenue[day] = revenue.get(day, 0) + sign * (order.get("total_amount") or 0)
+    return units, counts, revenue, [str(o["created_at"])[:10] for o in orders]
+
+
+def _stock_lines(order: Dict) -> List[Dict]:
+    """An order's items as the {"prod_id", "qty"} lines the stock helpers take."""
+    return [{"prod_id": i["prod_id"], "qty": i["quantity"]} for i in order.get("items", [])]
+
+
 class OrderService:
-    def __init__(self, order_dao_instance=None, product_dao_instance=None, customer_dao_instance=None):
+    def __init__(self, order_dao_instance=None, product_dao_instance=None, customer_dao_instance=None,
+                 rollup_dao_instance=None, payment_dao_instance=None):
         self._order_dao = order_dao_instance or order_dao.OrderDAO()
         self._product_dao = product_dao_instance or product_dao.ProductDAO()
         self._customer_dao = customer_dao_instance or customer_dao.CustomerDAO()
+        self._rollup_dao = rollup_dao_instance or rollup_dao.RollupDAO()
+        self._payment_dao = payment_dao_instance or payment_dao.PaymentDAO()
+
+    @staticmethod
+    def _merge_items(items: List[Dict]) -> List[Dict]:
+        """Collapse repeated prod_ids into one line, keeping first-seen order."""
+        merged = {}
+        for item in items:
+            pid = item["prod_id"]
+            merged[pid] = merged.get(pid, 0) + item["qty"]
+        return [{"prod_id": pid, "qty": qty} for pid, qty in merged.items()]
 
     # Create order
     def create_order(self, customer_id: int, items: List[Dict]) -> Dict:
         # check customer exists
-        if not self._customer_dao.get_by_id(customer_id):
+        customer = self._customer_dao.get_by_id(customer_id)
+        if not customer:
             raise OrderError(f"Customer {customer_id} does not exist")
 
+        items = self._merge_items(items)
+        # one fetch for every product in the basket
+        products = self._product_dao.get_products_by_ids([i["prod_id"] for i in items])
+
         total_amount = 0
         # check stock
         for item in items:
-            product = self._product_dao.get_product_by_id(item["prod_id"])
+            product = products.get(item["prod_id"])
             if not product:
                 raise OrderError(f"Product {item['prod_id']} not found")
             if (product.get("stock") or 0) < item["qty"]:
                 raise OrderError(f"Insufficient stock for {product['name']}")
             total_amount += product["price"] * item["qty"]
 
-        # deduct stock
+        # reserve stock atomically; all lines or none. One conditional update per line is
+        # the price of never overselling (see the create_order budgets in the README)
+        reserved = []
+        try:
+            for item in items:
+                product = products[item["prod_id"]]
+                if not self._product_dao.decrement_stock(product["prod_id"], item["qty"], expected=product.get("stock")):
+                    raise OrderError(f"Insufficient stock for {product['name']}")
+                reserved.append(item)
+
+            # create order and order_items
+            order = self._order_dao.create_order_with_items(customer_id, total_amount, items)
+        except Exception:
+            self._release_stock(reserved)
+            raise
+        order["customer"] = customer
+        self._record_rollups([order], 1)
+        return order
+
+    def _record_rollups(self, orders: List[Dict], sign: int) -> None:
+        # the orders are already written; a failed counter update is repaired by `report rebuild`
+        units, counts, revenue, days = _rollup_deltas(orders, sign)
+        try:
+            self._rollup_dao.add_units_sold(units)
+            self._rollup_dao.add_customer_orders(counts)
+            self._rollup_dao.add_revenue(revenue)
+            self._rollup_dao.mark_revenue_days(days)
+        except Exception:
+            log.warning("rollup update failed for orders %s", [o.get("order_id") for o in orders], exc_info=True)
+
+    @staticmethod
+    def _allocate(baskets: Dict[int, List[Dict]], capacity: Dict[int, int]) -> Tuple[List[int], Dict[int, int]]:
+        """Greedy in input order: accept a basket only if all its lines fit in what is left.
+        Returns accepted basket indexes and {rejected index: first short prod_id}."""
+        left = dict(capacity)
+        accepted, rejected = [], {}
+        for idx, items in baskets.items():
+            short = next((i["prod_id"] for i in items if left.get(i["prod_id"], 0) < i["qty"]), None)
+            if short is not None:
+                rejected[idx] = short
+                continue
+            for i in items:
+                left[i["prod_id"]] -= i["qty"]
+            accepted.append(idx)
+        return accepted, rejected
+
+    # Create many orders at once
+    def create_orders_batch(self, orders: List[Dict]) -> List[Dict]:
+        """
+        Place a batch of {"customer_id", "items": [{"prod_id", "qty"}]} orders with one customer
+        fetch, one product fetch, one stock reservation per product, and bulk writes for headers,
+        items and pending payments. Returns one {"order": row} or {"error": msg} per input, in order.
+        """
+        results: List[Dict] = [None] * len(orders)
+        customers = self._customer_dao.get_by_ids([o.get("customer_id") for o in orders])
+        products = self._product_dao.get_products_by_ids(
+            [i["prod_id"] for o in orders for i in o.get("items") or []])
+
+        baskets = {}
+        for idx, o in enumerate(orders):
+            items = self._merge_items(o.get("items") or [])
+            missing = next((i["prod_id"] for i in items if i["prod_id"] not in products), None)
+            if o.get("customer_id") not in customers:
+                results[idx] = {"error": f"Customer {o.get('customer_id')} does not exist"}
+            elif not items:
+                results[idx] = {"error": "Order has no items"}
+            elif missing is not None:
+                results[idx] = {"error": f"Product {missing} not found"}
+            else:
+                baskets[idx] = items
+
+        def demand(indexes):
+            total = {}
+            for idx in indexes:
+                for i in baskets[idx]:
+                    total[i["prod_id"]] = total.get(i["prod_id"], 0) + i["qty"]
+            return total
+
+        # plan against the stock we read, then reserve each product's total in one atomic step;
+        # if another writer got there first, re-plan with fresh stock
+        accepted, rejected = self._allocate(baskets, {pid: p.get("stock") or 0 for pid, p in products.items()})
+        reserved: Dict[int, int] = {}
+        try:
+            for _ in range(BATCH_RESERVE_ATTEMPTS):
+                short = []
+                for pid, qty in demand(accepted).items():
+                    need = qty - reserved.get(pid, 0)
+                    if need <= 0:
+                        continue
+                    row = self._product_dao.decrement_stock(pid, need, expected=products[pid].get("stock"))
+                    if row:
+                        reserved[pid] = reserved.get(pid, 0) + need
+                        products[pid] = row
+                    else:
+                        short.append(pid)
+                if not short:
+                    break
+                capacity = dict(reserved)
+                for pid, p in self._product_dao.get_products_by_ids(short).items():
+                    products[pid] = p
+                    capacity[pid] = reserved.get(pid, 0) + (p.get("stock") or 0)
+                accepted, more = self._allocate({idx: baskets[idx] for idx in accepted}, capacity)
+                rejected.update(more)
+        except Exception:
+            # a failed update or lookup must not strand what this batch already took
+            self._release_stock([{"prod_id": pid, "qty": qty} for pid, qty in reserved.items()])
+            raise
+        # whatever was not secured in time is rejected; unused reservations go back
+        accepted, more = self._allocate({idx: baskets[idx] for idx in accepted}, reserved)
+        rejected.update(more)
+        for idx, pid in rejected.items():
+            results[idx] = {"error": f"Insufficient stock for {products[pid]['name']}"}
+        used = demand(accepted)
+        self._release_stock([{"prod_id": pid, "qty": qty - used.get(pid, 0)}
+                             for pid, qty in reserved.items() if qty > used.get(pid, 0)])
+        if not accepted:
+            return results
+
+        to_write = []
+        for idx in accepted:
+            total = sum(products[i["prod_id"]]["price"] * i["qty"] for i in baskets[idx])
+            to_write.append({"customer_id": orders[idx]["customer_id"], "total_amount": total, "items": baskets[idx]})
+        try:
+            created = self._order_dao.create_orders_with_items(to_write)
+        except Exception as e:
+            self._release_stock([{"prod_id": pid, "qty": qty} for pid, qty in used.items()])
+            for idx in accepted:
+                results[idx] = {"error": str(e)}
+            return results
+        for idx, order in zip(accepted, created):
+            results[idx] = {"order": order}
+
+        try:
+            self._payment_dao.create_payments({o["order_id"]: o["total_amount"] for o in created})
+        except Exception:
+            log.warning("pending payment insert failed for orders %s", [o["order_id"] for o in created], exc_info=True)
+        self._record_rollups(created, 1)
+        return results
+
+    def _release_stock(self, items: List[Dict]) -> None:
         for item in items:
-            product = self._product_dao.get_product_by_id(item["prod_id"])
-            new_stock = (product.get("stock") or 0) - item["qty"]
-            self._product_dao.update_product(product["prod_id"], {"stock": new_stock})
+            self._product_dao.increment_stock(item["prod_id"], item["qty"])
 
-        # create order and order_items
-        order = self._order_dao.create_order(customer_id, total_amount)
-        self._order_dao.add_order_items(order["order_id"], items)
-        return self.get_order_details(order["order_id"])
+    @staticmethod
+    def _parse_batch_record(rec: Dict) -> Dict:
+        if rec.get("_error"):
+            raise OrderError(rec["_error"])
+        try:
+            items = [{"prod_id": int(i["prod_id"]), "qty": int(i["qty"])} for i in rec.get("items") or []]
+            order = {"customer_id": int(rec["customer_id"]), "items": items}
+        except (KeyError, TypeError, ValueError):
+            raise OrderError('expected {"customer_id": int, "items": [{"prod_id": int, "qty": int}]}')
+        if any(i["qty"] <= 0 for i in items):
+            raise OrderError("Quantities must be positive")
+        return order
+
+    def create_orders_from_records(self, records: Iterable[Tuple[int, Dict]], batch_size: int = 200,
+                                   workers: int = 4) -> Iterator[Tuple[int, Dict]]:
+        """Stream (line, record) pairs through create_orders_batch, `workers` batches at a time.
+        Yields (line, {"order": row} | {"error": msg}) in input order."""
+        def place(batch):
+            out, good = {}, []
+            for line, rec in batch:
+                try:
+                    good.append((line, self._parse_batch_record(rec)))
+                except OrderError as e:
+                    out[line] = {"error": str(e)}
+            try:
+                placed = self.create_orders_batch([o for _, o in good])
+            except Exception as e:
+                # the batch released its stock; its lines fail, the rest of the run goes on
+                placed = [{"error": str(e)}] * len(good)
+            for (line, _), result in zip(good, placed):
+                out[line] = result
+            return [(line, out[line]) for line, _ in batch]
+
+        for results in run_bounded(place, chunked(records, batch_size), workers):
+            yield from results
 
     def get_order_details(self, order_id: int) -> Dict:
-        order = self._order_dao.get_order(order_id)
-        if not order:
-            raise OrderError(f"Order {order_id} not found")
-        # fetch customer info
-        customer = self._customer_dao.get_by_id(order["customer_id"])
-        order["customer"] = customer
-        return order
+        """The order with its items (and their products), customer and payments, in one query."""
+        return self.get_orders_details([order_id])[0]
+
+    def get_orders_details(self, order_ids: List[int]) -> List[Dict]:
+        """Details for several orders, in the order given; raises OrderError if any is missing."""
+        found = self._order_dao.get_orders_details(order_ids)
+        missing = [oid for oid in order_ids if oid not in found]
+        if missing:
+            raise OrderError(f"Order {', '.join(map(str, missing))} not found")
+        return [found[oid] for oid in order_ids]
+
+    def customer_orders_details(self, customer_id: int) -> List[Dict]:
+        return list(self._order_dao.customer_orders_details(customer_id))
 
     def list_customer_orders(self, customer_id: int) -> List[Dict]:
         return self._order_dao.list_orders_by_customer(customer_id)
 
+    def iter_orders(self, customer_id: Optional[int] = None, status: Optional[str] = None,
+                    after: Optional[int] = None, page_size: Optional[int] = None) -> Iterator[Dict]:
+        return self._order_dao.iter_orders(customer_id, status, after=after, page_size=page_size)
+
     def cancel_order(self, order_id: int) -> Dict:
         order = self._order_dao.get_order(order_id)
         if not order:
             raise OrderError(f"Order {order_id} not found")
         if order.get("status") != "PLACED":
             raise OrderError("Only PLACED orders can be cancelled")
-        # restore stock
-        for item in order.get("items", []):
-            product = self._product_dao.get_product_by_id(item["prod_id"])
-            new_stock = (product.get("stock") or 0) + item["quantity"]
-            self._product_dao.update_product(product["prod_id"], {"stock": new_stock})
-        # update order status
-        return self._order_dao.update_order(order_id, {"status": "CANCELLED"})
+        # only the caller whose update still finds the order PLACED restores its stock,
+        # so concurrent cancels (or a cancel racing a completion) act once
+        cancelled = self._order_dao.update_order(order_id, {"status": "CANCELLED"}, items=order.get("items", []),
+                                                 from_status="PLACED")
+        if not cancelled:
+            raise OrderError("Only PLACED orders can be cancelled")
+        self._release_stock(_stock_lines(order))
+        self._record_rollups([order], -1)
+        return cancelled
 
     def complete_order(self, order_id: int) -> Dict:
         order = self._order_dao.get_order(order_id)
         if not order:
             raise OrderError(f"Order {order_id} not found")
-        return self._order_dao.update_order(order_id, {"status": "COMPLETED"})
+        # a cancelled order has its stock and rollups reversed already; it cannot come back
+        completed = None
+        if order.get("status") == "PLACED":
+            completed = self._order_dao.update_order(order_id, {"status": "COMPLETED"}, items=order.get("items", []),
+                                                     from_status="PLACED")
+        if not completed:
+            raise OrderError("Only PLACED orders can be completed")
+        self._mark_revenue_day(order)
+        return completed
+
+    def _mark_revenue_day(self, order: Dict) -> None:
+        # the revenue breakdown is keyed by status; `report rebuild` repairs a missed flag
+        try:
+            self._rollup_dao.mark_revenue_days([str(order["created_at"])[:10]])
+        except Exception:
+            log.warning("revenue day flag failed for order %s", order.get("order_id"), exc_info=True)
+
+
+class AsyncOrderService:
+    """
+    OrderService on the async DAOs, for callers already running an event loop.
+    Independent reads and per-product stock updates are issued concurrently.
+    Build with `await AsyncOrderService.connect()`.
+    """
+
+    def __init__(self, order_dao_instance, product_dao_instance, customer_dao_instance, rollup_dao_instance):
+        self._order_dao = order_dao_instance
+        self._product_dao = product_dao_instance
+        self._customer_dao = customer_dao_instance
+        self._rollup_dao = rollup_dao_instance
+
+    @classmethod
+    async def connect(cls) -> "AsyncOrderService":
+        return cls(*await asyncio.gather(order_dao.AsyncOrderDAO.connect(), product_dao.AsyncProductDAO.connect(),
+                                         customer_dao.AsyncCustomerDAO.connect(), rollup_dao.AsyncRollupDAO.connect()))
+
+    async def create_order(self, customer_id: int, items: List[Dict]) -> Dict:
+        items = OrderService._merge_items(items)
+        customer, products = await asyncio.gather(
+            self._customer_dao.get_by_id(customer_id),
+            self._product_dao.get_products_by_ids([i["prod_id"] for i in items]))
+        if not customer:
+            raise OrderError(f"Customer {customer_id} does not exist")
+
+        total_amount = 0
+        for item in items:
+            product = products.get(item["prod_id"])
+            if not product:
+                raise OrderError(f"Product {item['prod_id']} not found")
+            if (product.get("stock") or 0) < item["qty"]:
+                raise OrderError(f"Insufficient stock for {product['name']}")
+            total_amount += product["price"] * item["qty"]
+
+        reserved = []
+        try:
+            # lines are distinct products, so their reservations don't contend with each other;
+            # every one finishes, so whatever was taken is known even when another raised
+            results = await gather_bounded(
+                (self._product_dao.decrement_stock(i["prod_id"], i["qty"], expected=products[i["prod_id"]].get("stock"))
+                 for i in items), return_exceptions=True)
+            reserved = [i for i, row in zip(items, results) if row and not isinstance(row, BaseException)]
+            failed = next((r for r in results if isinstance(r, BaseException)), None)
+            if failed:
+                raise failed
+            short = next((i for i, row in zip(items, results) if not row), None)
+            if short:
+                raise OrderError(f"Insufficient stock for {products[short['prod_id']]['name']}")
+            order = await self._order_dao.create_order_with_items(customer_id, total_amount, items)
+        except Exception:
+            await self._release_stock(reserved)
+            raise
+        order["customer"] = customer
+        await self._record_rollups([order], 1)
+        return order
+
+    async def _release_stock(self, items: List[Dict]) -> None:
+        await gather_bounded(self._product_dao.increment_stock(i["prod_id"], i["qty"]) for i in items)
+
+    async def _record_rollups(self, orders: List[Dict], sign: int) -> None:
+        units, counts, revenue, days = _rollup_deltas(orders, sign)
+        try:
+            await asyncio.gather(self._rollup_dao.add_units_sold(units),
+                                 self._rollup_dao.add_customer_orders(counts),
+                                 self._rollup_dao.add_revenue(revenue),
+                                 self._rollup_dao.mark_revenue_days(days))
+        except Exception:
+            log.warning("rollup update failed for orders %s", [o.get("order_id") for o in orders], exc_info=True)
+
+    async def get_order_details(self, order_id: int) -> Dict:
+        return (await self.get_orders_details([order_id]))[0]
+
+    async def get_orders_details(self, order_ids: List[int]) -> List[Dict]:
+        """Details for several orders at once; raises OrderError if any is missing."""
+        found = await self._order_dao.get_orders_details(order_ids)
+        missing = [oid for oid in order_ids if oid not in found]
+        if missing:
+            raise OrderError(f"Order {', '.join(map(str, missing))} not found")
+        return [found[oid] for oid in order_ids]
+
+    async def customer_orders_details(self, customer_id: int) -> List[Dict]:
+        return await self._order_dao.customer_orders_details(customer_id)
+
+    async def list_customer_orders(self, customer_id: int) -> List[Dict]:
+        return await self._order_dao.list_orders_by_customer(customer_id)
+
+    async def cancel_order(self, order_id: int) -> Dict:
+        order = await self._order_dao.get_order(order_id)
+        if not order:
+            raise OrderError(f"Order {order_id} not found")
+        if order.get("status") != "PLACED":
+            raise OrderError("Only PLACED orders can be cancelled")
+        cancelled = await self._order_dao.update_order(order_id, {"status": "CANCELLED"},
+                                                       items=order.get("items", []), from_status="PLACED")
+        if not cancelled:
+            raise OrderError("Only PLACED orders can be cancelled")
+        await self._release_stock(_stock_lines(order))
+        await self._record_rollups([order], -1)
+        return cancelled
+
+    async def complete_order(self, order_id: int) -> Dict:
+        order = await self._order_dao.get_order(order_id, with_items=False)
+        if not order:
+            raise OrderError(f"Order {order_id} not found")
+        completed = None
+        if order.get("status") == "PLACED":
+            completed = await self._order_dao.update_order(order_id, {"status": "COMPLETED"}, with_items=False,
+                                                           from_status="PLACED")
+        if not completed:
+            raise OrderError("Only PLACED orders can be completed")
+        try:
+            await self._rollup_dao.mark_revenue_days([str(order["created_at"])[:10]])
+        except Exception:
+            log.warning("revenue day flag failed for order %s", order_id, exc_info=True)
+        return completed
 
 
-# default instance
-default_order_service = OrderService()
+# default instance, created on first use so importing this module stays cheap
+__getattr__ = lazy_default("default_order_service", OrderService)
 
@@ -1,13 +1,35 @@
 # src/services/payment_service.py
-from src.dao import payment_dao, order_dao
+import asyncio
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from src.dao import payment_dao, order_dao, rollup_dao
+from src.utils import chunked, lazy_default, run_bounded
+
+log = logging.getLogger(__name__)
+
+PAYMENT_METHODS = ("Cash", "Card", "UPI")
+# what the bulk commands read per payment: enough to check the transition and book the order's day
+SETTLEMENT_COLUMNS = "payment_id,order_id,amount,status,order:orders(status,created_at)"
+# order statuses a payment can be taken for; a cancelled order has had its stock and rollups reversed
+PAYABLE_STATUSES = ("PLACED", "COMPLETED")
 
 class PaymentError(Exception):
     pass
 
+
+def _refund_revenue(order: Optional[Dict], amount: float) -> Dict[str, float]:
+    """Revenue change for refunding `amount` on `order`: taken off the order's day, unless
+    the order is cancelled (its total is already off the revenue)."""
+    if not order or order.get("status") == "CANCELLED":
+        return {}
+    return {str(order["created_at"])[:10]: -amount}
+
+
 class PaymentService:
-    def __init__(self):
-        self._payment_dao = payment_dao.PaymentDAO()
-        self._order_dao = order_dao.OrderDAO()
+    def __init__(self, payment_dao_instance=None, order_dao_instance=None, rollup_dao_instance=None):
+        self._payment_dao = payment_dao_instance or payment_dao.PaymentDAO()
+        self._order_dao = order_dao_instance or order_dao.OrderDAO()
+        self._rollup_dao = rollup_dao_instance or rollup_dao.RollupDAO()
 
     # Insert pending payment when order is created
     def create_pending_payment(self, order_id: int, amount: float):
@@ -20,19 +42,246 @@ class PaymentService:
             raise PaymentError("Payment record not found")
         if payment["status"] == "PAID":
             raise PaymentError("Payment already completed")
-        self._payment_dao.update_payment(payment["payment_id"], {"status": "PAID", "method": method})
-        # update order status to COMPLETED
-        self._order_dao.update_order(order_id, {"status": "COMPLETED"})
-        return self._payment_dao.get_by_order(order_id)
+        # complete the order first: a cancelled order does not match and its payment is left alone
+        order = self._order_dao.update_order(order_id, {"status": "COMPLETED"}, with_items=False,
+                                             from_status=PAYABLE_STATUSES)
+        if not order:
+            raise PaymentError(f"order {order_id} is cancelled")
+        paid = self._payment_dao.update_payment(payment["payment_id"], {"status": "PAID", "method": method})
+        self._mark_revenue_day(order)
+        return paid
 
     # Refund payment
     def refund_payment(self, order_id: int):
         payment = self._payment_dao.get_by_order(order_id)
         if not payment:
             raise PaymentError("Payment record not found")
-        self._payment_dao.update_payment(payment["payment_id"], {"status": "REFUNDED"})
-        return self._payment_dao.get_by_order(order_id)
+        refunded = self._payment_dao.update_payment(payment["payment_id"], {"status": "REFUNDED"})
+        if payment["status"] != "REFUNDED":
+            self._record_refund(order_id, payment.get("amount") or 0)
+        return refunded
+
+    def _record_refund(self, order_id: int, amount: float):
+        # revenue is booked on the order's day; a failed update is repaired by `report rebuild`
+        try:
+            revenue = _refund_revenue(self._order_dao.get_order(order_id, with_items=False), amount)
+            if revenue:
+                self._rollup_dao.add_revenue(revenue)
+                self._rollup_dao.mark_revenue_days(list(revenue))
+        except Exception:
+            log.warning("rollup update failed for refund of order %s", order_id, exc_info=True)
+
+    def _mark_revenue_day(self, order):
+        try:
+            self._rollup_dao.mark_revenue_days([str(order["created_at"])[:10]])
+        except Exception:
+            log.warning("revenue day flag failed for order %s", order.get("order_id"), exc_info=True)
+
+    # --- settlement files ---
+    # A line is matched to its order's payment and checked here before anything is
+    # written; each chunk then costs one lookup, one payment update per method and
+    # one order update. Payments already in the target state count as skipped, so
+    # re-running a file (or one that stopped half way) only finishes what is left.
+
+    @staticmethod
+    def _clean_settlement_row(rec: Dict, need_method: bool) -> Dict:
+        if "_error" in rec:
+            raise ValueError(rec["_error"])
+        try:
+            row = {"order_id": int(rec.get("order_id"))}
+        except (TypeError, ValueError):
+            raise ValueError(f"order_id must be an integer, got {rec.get('order_id')!r}")
+        if need_method:
+            if rec.get("method") not in PAYMENT_METHODS:
+                raise ValueError(f"method must be one of {', '.join(PAYMENT_METHODS)}, got {rec.get('method')!r}")
+            row["method"] = rec["method"]
+        if rec.get("amount") not in (None, ""):
+            try:
+                row["amount"] = float(rec["amount"])
+            except (TypeError, ValueError):
+                raise ValueError(f"amount must be a number, got {rec['amount']!r}")
+        return row
+
+    @staticmethod
+    def _check(payment: Optional[Dict], row: Dict) -> Optional[str]:
+        if not payment:
+            return "Payment record not found"
+        if "amount" in row and round(row["amount"], 2) != round(payment.get("amount") or 0, 2):
+            return f"amount {row['amount']} does not match the payment's {payment.get('amount')}"
+        return None
+
+    def _run_settlement(self, records: Iterable[Tuple[int, Dict]], need_method: bool,
+                        apply: Callable[[List[Tuple[int, Dict]]], Tuple[Dict, List[Dict]]], done_key: str,
+                        chunk_size: int, workers: int) -> Dict:
+        summary = {done_key: 0, "skipped": 0, "errors": []}
+        seen = {}
+
+        def rows():
+            for line, rec in records:
+                try:
+                    row = self._clean_settlement_row(rec, need_method)
+                except ValueError as e:
+                    summary["errors"].append({"line": line, "error": str(e)})
+                    continue
+                if row["order_id"] in seen:
+                    summary["errors"].append({"line": line, "error": f"duplicate order_id {row['order_id']} "
+                                                                     f"(first seen on line {seen[row['order_id']]})"})
+                    continue
+                seen[row["order_id"]] = line
+                yield line, row
+
+        def run(chunk):
+            try:
+                return apply(chunk)
+            except Exception as e:
+                # nothing in the chunk is known to be done; a re-run picks up whatever was
+                return {}, [{"line": line, "error": str(e)} for line, _ in chunk]
+
+        for counts, errors in run_bounded(run, chunked(rows(), chunk_size), workers):
+            for k, v in counts.items():
+                summary[k] += v
+            summary["errors"].extend(errors)
+        summary["errors"].sort(key=lambda e: e["line"])
+        return summary
+
+    def settle_payments(self, records: Iterable[Tuple[int, Dict]], chunk_size: int = 500, workers: int = 4) -> Dict:
+        """
+        Mark PENDING payments PAID and their orders COMPLETED from (line, {"order_id", "method",
+        optional "amount"}) records. Returns {"settled", "skipped", "errors": [{"line", "error"}]}.
+        """
+        return self._run_settlement(records, True, self._settle_chunk, "settled", chunk_size, workers)
+
+    def _settle_chunk(self, chunk: List[Tuple[int, Dict]]) -> Tuple[Dict, List[Dict]]:
+        payments = self._payment_dao.get_by_orders([row["order_id"] for _, row in chunk], SETTLEMENT_COLUMNS)
+        by_method, complete, errors, skipped = {}, [], [], 0
+        for line, row in chunk:
+            p = payments.get(row["order_id"])
+            order = (p or {}).get("order") or {}
+            error = self._check(p, row)
+            if not error and p["status"] == "PAID":
+                skipped += 1
+                # a run that stopped between the two updates left this order behind
+                if order.get("status") not in (None, "COMPLETED", "CANCELLED"):
+                    complete.append(row["order_id"])
+                continue
+            if not error and p["status"] != "PENDING":
+                error = f"cannot settle a {p['status']} payment"
+            if not error and order.get("status") == "CANCELLED":
+                error = f"order {row['order_id']} is cancelled"
+            if error:
+                errors.append({"line": line, "error": error})
+                continue
+            by_method.setdefault(row["method"], []).append((line, p))
+        # complete the orders first, as process_payment does: one cancelled since the lookup does
+        # not match, and its payment is reported instead of settled
+        orders = self._order_dao.set_status(
+            complete + [p["order_id"] for todo in by_method.values() for _, p in todo], "COMPLETED",
+            from_status=PAYABLE_STATUSES)
+        open_ids = {o["order_id"] for o in orders}
+        settled = []
+        for method, todo in by_method.items():
+            ids = []
+            for line, p in todo:
+                if p["order_id"] in open_ids:
+                    ids.append(p["payment_id"])
+                else:
+                    errors.append({"line": line, "error": f"order {p['order_id']} is cancelled"})
+            settled += self._payment_dao.set_status(ids, "PAID", "PENDING", {"method": method})
+            # payments settled by someone else since the lookup are already done
+            skipped += len(ids)
+        skipped -= len(settled)
+        try:
+            self._rollup_dao.mark_revenue_days(str(o["created_at"])[:10] for o in orders)
+        except Exception:
+            log.warning("revenue day flags failed for %d settled orders", len(orders), exc_info=True)
+        return {"settled": len(settled), "skipped": skipped}, errors
+
+    def refund_payments(self, records: Iterable[Tuple[int, Dict]], chunk_size: int = 500, workers: int = 4) -> Dict:
+        """
+        Mark PAID payments REFUNDED from (line, {"order_id", optional "amount"}) records and take
+        them off their day's revenue. Returns {"refunded", "skipped", "errors": [{"line", "error"}]}.
+        """
+        return self._run_settlement(records, False, self._refund_chunk, "refunded", chunk_size, workers)
+
+    def _refund_chunk(self, chunk: List[Tuple[int, Dict]]) -> Tuple[Dict, List[Dict]]:
+        payments = self._payment_dao.get_by_orders([row["order_id"] for _, row in chunk], SETTLEMENT_COLUMNS)
+        todo, errors, skipped = {}, [], 0
+        for line, row in chunk:
+            p = payments.get(row["order_id"])
+            error = self._check(p, row)
+            if not error and p["status"] == "REFUNDED":
+                skipped += 1
+                continue
+            if not error and p["status"] != "PAID":
+                error = f"cannot refund a {p['status']} payment"
+            if error:
+                errors.append({"line": line, "error": error})
+                continue
+            todo[p["payment_id"]] = p
+        refunded = self._payment_dao.set_status(list(todo), "REFUNDED", "PAID")
+        skipped += len(todo) - len(refunded)
+        revenue = {}
+        for r in refunded:
+            for day, delta in _refund_revenue(todo[r["payment_id"]].get("order"), r.get("amount") or 0).items():
+                revenue[day] = revenue.get(day, 0) + delta
+        # revenue is booked on the order's day; a failed update is repaired by `report rebuild`
+        try:
+            self._rollup_dao.add_revenue(revenue)
+            self._rollup_dao.mark_revenue_days(list(revenue))
+        except Exception:
+            log.warning("rollup update failed for %d refunds", len(refunded), exc_info=True)
+        return {"refunded": len(refunded), "skipped": skipped}, errors
+
+
+class AsyncPaymentService:
+    """PaymentService on the async DAOs. Build with `await AsyncPaymentService.connect()`."""
+
+    def __init__(self, payment_dao_instance, order_dao_instance, rollup_dao_instance):
+        self._payment_dao = payment_dao_instance
+        self._order_dao = order_dao_instance
+        self._rollup_dao = rollup_dao_instance
+
+    @classmethod
+    async def connect(cls) -> "AsyncPaymentService":
+        return cls(*await asyncio.gather(payment_dao.AsyncPaymentDAO.connect(), order_dao.AsyncOrderDAO.connect(),
+                                         rollup_dao.AsyncRollupDAO.connect()))
+
+    async def create_pending_payment(self, order_id: int, amount: float):
+        return await self._payment_dao.create_payment(order_id, amount)
+
+    async def process_payment(self, order_id: int, method: str):
+        payment = await self._payment_dao.get_by_order(order_id)
+        if not payment:
+            raise PaymentError("Payment record not found")
+        if payment["status"] == "PAID":
+            raise PaymentError("Payment already completed")
+        order = await self._order_dao.update_order(order_id, {"status": "COMPLETED"}, with_items=False,
+                                                   from_status=PAYABLE_STATUSES)
+        if not order:
+            raise PaymentError(f"order {order_id} is cancelled")
+        paid = await self._payment_dao.update_payment(payment["payment_id"], {"status": "PAID", "method": method})
+        try:
+            await self._rollup_dao.mark_revenue_days([str(order["created_at"])[:10]])
+        except Exception:
+            log.warning("revenue day flag failed for order %s", order_id, exc_info=True)
+        return paid
+
+    async def refund_payment(self, order_id: int):
+        payment = await self._payment_dao.get_by_order(order_id)
+        if not payment:
+            raise PaymentError("Payment record not found")
+        refunded = await self._payment_dao.update_payment(payment["payment_id"], {"status": "REFUNDED"})
+        if payment["status"] != "REFUNDED":
+            try:
+                order = await self._order_dao.get_order(order_id, with_items=False)
+                revenue = _refund_revenue(order, payment.get("amount") or 0)
+                if revenue:
+                    await asyncio.gather(self._rollup_dao.add_revenue(revenue),
+                                         self._rollup_dao.mark_revenue_days(list(revenue)))
+            except Exception:
+                log.warning("rollup update failed for refund of order %s", order_id, exc_info=True)
+        return refunded
 
 
-# default instance
-default_payment_service = PaymentService()
+# default instance, created on first use so importing this module stays cheap
+__getattr__ = lazy_default("default_payment_service", PaymentService)
@@ -1,6 +1,7 @@
 # src/services/product_service.py
-from typing import List, Dict, Optional
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
 import src.dao.product_dao as product_dao
+from src.utils import import_in_chunks, lazy_default
 
 
 class ProductError(Exception):
@@ -12,8 +13,8 @@ class ProductService:
     """OOP Service layer for product operations."""
     
     def __init__(self, dao: Optional[object] = None):
-        # allow dependency injection; default to procedural DAO module
-        self._dao = dao or product_dao
+        # allow dependency injection; default to a ProductDAO
+        self._dao = dao or product_dao.ProductDAO()
 
     def add_product(self, name: str, sku: str, price: float, stock: int = 0, category: Optional[str] = None) -> Dict:
         if price <= 0:
@@ -22,19 +23,57 @@ class ProductService:
             raise ProductError(f"SKU already exists: {sku}")
         return self._dao.create_product(name, sku, price, stock, category)
 
+    @staticmethod
+    def _clean_import_row(rec: Dict) -> Dict:
+        if rec.get("_error"):
+            raise ProductError(rec["_error"])
+        name, sku = (rec.get("name") or "").strip(), (rec.get("sku") or "").strip()
+        if not name or not sku:
+            raise ProductError("name and sku are required")
+        try:
+            row = {"name": name, "sku": sku, "price": float(rec.get("price"))}
+            # a blank or missing stock keeps the stored one (new products start at 0)
+            if rec.get("stock") not in (None, ""):
+                row["stock"] = int(rec["stock"])
+        except (TypeError, ValueError):
+            raise ProductError("price and stock must be numbers")
+        if row["price"] <= 0:
+            raise ProductError("Price must be greater than 0")
+        if row.get("stock", 0) < 0:
+            raise ProductError("Stock cannot be negative")
+        if "category" in rec:
+            row["category"] = rec["category"] or None
+        return row
+
+    def import_products(self, records: Iterable[Tuple[int, Dict]], chunk_size: int = 500, workers: int = 4,
+                        skip_existing: bool = False) -> Dict:
+        """Bulk-load (line, record) pairs, upserting on SKU. Bad rows are reported, not fatal."""
+        return import_in_chunks(records, self._clean_import_row, "sku", self._dao.existing_skus,
+                                self._dao.upsert_products, chunk_size, workers, skip_existing,
+                                insert_defaults={"stock": 0})
+
     def restock_product(self, prod_id: int, delta: int) -> Dict:
         if delta <= 0:
             raise ProductError("Delta must be positive")
-        product = self._dao.get_product_by_id(prod_id)
+        product = self._dao.increment_stock(prod_id, delta)
         if not product:
             raise ProductError("Product not found")
-        new_stock = (product.get("stock") or 0) + delta
-        return self._dao.update_product(prod_id, {"stock": new_stock})
+        return product
+
+    def list_products(self, limit: int = 100, category: Optional[str] = None) -> List[Dict]:
+        return self._dao.list_products(limit=limit, category=category)
+
+    def iter_products(self, category: Optional[str] = None, after: Optional[int] = None,
+                      page_size: Optional[int] = None) -> Iterator[Dict]:
+        return self._dao.iter_products(category, after=after, page_size=page_size)
 
     def get_low_stock(self, threshold: int = 5) -> List[Dict]:
-        all_products = self._dao.list_products(limit=1000)
-        return [p for p in all_products if (p.get("stock") or 0) <= threshold]
+        return list(self._dao.iter_low_stock(threshold))
+
+    def iter_low_stock(self, threshold: int = 5, after: Optional[int] = None,
+                       page_size: Optional[int] = None) -> Iterator[Dict]:
+        return self._dao.iter_low_stock(threshold, after=after, page_size=page_size)
 
 
-# Default instance for convenience
-default_product_service = ProductService()
+# default instance, created on first use so importing this module stays cheap
+__getattr__ = lazy_default("default_product_service", ProductService)
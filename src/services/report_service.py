@@ -1,21 +1,180 @@
 # src/services/report_service.py
-from src.dao import report_dao
+import asyncio
+import itertools
+import math
+from datetime import date, timedelta
+from src.config import SCAN_PAGE_SIZE
+from src.dao import report_dao, rollup_dao
+from src.utils import chunked, lazy_default
+
+BUCKETS = ("day", "week", "month")
+
+
+def _period(day: str, bucket: str) -> str:
+    """Label of the bucket an ISO day falls in: the day, the week's Monday, or YYYY-MM."""
+    if bucket == "month":
+        return day[:7]
+    if bucket == "week":
+        d = date.fromisoformat(day)
+        return (d - timedelta(days=d.weekday())).isoformat()
+    return day
 
 class ReportService:
-    def __init__(self):
-        self._dao = report_dao.ReportDAO()
+    """Reports are served from the rollup tables; `rebuild_rollups` recomputes them from raw orders."""
+
+    def __init__(self, dao=None, rollup_dao_instance=None):
+        self._dao = dao or report_dao.ReportDAO()
+        self._rollups = rollup_dao_instance or rollup_dao.RollupDAO()
 
     def top_5_products(self):
-        return self._dao.top_selling_products()
+        top = self._rollups.top_products(5)
+        names = self._dao.product_names([r["prod_id"] for r in top])
+        return [{"product": names.get(r["prod_id"]), "quantity_sold": r["units_sold"]} for r in top]
 
     def total_revenue_last_month(self):
-        return self._dao.total_revenue_last_month()
+        return self._rollups.revenue_since((date.today() - timedelta(days=30)).isoformat())
+
+    def _with_names(self, counts):
+        names = self._dao.customer_names(counts.keys())
+        return [{"customer": names.get(cid), "orders_count": n} for cid, n in counts.items()]
 
     def orders_per_customer(self):
-        return self._dao.orders_per_customer()
+        return self._with_names(self._rollups.customer_counts())
 
+    # more than 2 orders
     def frequent_customers(self):
-        return self._dao.frequent_customers()
+        return self._with_names(self._rollups.customer_counts(min_orders=3))
+
+    def iter_customer_orders(self, min_orders: int = 1, after: int = None, page_size: int = None):
+        """orders_per_customer (or frequent_customers, with min_orders=3) as a stream in customer_id order."""
+        rows = self._rollups.iter_customer_counts(min_orders, after=after, page_size=page_size)
+        for page in chunked(rows, page_size or SCAN_PAGE_SIZE):
+            names = self._dao.customer_names(r["customer_id"] for r in page)
+            for r in page:
+                yield {"customer_id": r["customer_id"], "customer": names.get(r["customer_id"]),
+                       "orders_count": r["orders_count"]}
+
+    def rebuild_rollups(self):
+        units, counts, revenue = self._dao.rollup_totals()
+        self._rollups.replace_all(units, counts, revenue)
+        # flags taken first: a write during the rebuild flags its day again for the next refresh
+        self._rollups.claim_revenue_days()
+        breakdown = self._dao.revenue_breakdown()
+        self._rollups.replace_revenue(breakdown)
+        return {"products": len(units), "customers": len(counts), "days": len(revenue),
+                "revenue_rows": len(breakdown)}
+
+    def refresh_revenue(self):
+        """Rebuild the revenue breakdown for the days flagged since the last refresh."""
+        days = self._rollups.claim_revenue_days()
+        if not days:
+            return {"days": 0, "revenue_rows": 0}
+        try:
+            rows = self._dao.revenue_breakdown(days)
+            self._rollups.replace_revenue(rows, days)
+        except Exception:
+            self._rollups.mark_revenue_days(days)
+            raise
+        return {"days": len(days), "revenue_rows": len(rows)}
+
+    def revenue_report(self, start: date = None, end: date = None, bucket: str = "day"):
+        """
+        Revenue for days start..end (default: the last 30 days) per day, week or month,
+        split by order status and payment method. `revenue` is net of refunds and leaves
+        out cancelled orders; cancelled totals still show under by_status. Read-only: days
+        flagged since the last refresh_revenue() show their figures as of that refresh.
+        """
+        if bucket not in BUCKETS:
+            raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+        end = end or date.today()
+        start = start or end - timedelta(days=30)
+        periods = {}
+        for r in self._rollups.revenue_rows(start.isoformat(), end.isoformat()):
+            key = _period(str(r["day"])[:10], bucket)
+            p = periods.setdefault(key, {"period": key, "orders": 0, "revenue": 0, "refunded": 0,
+                                         "by_status": {}, "by_method": {}})
+            net = (r.get("revenue") or 0) - (r.get("refunded") or 0)
+            p["by_status"][r["status"]] = p["by_status"].get(r["status"], 0) + net
+            if r["status"] == "CANCELLED":
+                continue
+            p["orders"] += r.get("orders") or 0
+            p["revenue"] += net
+            p["refunded"] += r.get("refunded") or 0
+            p["by_method"][r["method"]] = p["by_method"].get(r["method"], 0) + net
+        rows = [periods[k] for k in sorted(periods)]
+        for p in rows:
+            for field in ("revenue", "refunded"):
+                p[field] = round(p[field], 2)
+            for field in ("by_status", "by_method"):
+                p[field] = {k: round(v, 2) for k, v in sorted(p[field].items())}
+        return {"from": start.isoformat(), "to": end.isoformat(), "bucket": bucket,
+                "revenue": round(sum(p["revenue"] for p in rows), 2),
+                "orders": sum(p["orders"] for p in rows), "periods": rows}
+
+    def reorder_report(self, days: int = 30, horizon: int = 14, threshold: int = 5, limit: int = None):
+        """
+        Products that will run out within `horizon` days at the sales rate of the last `days`,
+        plus any at or below `threshold`, soonest first. Products with no recent sales rank last.
+        """
+        sold = self._dao.units_sold_since((date.today() - timedelta(days=days)).isoformat())
+        velocity = {pid: n / days for pid, n in sold.items()}
+        # candidates: the low-stock scan plus selling products that may not cover the horizon;
+        # both are filtered by the server, so well-stocked products are never downloaded
+        needs = {pid: math.ceil(v * horizon) for pid, v in velocity.items()}
+        needs = {pid: n for pid, n in needs.items() if n > threshold}
+        seen, rows = set(), []
+        for p in itertools.chain(self._dao.products_with_stock_at_most(threshold), self._dao.products_short_of(needs)):
+            if p["prod_id"] in seen:
+                continue
+            seen.add(p["prod_id"])
+            stock = p.get("stock") or 0
+            v = velocity.get(p["prod_id"], 0)
+            days_left = 0.0 if stock <= 0 else (stock / v if v else None)
+            if stock > threshold and (days_left is None or days_left > horizon):
+                continue
+            rows.append({"prod_id": p["prod_id"], "product": p.get("name"), "sku": p.get("sku"), "stock": stock,
+                         "units_sold": sold.get(p["prod_id"], 0), "daily_velocity": round(v, 3),
+                         "days_left": None if days_left is None else round(days_left, 1),
+                         "reorder_qty": max(math.ceil(v * horizon) - stock, 0)})
+        rows.sort(key=lambda r: (r["days_left"] is None, r["days_left"] or 0, r["stock"]))
+        return rows[:limit] if limit else rows
+
+class AsyncReportService:
+    """ReportService on the async DAOs; `all_reports` runs the four reports concurrently."""
+
+    def __init__(self, dao, rollup_dao_instance):
+        self._dao = dao
+        self._rollups = rollup_dao_instance
+
+    @classmethod
+    async def connect(cls) -> "AsyncReportService":
+        return cls(*await asyncio.gather(report_dao.AsyncReportDAO.connect(), rollup_dao.AsyncRollupDAO.connect()))
+
+    async def top_5_products(self):
+        top = await self._rollups.top_products(5)
+        names = await self._dao.product_names([r["prod_id"] for r in top])
+        return [{"product": names.get(r["prod_id"]), "quantity_sold": r["units_sold"]} for r in top]
+
+    async def total_revenue_last_month(self):
+        return await self._rollups.revenue_since((date.today() - timedelta(days=30)).isoformat())
+
+    async def _with_names(self, counts):
+        names = await self._dao.customer_names(counts.keys())
+        return [{"customer": names.get(cid), "orders_count": n} for cid, n in counts.items()]
+
+    async def orders_per_customer(self):
+        return await self._with_names(await self._rollups.customer_counts())
+
+    async def frequent_customers(self):
+        return await self._with_names(await self._rollups.customer_counts(min_orders=3))
+
+    async def all_reports(self):
+        top5, revenue, per_customer, frequent = await asyncio.gather(
+            self.top_5_products(), self.total_revenue_last_month(),
+            self.orders_per_customer(), self.frequent_customers())
+        return {"top5": top5, "revenue": revenue, "orders_per_customer": per_customer,
+                "frequent_customers": frequent}
+
 
-# default instance
-default_report_service = ReportService()
+# default instance, created on first use so importing this module stays cheap
+__getattr__ = lazy_default("default_report_service", ReportService)
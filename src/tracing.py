@@ -0,0 +1,235 @@
+# src/tracing.py
+"""
+Opt-in per-query tracing for the DAO layer.
+
+`enable()` turns it on; from then on `get_client()` hands the DAOs a wrapped
+client whose `.execute()` records one Span per round trip (table, operation,
+filters, rows, payload bytes, latency, and the DAO and service methods that
+issued it). While tracing is off the DAOs get the plain client, so there is
+no per-query cost. Hooks receive every span as it is recorded, e.g. to
+export them with `jsonl_sink(path)`.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+_TABLE_OPS = ("select", "insert", "upsert", "update", "delete")
+_SERVICES_DIR = os.sep + os.path.join("src", "services") + os.sep
+_DAO_DIR = os.sep + os.path.join("src", "dao") + os.sep
+# helpers that run queries on behalf of a DAO method; the span is credited to their caller
+_DAO_HELPERS = ("scan.py", "cas.py", "sqlite_client.py")
+
+
+class Span(NamedTuple):
+    table: str
+    op: str
+    filters: List[str]
+    rows: int
+    bytes: int
+    seconds: float
+    dao: Optional[str]
+    service: Optional[str]
+
+
+class Tracer:
+    def __init__(self, hooks: Optional[List[Callable[[Span], None]]] = None):
+        self.spans: List[Span] = []
+        self.hooks = list(hooks or [])
+        self._lock = threading.Lock()
+
+    def record(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+        for hook in self.hooks:
+            hook(span)
+
+    def summary(self, top: int = 10) -> Dict:
+        """Round trips and time per service method and per table/operation, plus the `top` slowest calls."""
+        with self._lock:
+            spans = list(self.spans)
+
+        def rollup(key):
+            out: Dict[str, Dict] = {}
+            for s in spans:
+                k = key(s)
+                entry = out.setdefault(k, {"round_trips": 0, "seconds": 0.0, "rows": 0, "bytes": 0})
+                entry["round_trips"] += 1
+                entry["seconds"] += s.seconds
+                entry["rows"] += s.rows
+                entry["bytes"] += s.bytes
+            return dict(sorted(out.items(), key=lambda kv: -kv[1]["seconds"]))
+
+        slowest = sorted(spans, key=lambda s: -s.seconds)[:top]
+        return {
+            "round_trips": len(spans),
+            "seconds": sum(s.seconds for s in spans),
+            "by_service": rollup(lambda s: s.service or "(no service)"),
+            "by_query": rollup(lambda s: f"{s.table}.{s.op}"),
+            "slowest": [s._asdict() for s in slowest],
+        }
+
+
+_tracer: Optional[Tracer] = None
+# per thread: (dao, service) of the credited() generators being resumed, innermost last
+_origins = threading.local()
+
+
+def enable(hooks: Optional[List[Callable[[Span], None]]] = None) -> Tracer:
+    """Start tracing clients handed out from now on; returns the tracer collecting the spans."""
+    global _tracer
+    _tracer = Tracer(hooks)
+    return _tracer
+
+
+def disable() -> None:
+    global _tracer
+    _tracer = None
+
+
+def active() -> Optional[Tracer]:
+    return _tracer
+
+
+def jsonl_sink(path: str) -> Callable[[Span], None]:
+    """Hook that appends each span to `path` as one JSON line."""
+    lock = threading.Lock()
+
+    def write(span: Span) -> None:
+        line = json.dumps({"ts": time.time(), **span._asdict()}, default=str)
+        with lock, open(path, "a", encoding="utf-8") as fh:
+            fh.write(line + "\n")
+    return write
+
+
+def _callers():
+    """(DAO method, outermost service method) that issued the current query, from the call stack."""
+    dao = service = None
+    frame = sys._getframe()
+    while frame is not None:
+        path = frame.f_code.co_filename
+        # co_qualname is 3.11+; drop "<locals>" parts so comprehensions count toward their method
+        name = getattr(frame.f_code, "co_qualname", frame.f_code.co_name).split(".<locals>")[0]
+        if dao is None and _DAO_DIR in path and not path.endswith(_DAO_HELPERS):
+            dao = name
+        elif _SERVICES_DIR in path:
+            service = name
+        frame = frame.f_back
+    origins = getattr(_origins, "stack", None)
+    if origins and (dao is None or service is None):
+        dao, service = dao or origins[-1][0], service or origins[-1][1]
+    return dao, service
+
+
+def credited(gen: Iterator) -> Iterator:
+    """
+    `gen` with its queries credited to the DAO and service methods that created it, for when
+    whatever resumes it is neither (e.g. the CLI paging through a service's scan). Unchanged
+    while tracing is off.
+    """
+    if _tracer is None:
+        return gen
+    return _resumed_as(gen, _callers())
+
+
+def _resumed_as(gen: Iterator, callers) -> Iterator:
+    while True:
+        stack = _origins.__dict__.setdefault("stack", [])
+        stack.append(callers)
+        try:
+            item = next(gen)
+        except StopIteration:
+            return
+        finally:
+            stack.pop()
+        yield item
+
+
+def _describe(method: str, args, kwargs) -> str:
+    if method == "in_" and len(args) == 2:
+        return f"{args[0]} in ({len(list(args[1]))} values)"
+    if method in ("order", "limit", "range", "select"):
+        params = [str(a) for a in args] + [f"{k}={v}" for k, v in kwargs.items()]
+        return f"{method}({', '.join(params)})"
+    if len(args) == 2:
+        return f"{args[0]} {method} {args[1]!r}"
+    return f"{method}{tuple(args)!r}"
+
+
+class _TracedQuery:
+    def __init__(self, query, table: str, op: str, tracer: Tracer):
+        self._query = query
+        self._table = table
+        self._op = op
+        self._tracer = tracer
+        self._filters: List[str] = []
+
+    def __getattr__(self, name):
+        attr = getattr(self._query, name)
+        if not callable(attr):
+            self._query = attr
+            return self
+
+        def call(*args, **kwargs):
+            self._query = attr(*args, **kwargs)
+            self._filters.append(_describe(name, args, kwargs))
+            return self
+        return call
+
+    def _record(self, resp, start: float, dao, service) -> None:
+        elapsed = time.perf_counter() - start
+        data = getattr(resp, "data", None)
+        rows = len(data) if isinstance(data, list) else int(data is not None)
+        size = len(json.dumps(data, default=str)) if data is not None else 0
+        self._tracer.record(Span(self._table, self._op, self._filters, rows, size, elapsed, dao, service))
+
+    def execute(self):
+        dao, service = _callers()
+        start = time.perf_counter()
+        result = self._query.execute()
+        if not hasattr(result, "__await__"):
+            self._record(result, start, dao, service)
+            return result
+
+        async def finish():
+            resp = await result
+            self._record(resp, start, dao, service)
+            return resp
+        return finish()
+
+
+class _TracedTable:
+    def __init__(self, table, name: str, tracer: Tracer):
+        self._table = table
+        self._name = name
+        self._tracer = tracer
+
+    def __getattr__(self, name):
+        attr = getattr(self._table, name)
+        if name not in _TABLE_OPS:
+            return attr
+
+        def start(*args, **kwargs):
+            return _TracedQuery(attr(*args, **kwargs), self._name, name, self._tracer)
+        return start
+
+
+class TracedClient:
+    """Wraps a supabase/SQLite client so every query through `table()` is recorded on `tracer`."""
+
+    def __init__(self, client, tracer: Tracer):
+        self._client = client
+        self._tracer = tracer
+
+    def table(self, name: str) -> _TracedTable:
+        return _TracedTable(self._client.table(name), name, self._tracer)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def traced(client):
+    """`client` wrapped for the active tracer, or unchanged when tracing is off."""
+    return TracedClient(client, _tracer) if _tracer is not None else client
@@ -0,0 +1,165 @@
+# src/utils.py
+"""Small helpers shared by the bulk (file-driven) commands and the service modules."""
+import asyncio
+import csv
+import json
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from src.config import ASYNC_CONCURRENCY
+
+# keys per find_existing call in import_in_chunks; keeps each in() request URL well under server limits
+LOOKUP_CHUNK = 200
+
+
+def lazy_default(name: str, factory: Callable[[], object]) -> Callable[[str], object]:
+    """
+    A module-level __getattr__ that builds the module attribute `name` with factory() on
+    first access and keeps it, so importing a service module stays cheap:
+
+        __getattr__ = lazy_default("default_order_service", OrderService)
+
+    The attribute is stored in the module `factory` is defined in.
+    """
+    module = sys.modules[factory.__module__]
+
+    def __getattr__(attr: str):
+        if attr != name:
+            raise AttributeError(f"module {module.__name__!r} has no attribute {attr!r}")
+        value = factory()
+        setattr(module, name, value)
+        return value
+    return __getattr__
+
+
+def read_records(path: str, fmt: Optional[str] = None) -> Iterator[Tuple[int, Dict]]:
+    """
+    Stream (line_number, record) pairs from a CSV or JSONL file.
+    The format is taken from the extension unless `fmt` is "csv" or "jsonl".
+    A JSONL line that does not parse is yielded as {"_error": message}.
+    """
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    with open(path, newline="", encoding="utf-8") as fh:
+        if fmt == "csv":
+            # header is line 1, so the first record is line 2
+            for n, row in enumerate(csv.DictReader(fh), start=2):
+                yield n, {k.strip(): (v.strip() if isinstance(v, str) else v) for k, v in row.items() if k}
+        else:
+            for n, line in enumerate(fh, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    rec = json.loads(line)
+                except ValueError as e:
+                    rec = {"_error": f"invalid JSON: {e}"}
+                if not isinstance(rec, dict):
+                    rec = {"_error": "expected a JSON object"}
+                yield n, rec
+
+
+def chunked(items: Iterable, size: int) -> Iterator[List]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_bounded(fn: Callable, items: Iterable, workers: int = 4) -> Iterator:
+    """
+    Apply fn to each item on a thread pool, with at most `workers` items in
+    flight, yielding results in input order. `items` is consumed lazily.
+    """
+    workers = max(1, workers)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for item in items:
+            pending.append(pool.submit(fn, item))
+            if len(pending) >= workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+async def gather_bounded(aws: Iterable[Awaitable], limit: Optional[int] = None,
+                         return_exceptions: bool = False) -> List:
+    """
+    asyncio.gather with at most `limit` awaitables running at once (default ASYNC_CONCURRENCY).
+    With return_exceptions, every awaitable finishes and failures come back as exceptions.
+    """
+    sem = asyncio.Semaphore(limit or ASYNC_CONCURRENCY)
+
+    async def run(aw):
+        async with sem:
+            return await aw
+
+    return await asyncio.gather(*(run(aw) for aw in aws), return_exceptions=return_exceptions)
+
+
+def import_in_chunks(records: Iterable[Tuple[int, Dict]], clean: Callable[[Dict], Dict], key: str,
+                     find_existing: Callable[[List], set], upsert: Callable[[List[Dict], bool], List[Dict]],
+                     chunk_size: int = 500, workers: int = 4, skip_existing: bool = False,
+                     insert_defaults: Optional[Dict] = None) -> Dict:
+    """
+    Validate and upsert (line, record) pairs chunk by chunk.
+
+    `clean` turns a record into a row or raises with a message; rows are matched on
+    `key`. A row only carries the columns its record has, so an import never
+    overwrites a stored value the file does not mention; `insert_defaults` fill in
+    columns for rows that are new. Existing keys are looked up LOOKUP_CHUNK at a
+    time; if that fails, every line of the chunk gets the error. Each chunk is
+    upserted in one request per distinct column set (usually one), and a request
+    that fails is retried row by row, so one bad row only costs its own line.
+    Returns counts plus a list of {"line", "error"} entries.
+    """
+    def load(chunk):
+        rows, errors = {}, []
+        for line, rec in chunk:
+            try:
+                row = clean(rec)
+            except Exception as e:
+                errors.append({"line": line, "error": str(e)})
+                continue
+            if row[key] in rows:
+                errors.append({"line": line, "error": f"duplicate {key} {row[key]!r} (first seen on line {rows[row[key]][0]})"})
+                continue
+            rows[row[key]] = (line, row)
+        if not rows:
+            return {}, errors
+        try:
+            existing = set()
+            for keys in chunked(rows, LOOKUP_CHUNK):
+                existing |= find_existing(keys)
+        except Exception as e:
+            return {}, errors + [{"line": line, "error": str(e)} for line, _ in rows.values()]
+        groups: Dict[Tuple, List] = {}
+        for k, (line, row) in rows.items():
+            if insert_defaults and k not in existing:
+                row = {**insert_defaults, **row}
+            groups.setdefault(tuple(sorted(row)), []).append((k, line, row))
+        failed = set()
+        for group in groups.values():
+            try:
+                upsert([row for _, _, row in group], skip_existing)
+            except Exception:
+                for k, line, row in group:
+                    try:
+                        upsert([row], skip_existing)
+                    except Exception as e:
+                        failed.add(k)
+                        errors.append({"line": line, "error": str(e)})
+        done = [k for k in rows if k not in failed]
+        old = sum(1 for k in done if k in existing)
+        counts = {"inserted": len(done) - old, ("skipped" if skip_existing else "updated"): old}
+        return counts, errors
+
+    summary = {"inserted": 0, "updated": 0, "skipped": 0, "errors": []}
+    for counts, errors in run_bounded(load, chunked(records, chunk_size), workers):
+        for k, v in counts.items():
+            summary[k] += v
+        summary["errors"].extend(errors)
+    return summary